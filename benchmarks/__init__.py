@@ -0,0 +1,10 @@
+"""
+Benchmarks for asv (airspeed velocity). Run them from the top directory ::
+
+    asv run                   # the commits of the main branch
+    asv continuous main HEAD  # compare HEAD with main
+    asv run --python=same --quick --bench ChainSuite  # current environment
+
+The benchmarks record the time (time_*) and the peak memory (peakmem_*) over
+the grid of the artist size, the dpi and the number of artists.
+"""
@@ -0,0 +1,85 @@
+"""
+End-to-end benchmarks of drawing the artists with `ImageEffect`, i.e.,
+rendering them offscreen, processing the images and drawing the results, on
+the Agg and the PDF backends.
+"""
+
+import io
+
+import matplotlib
+import matplotlib.pyplot as plt
+from matplotlib.patches import Circle
+from matplotlib.patheffects import Normal
+
+from mpl_visual_context.image_effect import (
+    AlphaAxb,
+    Dilation,
+    Fill,
+    Gaussian,
+    Offset,
+    Pad,
+)
+from mpl_visual_context.patheffects import ImageEffect
+
+SIZES = [1, 4]  # size of the artists in inches
+DPIS = [72, 150, 300, 600]
+N_ARTISTS = [1, 10, 50]
+
+
+def make_figure(size, n_artists, buffer="canvas"):
+    """
+    Figure (twice the size of the artists) with *n_artists* circles of the
+    given size (in inches) on its diagonal, each drawn with a drop shadow.
+    """
+    figsize = 2 * size
+    fig = plt.figure(figsize=(figsize, figsize))
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set(xlim=(0, figsize), ylim=(0, figsize))
+    ax.set_axis_off()
+
+    ie = (
+        Pad(10)
+        | Dilation(3)
+        | Gaussian(5)
+        | Fill("k")
+        | AlphaAxb((0.5, 0))
+        | Offset(3, -3)
+    )
+    pe = [ImageEffect(ie, buffer=buffer), Normal()]
+
+    r = size / 2
+    for i in range(n_artists):
+        c = r + i * size / max(n_artists - 1, 1)
+        ax.add_patch(Circle((c, c), r * 0.9, transform=ax.transData, path_effects=pe))
+
+    return fig
+
+
+class DrawSuite:
+    params = [["agg", "pdf"], ["canvas", "extent"], SIZES, DPIS, N_ARTISTS]
+    param_names = ["backend", "buffer", "size", "dpi", "n_artists"]
+    timeout = 600
+
+    def setup(self, backend, buffer, size, dpi, n_artists):
+        # With the pdf backend, the sizes of the effects are scaled by both
+        # the dpi and the scale_factor, and many artists at high dpi take
+        # too long.
+        if backend == "pdf" and dpi >= 300 and n_artists > 10:
+            raise NotImplementedError
+        # The figures are only saved, and no gui backend is needed.
+        matplotlib.use("agg")
+        self.fig = make_figure(size, n_artists, buffer=buffer)
+
+    def teardown(self, backend, buffer, size, dpi, n_artists):
+        plt.close(self.fig)
+
+    def _savefig(self, backend, dpi):
+        self.fig.savefig(
+            io.BytesIO(), format="png" if backend == "agg" else backend, dpi=dpi
+        )
+
+    def time_savefig(self, backend, buffer, size, dpi, n_artists):
+        self._savefig(backend, dpi)
+
+    def peakmem_savefig(self, backend, buffer, size, dpi, n_artists):
+        self._savefig(backend, dpi)
@@ -0,0 +1,121 @@
+"""
+Benchmarks of the image effects, run directly on the images of the size that
+an artist of the given size (in inches) would have at the given dpi.
+"""
+
+import numpy as np
+
+from mpl_visual_context.image_effect import (
+    AlphaAxb,
+    ColorMatrix,
+    Dilation,
+    Downsample,
+    Erosion,
+    Fill,
+    Gaussian,
+    HLSModify,
+    LightSource,
+    LightSourceSharp,
+    Offset,
+    Pad,
+    convert_image_dtype,
+)
+from mpl_visual_context.image_effect_compiler import CompiledImageEffect
+
+SIZES = [1, 4]  # in inches
+DPIS = [72, 150, 300, 600]
+
+
+def make_image(size, dpi):
+    """
+    uint8 RGBA image (straight alpha) of an antialiased disk that fills the
+    image, similar to the rendered artist.
+    """
+    n = int(size * dpi)
+    y, x = np.ogrid[-1 : 1 : n * 1j, -1 : 1 : n * 1j]
+    r = np.hypot(x, y)
+    img = np.empty((n, n, 4), dtype=np.uint8)
+    img[..., 0] = 31
+    img[..., 1] = 119
+    img[..., 2] = 180
+    img[..., 3] = np.clip((0.9 - r) * n / 2, 0, 1) * 255
+    return img
+
+
+EFFECTS = {
+    "Offset": lambda: Offset(3, -3),
+    "Fill": lambda: Fill("r"),
+    "AlphaAxb": lambda: AlphaAxb((0.5, 0)),
+    "Pad": lambda: Pad(10),
+    "Dilation": lambda: Dilation(5),
+    "Dilation-disk": lambda: Dilation(5, shape="disk", method="auto"),
+    "Erosion": lambda: Erosion(5),
+    "Gaussian": lambda: Gaussian(5),
+    "Gaussian-box3": lambda: Gaussian(5, method="box3"),
+    "LightSource": lambda: LightSource(),
+    "LightSourceSharp": lambda: LightSourceSharp(),
+    "Downsample": lambda: Downsample(Gaussian(20), factor=4),
+    "ColorMatrix": lambda: ColorMatrix("sepia"),
+    "HLSModify": lambda: HLSModify(s="30%", dl=0.1),
+}
+
+CHAINS = {
+    "shadow": lambda: Pad(10)
+    | Dilation(3)
+    | Gaussian(5)
+    | Fill("k")
+    | AlphaAxb((0.5, 0))
+    | Offset(3, -3),
+    "glow": lambda: Pad(20) | Gaussian(10) | Fill("y") | AlphaAxb((0.8, 0)),
+    "emboss": lambda: Pad(5) | LightSource(erosion_size=3, gaussian_size=3),
+    "desaturated-glow": lambda: Pad(20)
+    | Gaussian(10)
+    | HLSModify(s="30%")
+    | AlphaAxb((0.8, 0)),
+}
+
+
+class _ImageEffectBench:
+    def _setup(self, ie, size, dpi):
+        self.ie = ie
+        self.dpi = dpi
+        # The sizes of the effects are scaled by dpi / 72 * scale_factor,
+        # where the scale_factor is 1 for the agg backend.
+        self.scale_factor = 1
+        img = make_image(size, dpi)
+        self.img = convert_image_dtype(img, ie.get_input_dtype())
+
+    def _process(self):
+        # The image can be modified in place by the effect.
+        self.ie.process_image(self.dpi, self.scale_factor, 0, 0, self.img.copy())
+
+
+class ImageEffectSuite(_ImageEffectBench):
+    params = [list(EFFECTS), SIZES, DPIS]
+    param_names = ["effect", "size", "dpi"]
+
+    def setup(self, name, size, dpi):
+        self._setup(EFFECTS[name](), size, dpi)
+
+    def time_process_image(self, name, size, dpi):
+        self._process()
+
+    def peakmem_process_image(self, name, size, dpi):
+        self._process()
+
+
+class ChainSuite(_ImageEffectBench):
+    params = [list(CHAINS), [None, "float32", "uint8"], [False, True], SIZES, DPIS]
+    param_names = ["chain", "dtype", "compiled", "size", "dpi"]
+
+    def setup(self, name, dtype, compiled, size, dpi):
+        ie = CHAINS[name]().set_dtype(dtype)
+        if compiled:
+            ie = CompiledImageEffect(ie)
+        self._setup(ie, size, dpi)
+
+    def time_process_image(self, name, dtype, compiled, size, dpi):
+        self._process()
+
+    def peakmem_process_image(self, name, dtype, compiled, size, dpi):
+        self._process()
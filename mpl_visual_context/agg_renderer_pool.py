@@ -0,0 +1,108 @@
+"""
+A pool of RendererAgg used as offscreen render targets by the ImageEffect and
+the ImageClipboard, so that their buffers are reused across draws. Borrow a
+renderer with `acquire` and return it with `release`.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+from matplotlib.backends.backend_agg import RendererAgg
+
+__all__ = ["RendererAggPool", "renderer_pool"]
+
+
+class RendererAggPool:
+    def __init__(self, max_bytes=128 * 2**20):
+        """
+        max_bytes: maximum size of the buffers that are kept in the pool.
+        Setting it to 0 disables the pooling.
+        """
+        self.max_bytes = max_bytes
+
+        # (width, height, dpi) -> list of (free renderer, dirty region). The
+        # order of the keys is the order of their use, from the least recent
+        # one.
+        self._free = OrderedDict()
+        self._nbytes = 0
+
+        self.n_created = 0
+        self.n_reused = 0
+
+    @staticmethod
+    def _get_key(renderer):
+        return renderer.width, renderer.height, renderer.dpi
+
+    @staticmethod
+    def _get_nbytes(renderer):
+        return renderer.width * renderer.height * 4
+
+    @property
+    def nbytes(self):
+        "total size of the buffers in the pool"
+        return self._nbytes
+
+    def acquire(self, width, height, dpi):
+        """
+        Return a cleared RendererAgg of the given size and dpi.
+        """
+        key = (width, height, dpi)
+        free = self._free.get(key)
+        if free:
+            renderer, dirty = free.pop()
+            if not free:
+                del self._free[key]
+            self._nbytes -= self._get_nbytes(renderer)
+            if dirty is None:
+                renderer.clear()
+            else:
+                # same as the clear of agg, i.e., transparent white.
+                np.asarray(renderer.buffer_rgba())[dirty] = (255, 255, 255, 0)
+            self.n_reused += 1
+        else:
+            renderer = RendererAgg(width, height, dpi)
+            self.n_created += 1
+
+        return renderer
+
+    def release(self, renderer, dirty=None):
+        """
+        Return the renderer to the pool. The renderer should not be used
+        after it is released.
+
+        dirty: (slice_y, slice_x) of the buffer that has been drawn. Only
+        this region is cleared when the renderer is reused. If None, the
+        whole buffer is cleared.
+        """
+        nbytes = self._get_nbytes(renderer)
+        if nbytes > self.max_bytes:
+            return
+
+        key = self._get_key(renderer)
+        self._free.setdefault(key, []).append((renderer, dirty))
+        self._free.move_to_end(key)
+        self._nbytes += nbytes
+
+        self._evict(self.max_bytes)
+
+    def _evict(self, max_bytes):
+        while self._nbytes > max_bytes and self._free:
+            key, free = next(iter(self._free.items()))
+            renderer, _ = free.pop(0)
+            if not free:
+                del self._free[key]
+            self._nbytes -= self._get_nbytes(renderer)
+
+    def set_max_bytes(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._evict(max_bytes)
+
+    def clear(self):
+        "discard all the renderers in the pool."
+        self._free.clear()
+        self._nbytes = 0
+
+
+# The default pool that is shared by ImageEffect and ImageClipboard.
+renderer_pool = RendererAggPool()
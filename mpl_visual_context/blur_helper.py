@@ -0,0 +1,171 @@
+"""
+Gaussian blur engines, selected by the *method* of `gaussian_filter`.
+
+- "exact" : `scipy.ndimage.gaussian_filter`.
+- "box3" : three successive box filters. Approximate, with a cost independent
+  of sigma.
+- "iir" : recursive filter of Young & van Vliet. Approximate, with a cost
+  independent of sigma.
+- "fft" : FFT convolution with the gaussian kernel.
+- "auto" : "exact" if sigma is smaller than the threshold, "box3" otherwise.
+"""
+
+import numpy as np
+import scipy.ndimage as NI
+import scipy.signal
+
+__all__ = ["gaussian_filter", "get_radius", "BLUR_METHODS"]
+
+# sigma (in pixels) above which the "auto" method uses the approximation.
+AUTO_THRESHOLD = 8.0
+
+_TRUNCATE = 4.0
+
+
+def _get_box_sizes(sigma, n=3):
+    """
+    Return the widths of n box filters whose successive application
+    approximates the gaussian of the given sigma.
+    """
+    w_ideal = np.sqrt(12 * sigma**2 / n + 1)
+    wl = int(np.floor(w_ideal))
+    if wl % 2 == 0:
+        wl -= 1
+    wu = wl + 2
+
+    m = round((12 * sigma**2 - n * wl**2 - 4 * n * wl - 3 * n) / (-4 * wl - 4))
+
+    return [wl if i < m else wu for i in range(n)]
+
+
+def _gaussian_box3(img, sigma):
+    out = img
+    for axis, s in enumerate(sigma):
+        if s <= 0:
+            continue
+        for w in _get_box_sizes(s):
+            out = NI.uniform_filter1d(out, w, axis=axis, mode="reflect")
+    return out
+
+
+def _get_iir_coeffs(sigma):
+    # Young & van Vliet (1995), Signal Processing, 44, 139
+    if sigma >= 2.5:
+        q = 0.98711 * sigma - 0.96330
+    else:
+        q = 3.97156 - 4.14554 * np.sqrt(1 - 0.26891 * sigma)
+
+    b0 = 1.57825 + 2.44413 * q + 1.4281 * q**2 + 0.422205 * q**3
+    b1 = 2.44413 * q + 2.85619 * q**2 + 1.26661 * q**3
+    b2 = -(1.4281 * q**2 + 1.26661 * q**3)
+    b3 = 0.422205 * q**3
+
+    B = 1 - (b1 + b2 + b3) / b0
+    return [B], [1, -b1 / b0, -b2 / b0, -b3 / b0]
+
+
+def _gaussian_iir(img, sigma):
+    out = img
+    for axis, s in enumerate(sigma):
+        n = img.shape[axis]
+        if s < 0.5 or n < 2:
+            # The coefficients are not valid for very small sigma.
+            if s > 0:
+                out = NI.gaussian_filter1d(out, s, axis=axis)
+            continue
+        b, a = _get_iir_coeffs(s)
+        padlen = min(int(np.ceil(3 * s)), n - 1)
+        out = scipy.signal.filtfilt(b, a, out, axis=axis, padtype="even", padlen=padlen)
+    return out
+
+
+def _gaussian_fft(img, sigma):
+    pads = [int(_TRUNCATE * s + 0.5) if s > 0 else 0 for s in sigma]
+    kernel = np.ones([1] * img.ndim)
+    for axis, (s, r) in enumerate(zip(sigma, pads)):
+        if s <= 0:
+            continue
+        x = np.arange(-r, r + 1)
+        k = np.exp(-0.5 * (x / s) ** 2)
+        k /= k.sum()
+        shape = [1] * img.ndim
+        shape[axis] = len(k)
+        kernel = kernel * k.reshape(shape)
+
+    axes = [axis for axis, s in enumerate(sigma) if s > 0]
+    padded = np.pad(img, [(r, r) for r in pads], mode="symmetric")
+    return scipy.signal.fftconvolve(padded, kernel, mode="valid", axes=axes)
+
+
+def _gaussian_exact(img, sigma):
+    return NI.gaussian_filter(img, sigma)
+
+
+BLUR_METHODS = {
+    "exact": _gaussian_exact,
+    "box3": _gaussian_box3,
+    "iir": _gaussian_iir,
+    "fft": _gaussian_fft,
+}
+
+
+def _get_method(method, sigma, threshold):
+    if method == "auto":
+        threshold = AUTO_THRESHOLD if threshold is None else threshold
+        method = "box3" if max(sigma) > threshold else "exact"
+
+    if method not in BLUR_METHODS:
+        raise ValueError(f"Unknown method: {method}")
+
+    return method
+
+
+def get_radius(sigma, method="exact", threshold=None):
+    """
+    Return the radius (in pixels) of the filter for each axis, i.e., the
+    output pixel only depends on the input pixels within the radius. None is
+    returned for the methods whose support is not finite ("iir"), or whose
+    round-off errors depend on the extent of the image ("box3" with its
+    running sum, and "fft").
+    """
+    method = _get_method(method, sigma, threshold)
+
+    if method == "exact":
+        return [int(_TRUNCATE * s + 0.5) if s > 0 else 0 for s in sigma]
+    else:
+        return None
+
+
+def gaussian_filter(img, sigma, method="exact", threshold=None, output=None):
+    """
+    Gaussian filter of the image with the given method (one of "exact",
+    "box3", "iir", "fft" and "auto").
+
+    sigma : a sequence of sigma (in pixels) for each axis of the image. An
+    axis with zero sigma is not filtered.
+
+    threshold : sigma (in pixels) above which the "auto" method uses the
+    approximation. Default is AUTO_THRESHOLD.
+
+    output : the array to which the result is written. It can be the input
+    image itself.
+    """
+    if not np.iterable(sigma):
+        sigma = [sigma] * img.ndim
+
+    method = _get_method(method, sigma, threshold)
+    if method == "exact":
+        # scipy.ndimage filters line by line, thus the output can be the
+        # input itself.
+        return NI.gaussian_filter(img, sigma, output=output)
+
+    out = BLUR_METHODS[method](img, sigma)
+
+    if output is not None:
+        output[...] = out
+        return output
+
+    if out.dtype != img.dtype:
+        out = out.astype(img.dtype)
+
+    return out
@@ -0,0 +1,124 @@
+"""
+Memo of the results of `apply_to_color` of the color effects.
+
+In a bar or a pie chart, the color effects are applied to a handful of colors
+many times. The memo is opt-in ::
+
+    pe = HLSModify(l="-10%")
+    memo = pe.enable_memo(maxsize=256)
+    ...
+    print(memo.get_stats())
+
+The memo is keyed on the rgba tuple of the color, and is cleared whenever an
+attribute of the object that owns the memo is set. Note that modifying the
+attribute in place (e.g., an element of an array) is not detected, and the
+memo should be cleared explicitly.
+"""
+
+from collections import OrderedDict
+import functools
+
+import numpy as np
+import matplotlib.colors as mcolors
+
+__all__ = ["ColorMemo", "ColorMemoMixin"]
+
+
+class ColorMemo:
+    def __init__(self, maxsize=256):
+        """
+        maxsize: maximum number of the colors to remember. The least recently
+        used ones are discarded when the cap is exceeded.
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+
+        self.maxsize = maxsize
+
+        self._memo = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._memo)
+
+    def lookup(self, func, c):
+        """
+        Return func(c), which is computed only if the rgba of c is not in the
+        memo.
+        """
+        key = mcolors.to_rgba(c)
+
+        r = self._memo.get(key)
+        if r is None:
+            self.misses += 1
+            r = func(c)
+            self._memo[key] = r
+            if len(self._memo) > self.maxsize:
+                self._memo.popitem(last=False)
+        else:
+            self.hits += 1
+            self._memo.move_to_end(key)
+
+        # the result is mostly an array, which the caller may modify.
+        return r.copy() if isinstance(r, np.ndarray) else r
+
+    def clear(self):
+        self._memo.clear()
+
+    def get_stats(self):
+        "return a dictionary of the memo statistics"
+        n = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / n if n else 0.0,
+            size=len(self._memo),
+        )
+
+
+def _memoized(apply_to_color):
+    @functools.wraps(apply_to_color)
+    def wrapper(self, c):
+        memo = self._color_memo
+        if memo is None:
+            return apply_to_color(self, c)
+        return memo.lookup(functools.partial(apply_to_color, self), c)
+
+    wrapper._memoized = True
+    return wrapper
+
+
+class ColorMemoMixin:
+    """
+    Mixin for the classes with `apply_to_color`, which adds an opt-in memo of
+    its results. The `apply_to_color` defined by the subclasses is wrapped to
+    use the memo. The memo is cleared whenever an attribute is set.
+    """
+
+    _color_memo = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        f = vars(cls).get("apply_to_color")
+        if f is not None and not getattr(f, "_memoized", False):
+            cls.apply_to_color = _memoized(f)
+
+    def enable_memo(self, maxsize=256):
+        "Enable the memo of the colors and return it."
+        memo = ColorMemo(maxsize=maxsize)
+        object.__setattr__(self, "_color_memo", memo)
+        return memo
+
+    def disable_memo(self):
+        object.__setattr__(self, "_color_memo", None)
+
+    def get_memo(self):
+        "Return the memo, or None if it is not enabled."
+        return self._color_memo
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if self._color_memo is not None:
+            self._color_memo.clear()
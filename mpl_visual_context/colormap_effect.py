@@ -0,0 +1,80 @@
+"""
+Color effects applied to the colormap.
+
+For the colormapped images (e.g., `ImageBox` or `AxesImage` of 2d data),
+applying a color effect to every pixel of the image (with `ImageEffect`) is
+equivalent to applying it to the lookup table of the colormap, which only has
+N (256 by default) colors. The color effect can be any chain of the color
+effects that `patheffects_color_fusion` can fuse (e.g., `HLSModify`,
+`ColorMatrix` and `BlendAlpha`) ::
+
+    cmap = transform_colormap("viridis", HLSModify(l="-20%") | ColorMatrix("sepia"))
+    ax.imshow(data, cmap=cmap)
+
+    ib = ImageBox("right", cmap="rainbow", coords="axes fraction", axes=ax)
+    ib.set_color_effect(HLSModify(s="50%"))
+
+"""
+
+import numpy as np
+import matplotlib as mpl
+import matplotlib.colors as mcolors
+
+from .hls_helper import HLSModify_axb
+from .patheffects_base import ChainedPathEffect
+from .patheffects_color_fusion import FusedColorModify
+
+__all__ = ["transform_colormap", "set_colormap_effect"]
+
+
+def get_colors_func(color_effect):
+    """
+    Return a function that takes an (N, 4) array of rgba colors and returns
+    the colors modified by the color effect. ValueError is raised if the
+    effect is not a color effect.
+    """
+    if isinstance(color_effect, (FusedColorModify, HLSModify_axb)):
+        return color_effect.apply_to_colors
+
+    if isinstance(color_effect, ChainedPathEffect):
+        pe_list = color_effect._pe_list
+    else:
+        pe_list = [color_effect]
+
+    return FusedColorModify(pe_list).apply_to_colors
+
+
+def transform_colormap(cmap, color_effect, name=None):
+    """
+    Return a new `ListedColormap` whose colors (including the colors for
+    the under, over and bad values) are modified by the color effect.
+
+    cmap : a colormap or its name.
+    """
+    if isinstance(cmap, str):
+        cmap = mpl.colormaps[cmap]
+
+    func = get_colors_func(color_effect)
+
+    lut = func(cmap(np.arange(cmap.N)))
+    under, over, bad = func([cmap.get_under(), cmap.get_over(), cmap.get_bad()])
+
+    if name is None:
+        name = f"{cmap.name}_transformed"
+
+    return mcolors.ListedColormap(lut, name=name).with_extremes(
+        under=under, over=over, bad=bad
+    )
+
+
+def set_colormap_effect(mappable, color_effect):
+    """
+    Set the colormap of the mappable (e.g., `AxesImage` and `ImageBox`) to
+    the one transformed by the color effect. Note that the current colormap
+    is transformed, i.e., the effects accumulate if called more than once.
+    """
+    A = mappable.get_array()
+    if A is not None and np.ndim(A) == 3:
+        raise ValueError("The rgb(a) image is not colormapped.")
+
+    mappable.set_cmap(transform_colormap(mappable.get_cmap(), color_effect))
@@ -0,0 +1,139 @@
+"""
+Figure-level post-processing of the Agg canvas.
+
+Applying a global look (e.g., color grading, blur or glow) with `ImageEffect`
+requires the effect on every artist, each of which is rendered offscreen and
+processed separately. `FigurePostProcess` is an artist that runs the image
+effect once on the finished canvas of the Agg renderer instead. It is drawn
+after all the other artists (its zorder is infinite), and the processed image
+replaces the pixels of the canvas in place ::
+
+    add_postprocess(fig, ColorMatrix("sepia") | HLSModify(s="80%"))
+
+    # only within the given axes
+    add_postprocess(fig, Gaussian(2, channel_slice=slice(None)),
+                    axes=[ax1, ax2])
+
+The canvas is processed as a single image (or an image for each axes) in the
+same way as `ImageEffect`, i.e., the image is vertically flipped (the first
+row is the bottom), and the effects are scaled with the dpi. If the effect
+changes the geometry of the image (e.g., `Pad` and `Offset`), the processed
+image is cropped to the region, and the pixels of the region that are not
+covered are left unchanged. If the effect is of the uint8 dtype policy and
+can process the uint8 image, it directly modifies the canvas buffer without
+any copy.
+
+Nothing is done for the renderers without `buffer_rgba` (the vector
+backends).
+"""
+
+import numpy as np
+
+from matplotlib.artist import Artist
+
+from .image_effect import convert_image_dtype
+from .patheffects_image_effect import _get_input_dtype
+
+__all__ = ["FigurePostProcess", "add_postprocess"]
+
+
+def _get_region(bbox, width, height):
+    "integer extents of the bbox (in display coordinates) within the canvas."
+    x0 = min(max(int(np.floor(bbox.x0)), 0), width)
+    x1 = min(max(int(np.ceil(bbox.x1)), 0), width)
+    y0 = min(max(int(np.floor(bbox.y0)), 0), height)
+    y1 = min(max(int(np.ceil(bbox.y1)), 0), height)
+    return x0, y0, x1, y1
+
+
+def _paste(view, x0, y0, x, y, img):
+    """
+    Paste the image whose lower left corner is at (x, y) to the view (both
+    vertically flipped) whose lower left corner is at (x0, y0), cropping the
+    image to the view.
+    """
+    ny, nx = view.shape[:2]
+    ix, iy = int(round(x)) - x0, int(round(y)) - y0
+
+    sx0, sx1 = max(ix, 0), min(ix + img.shape[1], nx)
+    sy0, sy1 = max(iy, 0), min(iy + img.shape[0], ny)
+    if sx0 >= sx1 or sy0 >= sy1:
+        return
+
+    view[sy0:sy1, sx0:sx1] = img[sy0 - iy : sy1 - iy, sx0 - ix : sx1 - ix]
+
+
+class FigurePostProcess(Artist):
+    def __init__(self, image_effect, axes=None, **kw):
+        """
+        image_effect: the image effect (e.g., ChainedImageEffect) to process
+        the canvas.
+
+        axes: a list of axes. If given, only the region of each axes (its
+        bbox) is processed, separately. Otherwise, the whole canvas.
+        """
+        super().__init__(**kw)
+        self._image_effect = image_effect
+        self._axes_list = axes
+        self.set_zorder(np.inf)
+        self.set_in_layout(False)
+
+    def set_image_effect(self, image_effect):
+        self._image_effect = image_effect
+        self.stale = True
+
+    def get_regions(self, renderer):
+        "Return a list of bboxes (in display coordinates) to be processed."
+        if self._axes_list is None:
+            return [self.figure.bbox]
+        return [ax.bbox for ax in self._axes_list if ax.get_visible()]
+
+    def _process_region(self, renderer, buf, region):
+        x0, y0, x1, y1 = region
+        height = buf.shape[0]
+
+        # vertically flipped view of the buffer. This does not copy.
+        view = buf[height - y1 : height - y0, x0:x1][::-1]
+
+        dtype = _get_input_dtype(self._image_effect)
+        img = view if dtype == view.dtype else convert_image_dtype(view, dtype)
+
+        # Same as ImageEffect for the agg renderer, the scale_factor is 1.
+        dpi, scale_factor, x, y, img = self._image_effect.process_image(
+            renderer.dpi, 1, x0, y0, img
+        )
+
+        if img is view and (x, y) == (x0, y0):
+            return  # modified in place.
+
+        if img.dtype.kind == "f":
+            img = np.asarray(img * 255.0, np.uint8)
+
+        _paste(view, x0, y0, x / scale_factor, y / scale_factor, img)
+
+    def draw(self, renderer):
+        if not self.get_visible() or self._image_effect is None:
+            return
+        if not hasattr(renderer, "buffer_rgba"):
+            return
+
+        buf = np.asarray(renderer.buffer_rgba())
+        height, width = buf.shape[:2]
+
+        for bbox in self.get_regions(renderer):
+            region = _get_region(bbox, width, height)
+            x0, y0, x1, y1 = region
+            if x0 < x1 and y0 < y1:
+                self._process_region(renderer, buf, region)
+
+        self.stale = False
+
+
+def add_postprocess(fig, image_effect, axes=None):
+    """
+    Add `FigurePostProcess` of the image effect to the figure, and return
+    it. See `FigurePostProcess` for the parameters.
+    """
+    pp = FigurePostProcess(image_effect, axes=axes)
+    fig.add_artist(pp)
+    return pp
@@ -1,9 +1,81 @@
-import colorsys
 from numbers import Number
 import numpy as np
 import matplotlib.colors as mcolors
 from numbers import Number
 
+from .color_memo import ColorMemoMixin
+
+
+def _as_float_array(a):
+    a = np.asarray(a)
+    if a.dtype.kind != "f":
+        a = a.astype(float)
+    return a
+
+
+def rgb_to_hls(rgb):
+    """
+    Convert the array of rgb colors of shape (..., 3) to hls. Vectorized
+    version of `colorsys.rgb_to_hls`. The float dtype (e.g., float32) is
+    preserved.
+    """
+    rgb = _as_float_array(rgb)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+
+    maxc = rgb.max(axis=-1)
+    minc = rgb.min(axis=-1)
+    sumc = maxc + minc
+    rangec = maxc - minc
+    l = sumc / 2
+
+    gray = rangec == 0
+    # avoid the division by zero for gray colors, whose h and s are 0.
+    rangec_ = np.where(gray, 1, rangec)
+    s = rangec_ / np.where(gray, 1, np.where(l <= 0.5, sumc, 2 - sumc))
+
+    rc = (maxc - r) / rangec_
+    gc = (maxc - g) / rangec_
+    bc = (maxc - b) / rangec_
+    h = np.where(r == maxc, bc - gc, np.where(g == maxc, 2 + rc - bc, 4 + gc - rc))
+    h = (h / 6) % 1
+
+    hls = np.stack([h, l, s], axis=-1)
+    hls[gray, 0] = 0
+    hls[gray, 2] = 0
+
+    return hls
+
+
+def _hls_v(m1, m2, hue):
+    hue = hue % 1
+    return np.select(
+        [hue < 1 / 6, hue < 0.5, hue < 2 / 3],
+        [m1 + (m2 - m1) * hue * 6, m2, m1 + (m2 - m1) * (2 / 3 - hue) * 6],
+        m1,
+    )
+
+
+def hls_to_rgb(hls):
+    """
+    Convert the array of hls colors of shape (..., 3) to rgb. Vectorized
+    version of `colorsys.hls_to_rgb`. The float dtype is preserved.
+    """
+    hls = _as_float_array(hls)
+    h, l, s = hls[..., 0], hls[..., 1], hls[..., 2]
+
+    m2 = np.where(l <= 0.5, l * (1 + s), l + s - l * s)
+    m1 = 2 * l - m2
+
+    rgb = np.stack(
+        [_hls_v(m1, m2, h + 1 / 3), _hls_v(m1, m2, h), _hls_v(m1, m2, h - 1 / 3)],
+        axis=-1,
+    )
+
+    gray = s == 0
+    rgb[gray] = l[gray, np.newaxis]
+
+    return rgb
+
 
 def _convert_scale_or_const(v1):
     if isinstance(v1, str):
@@ -16,7 +88,16 @@ def _convert_scale_or_const(v1):
     return (0, v1)
 
 
-class HLSModify_axb:
+def get_hls_ab(h="100%", l="100%", s="100%", alpha="100%", dh=0, dl=0, ds=0, dalpha=0):
+    """
+    Return the (a, b) of h, l, s and alpha from the parameters of HLSModify,
+    i.e., a percentage string or a constant, and an offset.
+    """
+    hls_ab = [_convert_scale_or_const(v) for v in [h, l, s, alpha]]
+    return [(a, b + dd) for (a, b), dd in zip(hls_ab, [dh, dl, ds, dalpha])]
+
+
+class HLSModify_axb(ColorMemoMixin):
     @staticmethod
     def _check_ab(ab):
         if isinstance(ab, Number):
@@ -54,30 +135,35 @@ class HLSModify_axb:
         self.clip_mode = clip_mode
 
     def apply_to_hls(self, hls, alpha):
-        h, l, s = self.hls_a * hls + self.hls_b
-        alpha = self.alpha_a * alpha + self.alpha_b
+        """
+        Return the modified hls (of shape (..., 3)) and alpha (of shape
+        (...)).
+        """
+        hls = _as_float_array(hls)
+        hls = self.hls_a.astype(hls.dtype) * hls + self.hls_b.astype(hls.dtype)
+        alpha = self.alpha_a * _as_float_array(alpha) + self.alpha_b
 
         if self.clip_mode == "clip":
-            l, s, alpha = np.clip([l, s, alpha], 0, 1)
-            # hls = np.clip(hls, 0, 1)
-            # alpha = np.clip(alpha, 0, 1)
-        # else:
-        #     hls %= 1
-        #     alpha %= 1
+            hls[..., 1:] = np.clip(hls[..., 1:], 0, 1)
+            alpha = np.clip(alpha, 0, 1)
 
-        h %= 1
+        hls[..., 0] %= 1
 
-        return [h, l, s], alpha
+        return hls, alpha
 
-    def apply_to_color(self, c):
-        c_rgba = mcolors.to_rgba(c)
+    def apply_to_colors(self, colors):
+        """
+        Return the modified colors as an (N, 4) array of rgba, given a
+        sequence of N colors (e.g., an (N, 4) array).
+        """
+        if len(colors) == 0:
+            return np.zeros((0, 4))
+        c_rgba = mcolors.to_rgba_array(colors)
 
-        c_rgb = c_rgba[:3]
-        alpha = c_rgba[3]
+        c_hls = rgb_to_hls(c_rgba[:, :3])
+        c_hls, alpha = self.apply_to_hls(c_hls, c_rgba[:, 3])
 
-        c_hls = colorsys.rgb_to_hls(*c_rgb)
+        return np.column_stack([hls_to_rgb(c_hls), alpha])
 
-        (h, l, s), alpha = self.apply_to_hls(c_hls, alpha)
-
-        c_rgb_new = colorsys.hls_to_rgb(h, l, s)
-        return np.append(c_rgb_new, [alpha])
+    def apply_to_color(self, c):
+        return self.apply_to_colors([mcolors.to_rgba(c)])[0]
@@ -1,6 +1,7 @@
 """
 ImageBox
 """
+
 from abc import ABC, abstractmethod
 
 import numpy as np
@@ -198,8 +199,15 @@ class TransformedBboxBase(BboxImage):
 
         return bbox_orig
 
-    def __init__(self, extent=None, bbox=None, coords="data", axes=None,
-                 blend_color=None, **im_kw):
+    def __init__(
+        self,
+        extent=None,
+        bbox=None,
+        coords="data",
+        axes=None,
+        blend_color=None,
+        **im_kw,
+    ):
         self.coords = coords
         self.bbox_orig = self._get_bbox_orig(extent, bbox)
         if "interpolation" not in im_kw:
@@ -229,6 +237,15 @@ class TransformedBboxBase(BboxImage):
         self.set_data(data)
         self.set_alpha(alpha)
 
+    def set_color_effect(self, color_effect):
+        """
+        Transform the colormap with the color effect (e.g., HLSModify), which
+        is only valid for the colormapped (2d) data. See `colormap_effect`.
+        """
+        from .colormap_effect import set_colormap_effect
+
+        set_colormap_effect(self, color_effect)
+
     def _convert_data(self, data, alpha=None):
         return data, alpha
 
@@ -264,7 +281,7 @@ class TransformedBboxBase(BboxImage):
         if self._imcache is None:
             A = self._A
             self._imcache = self.to_rgba(A, bytes=True, norm=(A.ndim == 2))
-            if not(len(A.shape) == 3 and A.shape[-1] == 4):
+            if not (len(A.shape) == 3 and A.shape[-1] == 4):
                 # FIXME to_rgba returns alpha of 1?
                 alpha = self.get_alpha()
                 self._imcache[..., -1] = 255 * (1 if alpha is None else alpha)
@@ -275,22 +292,38 @@ class TransformedBboxBase(BboxImage):
 
         # we simply clip the indices between 0 and n-1. Thus the coordinates
         # outside the box will have a color of nearby pixel, not NA.
-        ij2 = np.clip(ij, [0, 0], [nx-1, ny-1])
+        ij2 = np.clip(ij, [0, 0], [nx - 1, ny - 1])
 
         colors = self._imcache[ij2[:, 1], ij2[:, 0]]
         return colors
 
-    def _make_image(self, A, in_bbox, out_bbox, clip_bbox, magnification=1, unsampled=False, round_to_pixel_border=True):
-        im = super()._make_image(A, in_bbox, out_bbox,
-                                 clip_bbox, magnification, unsampled, round_to_pixel_border)
+    def _make_image(
+        self,
+        A,
+        in_bbox,
+        out_bbox,
+        clip_bbox,
+        magnification=1,
+        unsampled=False,
+        round_to_pixel_border=True,
+    ):
+        im = super()._make_image(
+            A,
+            in_bbox,
+            out_bbox,
+            clip_bbox,
+            magnification,
+            unsampled,
+            round_to_pixel_border,
+        )
 
         if self._blend_color:
             blend_color = np.array(mcolors.to_rgb(self._blend_color)) * 255
             d = im[0]
             alpha = d[..., 3:] / 255
-            d2  = np.zeros_like(d)
+            d2 = np.zeros_like(d)
             d2[..., 3] = 255
-            d2[..., :3] = (d[..., :3] * alpha) + blend_color*(1-alpha)
+            d2[..., :3] = (d[..., :3] * alpha) + blend_color * (1 - alpha)
             return d2, *im[1:]
 
         else:
@@ -299,15 +332,15 @@ class TransformedBboxBase(BboxImage):
 
 class ImageBox(TransformedBboxBase):
     def __init__(
-            self,
-            data,
-            alpha=None,
-            shape=None,
-            extent=None,
-            bbox=None,
-            coords="data",
-            axes=None,
-            **im_kw,
+        self,
+        data,
+        alpha=None,
+        shape=None,
+        extent=None,
+        bbox=None,
+        coords="data",
+        axes=None,
+        **im_kw,
     ):
         """
         data: 2d-ndarray, directional string (up, down, right, left), interp-string ('0. > 0.5 > 0.)
@@ -418,8 +451,7 @@ class ColorBoxBase(ABC, TransformedBboxBase):
         self._update_A_alpha(alpha)
 
     @abstractmethod
-    def get_color(self):
-        ...
+    def get_color(self): ...
 
     def _update_A_rgb(self, color):
         rgb = mcolors.to_rgb(color)
@@ -6,42 +6,241 @@ import scipy.ndimage as NI
 
 import matplotlib.colors as mcolors
 
+from . import blur_helper
+from . import morphology_helper
+from . import hls_helper
+from . import color_matrix as CM
+
+_DTYPE_POLICIES = [None, np.dtype("float64"), np.dtype("float32"), np.dtype("uint8")]
+
+
+def convert_image_dtype(img, dtype):
+    """
+    Convert the image to the given dtype. The float image has values
+    between 0 and 1, while the uint8 image has values between 0 and 255.
+    """
+    dtype = np.dtype(dtype)
+    if img.dtype == dtype:
+        return img
+    elif dtype.kind == "u":
+        return np.asarray(img * 255.0, dtype)
+    elif img.dtype.kind == "u":
+        return np.divide(img, 255.0, dtype=dtype)
+    else:
+        return img.astype(dtype)
+
+
+def pad_image(img, pad_width, rgb_fill, alpha_fill):
+    """
+    Pad the rgba image. Similar to np.pad with "constant" mode, but the rgb and
+    the alpha channels are filled with different values and the result is
+    written to a single preallocated array.
+
+    pad_width : ((before, after), (before, after)) for the 1st and 2nd axes.
+    """
+    (r0, r1), (c0, c1) = pad_width
+    ny, nx, nc = img.shape
+
+    fill = np.empty(nc)
+    fill[:3] = rgb_fill
+    fill[3:] = alpha_fill
+    fill = convert_image_dtype(fill, img.dtype)
+
+    out = np.empty((ny + r0 + r1, nx + c0 + c1, nc), dtype=img.dtype)
+    out[:r0] = fill
+    out[r0 + ny :] = fill
+    out[r0 : r0 + ny, :c0] = fill
+    out[r0 : r0 + ny, c0 + nx :] = fill
+    out[r0 : r0 + ny, c0 : c0 + nx] = img
+
+    return out
+
 
 class ImageEffectBase(ABC):
+    # dtype policy of the image effect. If None, the image is processed as
+    # float64 (without any conversion between the effects).
+    dtype = None
+
+    # True if the effect can process the uint8 image.
+    uint8_ok = False
+
+    # The alpha representation that the effect expects, "straight",
+    # "premultiplied" or "any". This is only considered by the chain with the
+    # premultiplied policy (see `ChainedImageEffect.set_premultiplied`).
+    alpha_mode = "straight"
+
     @abstractmethod
-    def process_image(self, dpi, scale_factor, x, y, img):
-        ...
+    def process_image(self, dpi, scale_factor, x, y, img): ...
+
+    def get_halo(self, dpi, scale_factor):
+        """
+        Return the halo (ny, nx) in pixels, i.e., a pixel of the processed
+        image only depends on the pixels of the input image within the halo,
+        and the image is not resized. None if the effect does not have a
+        finite halo (the image cannot be processed in tiles).
+        """
+        return None
+
+    def get_input_dtype(self):
+        """
+        Return the dtype of the image that the effect expects.
+        """
+        if self.dtype is None:
+            return np.dtype("float64")
+        elif self.dtype.kind == "u" and not self.uint8_ok:
+            return np.dtype("float32")
+        else:
+            return self.dtype
 
 
 class ChainableImageEffect(ImageEffectBase):
     def __or__(self, other):
         return ChainedImageEffect(self, other)
 
+    def set_dtype(self, dtype):
+        """
+        Set the dtype policy of the effect. Supported values are
+
+        - None : legacy behavior. The image is processed in float64.
+        - "float64" or "float32" : the image is processed in the given dtype.
+        - "uint8" : the image stays in uint8 as long as the effects can
+          process it (e.g., `Offset`, `Pad`, `Dilation`, `Erosion`), and
+          is converted to float32 otherwise.
+
+        Returns the effect itself.
+        """
+        dtype = None if dtype is None else np.dtype(dtype)
+        if dtype not in _DTYPE_POLICIES:
+            raise ValueError(f"Unsupported dtype: {dtype}")
+
+        self.dtype = dtype
+        return self
+
 
 class ChainedImageEffect(ChainableImageEffect):
+    # premultiplied-alpha policy of the chain.
+    premultiplied = False
+
     def __init__(self, ie1: ChainableImageEffect, ie2: ChainableImageEffect):
         if isinstance(ie1, ChainedImageEffect):
             self._ie_list = ie1._ie_list + [ie2]
+            self.dtype = ie1.dtype
+            self.premultiplied = ie1.premultiplied
         else:
             self._ie_list = [ie1, ie2]
+            self.dtype = ie1.dtype
+
+    def set_premultiplied(self, premultiplied=True):
+        """
+        Set the premultiplied-alpha policy of the chain. If True, the image
+        is premultiplied before the effects that expect the premultiplied
+        alpha (e.g., `Gaussian` that blurs all the channels, which otherwise
+        bleeds the color of the transparent pixels), and converted back to
+        the straight alpha before the effects that expect it and at the end
+        of the chain. Thus, the conversion only happens at the boundaries of
+        the runs of the effects. If False (default), no conversion is done.
+
+        Returns the effect itself.
+        """
+        self.premultiplied = premultiplied
+        return self
+
+    @property
+    def uint8_ok(self):
+        return all(ie.uint8_ok for ie in self._ie_list)
+
+    def get_halo(self, dpi, scale_factor):
+        hy, hx = 0, 0
+        for ie in self._ie_list:
+            halo = ie.get_halo(dpi, scale_factor)
+            if halo is None:
+                return None
+            hy, hx = hy + halo[0], hx + halo[1]
+
+        return hy, hx
+
+    def compile(self, alpha_plane=True):
+        """
+        Return the compiled version of the chain, which folds the consecutive
+        offsets and pads, fuses fills and alpha modifications, and avoids
+        copying the image. If alpha_plane is True, the chain that only
+        modifies the alpha channel runs on the alpha plane. See
+        `image_effect_compiler`.
+        """
+        from .image_effect_compiler import CompiledImageEffect
+
+        return CompiledImageEffect(self, alpha_plane=alpha_plane)
+
+    def get_input_dtype(self):
+        # The conversion is done in process_image for each effect.
+        if self.dtype is None:
+            return np.dtype("float64")
+        else:
+            return self.dtype
+
+    def _convert_dtype(self, ie, img):
+        if self.dtype is None:
+            return img
+        elif self.dtype.kind == "u":
+            # once converted to float, we do not convert back to uint8.
+            if img.dtype.kind == "u" and not ie.uint8_ok:
+                return convert_image_dtype(img, "float32")
+            return img
+        else:
+            return convert_image_dtype(img, self.dtype)
+
+    def _convert_alpha(self, ie, img, premultiplied):
+        """
+        Return the image converted to the alpha representation of the effect,
+        and whether the returned image is premultiplied.
+        """
+        alpha_mode = ie.alpha_mode
+        if (
+            not self.premultiplied
+            or alpha_mode == "any"
+            or (alpha_mode == "premultiplied") == premultiplied
+        ):
+            return img, premultiplied
+
+        if alpha_mode == "premultiplied":
+            if img.dtype.kind == "u":
+                img = convert_image_dtype(img, "float32")
+            return _premultiply(img), True
+        else:
+            # the image is a copy made by _premultiply, thus can be modified
+            # in place.
+            return _unpremultiply(img), False
 
     def process_image(self, dpi, scale_factor, x, y, img):
+        premultiplied = False
         for ie in self._ie_list:
+            img = self._convert_dtype(ie, img)
+            img, premultiplied = self._convert_alpha(ie, img, premultiplied)
             dpi, scale_factor, x, y, img = ie.process_image(
                 dpi, scale_factor, x, y, img
             )
 
+        if premultiplied:
+            img = _unpremultiply(img)
+
         return dpi, scale_factor, x, y, img
 
 
 class Offset(ChainableImageEffect):
     """translate the image by the given offset"""
+
+    uint8_ok = True
+    alpha_mode = "any"
+
     def __init__(self, ox, oy):
         "ox, oy in points (72 dpi)"
         super().__init__()
         self.ox = ox
         self.oy = oy
 
+    def get_halo(self, dpi, scale_factor):
+        return 0, 0
+
     def process_image(self, dpi, scale_factor, x, y, img):
         return (
             dpi,
@@ -54,20 +253,27 @@ class Offset(ChainableImageEffect):
 
 class Fill(ChainableImageEffect):
     """fill the rgb chanell with given color. alpha channel is not affected"""
+
+    uint8_ok = True
+
     def __init__(self, c):
         "ox, oy in points (72 dpi)"
         super().__init__()
         self.c = c
 
+    def get_halo(self, dpi, scale_factor):
+        return 0, 0
+
     def process_image(self, dpi, scale_factor, x, y, img):
         img = img.copy()
-        img[:, :, :3] = mcolors.to_rgb(self.c)
+        img[:, :, :3] = convert_image_dtype(np.array(mcolors.to_rgb(self.c)), img.dtype)
         return dpi, scale_factor, x, y, img
 
 
 class AlphaAxb(ChainableImageEffect):
     """Modify the alpha channel by element-wise operation of 'a * c + b' where
     a, b is given and c is a alpha value from the image."""
+
     def __init__(self, alpha_ab):
         "ox, oy in points (72 dpi)"
         super().__init__()
@@ -76,6 +282,9 @@ class AlphaAxb(ChainableImageEffect):
     def get_pad(self):
         return 0
 
+    def get_halo(self, dpi, scale_factor):
+        return 0, 0
+
     def process_image(self, dpi, scale_factor, x, y, img):
         img2 = img.copy()
         a, b = self.alpha_ab
@@ -84,8 +293,92 @@ class AlphaAxb(ChainableImageEffect):
         return dpi, scale_factor, x, y, img2
 
 
+class ImageColorBase(ChainableImageEffect):
+    """
+    A base class for the effects that modify the color of each pixel (in
+    straight alpha). Subclasses should override `_process_colors`, which
+    modifies the float image in place. The dtype of the image (e.g.,
+    float32) is preserved.
+    """
+
+    def get_halo(self, dpi, scale_factor):
+        return 0, 0
+
+    @abstractmethod
+    def _process_colors(self, img): ...
+
+    def process_image(self, dpi, scale_factor, x, y, img):
+        # The image is modified in place, same as ImageConvBase.
+        self._process_colors(img)
+        return dpi, scale_factor, x, y, img
+
+
+class ColorMatrix(ImageColorBase):
+    """
+    Modify the rgb channels with a predefined color matrix. Supported matrix
+    are 'grayscale', 'sepia', 'nightvision', 'warm' and 'cool'. Same as
+    ColorMatrix of the path effects.
+    """
+
+    color_matrix = CM._get_matrix()
+
+    def __init__(self, kind):
+        super().__init__()
+        self._kind = kind
+        self._m = self.color_matrix[kind]
+
+    def _process_colors(self, img):
+        rgb = img[..., :3]
+        np.clip(rgb @ self._m.T.astype(img.dtype), 0, 1, out=rgb)
+
+
+class HLSaxb(ImageColorBase):
+    """
+    Modify the color in HLS space. Given a tuple of (a, b), the new color is
+    defined as h' = a * h + b, and so on. Same as HLSaxb of the path effects.
+    """
+
+    def __init__(
+        self, h_ab=(1, 0), l_ab=(1, 0), s_ab=(1, 0), alpha_ab=(1, 0), clip_mode="clip"
+    ):
+        super().__init__()
+        self._modifier = hls_helper.HLSModify_axb(
+            h_ab, l_ab, s_ab, alpha_ab, clip_mode=clip_mode
+        )
+
+    def _process_colors(self, img):
+        hls = hls_helper.rgb_to_hls(img[..., :3])
+        hls, alpha = self._modifier.apply_to_hls(hls, img[..., 3])
+        img[..., :3] = hls_helper.hls_to_rgb(hls)
+        img[..., 3] = alpha
+
+
+class HLSModify(HLSaxb):
+    """
+    Modify the color in HLS space. Same as HLSModify of the path effects.
+    """
+
+    def __init__(
+        self,
+        h="100%",
+        l="100%",
+        s="100%",
+        alpha="100%",
+        dh=0,
+        dl=0,
+        ds=0,
+        dalpha=0,
+        clip_mode="clip",
+    ):
+        h, l, s, alpha = hls_helper.get_hls_ab(h, l, s, alpha, dh, dl, ds, dalpha)
+        super().__init__(h_ab=h, l_ab=l, s_ab=s, alpha_ab=alpha, clip_mode=clip_mode)
+
+
 class Pad(ChainableImageEffect):
     """pad the image by given numberof pixels."""
+
+    uint8_ok = True
+
     def __init__(self, pad, pady=None, *, rgb_fill=1.0, alpha_fill=0.0):
         "ox, oy in points (72 dpi)"
         super().__init__()
@@ -100,21 +393,12 @@ class Pad(ChainableImageEffect):
 
     def process_image(self, dpi, scale_factor, x, y, img):
 
-        scale_factor1 = dpi / 72. * scale_factor
+        scale_factor1 = dpi / 72.0 * scale_factor
 
         padx_, pady_ = self.get_pad()
         pads = int(padx_ * scale_factor1), int(pady_ * scale_factor1)
 
-        img_rgb = np.pad(
-            img[:, :, :3],
-            [pads, pads, (0, 0)],
-            "constant",
-            constant_values=self.rgb_fill,
-        )
-        img_alpha = np.pad(
-            img[:, :, 3], [pads, pads], "constant", constant_values=self.alpha_fill
-        )
-        tgt_image = np.concatenate([img_rgb, img_alpha[:, :, np.newaxis]], axis=-1)
+        tgt_image = pad_image(img, [pads, pads], self.rgb_fill, self.alpha_fill)
 
         return dpi, scale_factor, x - pads[0], y - pads[1], tgt_image
 
@@ -137,33 +421,140 @@ class ImageConvBase(ChainableImageEffect):
 
         return size
 
-    def _process_image(self, img, size):
-        return NI.grey_dilation(img, size)
+    def _process_image(self, img, size, output=None):
+        return NI.grey_dilation(img, size, output=output)
+
+    def _get_radius(self, size):
+        return None
+
+    def get_halo(self, dpi, scale_factor):
+        scale_factor1 = dpi / 72.0 * scale_factor
+        size = self._get_scaled_size(self.size, scale_factor1)
+        radius = self._get_radius(size)
+        return None if radius is None else tuple(radius[:2])
 
     def process_image(self, dpi, scale_factor, x, y, img):
 
-        scale_factor1 = dpi / 72. * scale_factor
+        scale_factor1 = dpi / 72.0 * scale_factor
         size = self._get_scaled_size(self.size, scale_factor1)
         cs = self.channel_slice
-        img[..., cs] = self._process_image(img[..., cs], size=size)
+        # The image is modified in place. The filters write their result
+        # directly to the image if possible, so that a padded image (e.g.,
+        # Pad | Gaussian) is not copied again.
+        target = img[..., cs]
+        out = self._process_image(target, size=size, output=target)
+        if out is not target:
+            target[...] = out
 
         return dpi, scale_factor, x, y, img
 
 
-class Dilation(ImageConvBase):
-    """grey dilation of the image """
-    def _process_image(self, img, size):
-        return NI.grey_dilation(img, size)
+class MorphologyBase(ImageConvBase):
+    uint8_ok = True
 
+    def __init__(
+        self,
+        size,
+        channel_slice=slice(3, None),
+        shape="square",
+        method="exact",
+        threshold=None,
+    ):
+        """
+        shape: shape of the structuring element, "square" or "disk". For the
+        "disk", size is its diameter.
+
+        method: one of "exact", "edt" and "auto", which is only used for the
+        disk. The cost of "edt" (distance transform) is independent of the
+        size, and its result is identical to the "exact" one for binary
+        images. See `morphology_helper` for the details.
+
+        threshold: radius in pixels above which the "auto" method switches
+        from "exact" to "edt".
+        """
+        super().__init__(size, channel_slice=channel_slice)
+        if shape not in morphology_helper.MORPHOLOGY_SHAPES:
+            raise ValueError(f"Unknown shape: {shape}")
+        if method not in morphology_helper.MORPHOLOGY_METHODS:
+            raise ValueError(f"Unknown method: {method}")
+        self.shape = shape
+        self.method = method
+        self.threshold = threshold
+
+
+class Dilation(MorphologyBase):
+    """grey dilation of the image"""
+
+    def _get_radius(self, size):
+        return morphology_helper.get_radius(
+            size,
+            shape=self.shape,
+            method=self.method,
+            threshold=self.threshold,
+            dilation=True,
+        )
+
+    def _process_image(self, img, size, output=None):
+        return morphology_helper.grey_dilation(
+            img,
+            size,
+            shape=self.shape,
+            method=self.method,
+            threshold=self.threshold,
+            output=output,
+        )
+
+
+class Erosion(MorphologyBase):
+    """grey erosion of the image"""
 
-class Erosion(ImageConvBase):
-    """grey erosion of the image """
-    def _process_image(self, img, size):
-        return NI.grey_erosion(img, size)
+    def _get_radius(self, size):
+        return morphology_helper.get_radius(
+            size,
+            shape=self.shape,
+            method=self.method,
+            threshold=self.threshold,
+            dilation=False,
+        )
+
+    def _process_image(self, img, size, output=None):
+        return morphology_helper.grey_erosion(
+            img,
+            size,
+            shape=self.shape,
+            method=self.method,
+            threshold=self.threshold,
+            output=output,
+        )
 
 
 class Gaussian(ImageConvBase):
-    """gaussian smoothed image """
+    """gaussian smoothed image"""
+
+    def __init__(
+        self, size, channel_slice=slice(3, None), method="exact", threshold=None
+    ):
+        """
+        method: blur engine, one of "exact", "box3", "iir", "fft" and "auto".
+        For large size, "box3" and "iir" have a cost independent of the size,
+        at the expense of the accuracy. See `blur_helper`.
+
+        threshold: sigma in pixels above which the "auto" method switches
+        from "exact" to "box3".
+        """
+        super().__init__(size, channel_slice=channel_slice)
+        if method != "auto" and method not in blur_helper.BLUR_METHODS:
+            raise ValueError(f"Unknown method: {method}")
+        self.method = method
+        self.threshold = threshold
+
+    @property
+    def alpha_mode(self):
+        # The premultiplied alpha is only relevant if the colors are blurred
+        # together with the alpha.
+        if len(range(4)[self.channel_slice]) == 4:
+            return "premultiplied"
+        return "straight"
 
     def _get_scaled_size(self, size, scale_factor):
         if isinstance(size, Sequence):
@@ -176,11 +567,112 @@ class Gaussian(ImageConvBase):
 
         return size
 
-    def _process_image(self, img, size):
-        return NI.gaussian_filter(img, size)
+    def _get_radius(self, size):
+        return blur_helper.get_radius(
+            size, method=self.method, threshold=self.threshold
+        )
+
+    def _process_image(self, img, size, output=None):
+        return blur_helper.gaussian_filter(
+            img, size, method=self.method, threshold=self.threshold, output=output
+        )
+
 
 GaussianBlur = Gaussian
 
+
+def _premultiply(img):
+    out = img.copy()
+    out[..., :3] *= img[..., 3:]
+    return out
+
+
+def _unpremultiply(img):
+    alpha = img[..., 3:]
+    np.divide(img[..., :3], alpha, out=img[..., :3], where=alpha > 0)
+    return img
+
+
+class Downsample(ChainableImageEffect):
+    """Run the given image effect on the image downsampled by the given
+    factor, and upsample (bilinear) the result. This is meant for the smooth
+    effects (e.g., Gaussian with large size) whose result has little
+    difference when calculated at a lower resolution."""
+
+    def __init__(self, image_effect, factor=4):
+        super().__init__()
+        self.image_effect = image_effect
+        self.factor = int(factor)
+
+    def _downsample(self, img):
+        f = self.factor
+        ny, nx, nc = img.shape
+        ny2, nx2 = -(-ny // f) * f, -(-nx // f) * f
+
+        # The colors are averaged with alpha as a weight, i.e., the image is
+        # premultiplied. The image is padded with transparent pixels to be a
+        # multiple of the factor.
+        padded = np.zeros((ny2, nx2, nc), dtype=img.dtype)
+        padded[:ny, :nx] = img
+        padded[..., :3] *= padded[..., 3:]
+
+        # sum over the rows first, which is faster than summing over the
+        # both axes at once.
+        small = padded.reshape(ny2 // f, f, nx2, nc).sum(axis=1)
+        small = small.reshape(ny2 // f, nx2 // f, f, nc).sum(axis=2)
+        small *= 1.0 / f**2
+
+        return _unpremultiply(small)
+
+    @staticmethod
+    def _get_linear_weights(n, f):
+        # the center of the i-th pixel of the upsampled image in the
+        # coordinate of the original one, so that each pixel covers the same
+        # area before and after the upsampling.
+        c = np.clip((np.arange(n * f) + 0.5) / f - 0.5, 0, n - 1)
+        i0 = np.floor(c).astype(int)
+        i1 = np.minimum(i0 + 1, n - 1)
+        w = (c - i0).astype(np.float32)
+        return i0, i1, w
+
+    def _upsample(self, img):
+        """bilinear upsampling of the image by the factor."""
+        out = _premultiply(img)
+        for axis in [0, 1]:
+            i0, i1, w = self._get_linear_weights(out.shape[axis], self.factor)
+            shape = [1, 1, 1]
+            shape[axis] = -1
+            w = w.reshape(shape)
+            out0 = np.take(out, i0, axis=axis)
+            out1 = np.take(out, i1, axis=axis)
+            out1 -= out0
+            out1 *= w
+            out0 += out1
+            out = out0
+
+        return _unpremultiply(out)
+
+    def process_image(self, dpi, scale_factor, x, y, img):
+        f = self.factor
+        if f == 1 or img.size == 0:
+            return self.image_effect.process_image(dpi, scale_factor, x, y, img)
+
+        if img.dtype.kind == "u":
+            img = convert_image_dtype(img, "float32")
+
+        # The downsampled image has 1/f pixels per unit. For the image effect
+        # to calculate its size in pixels correctly, the scale_factor is
+        # reduced by f, while the dpi (of the renderer) is kept.
+        dpi, scale_factor, x, y, small = self.image_effect.process_image(
+            dpi, scale_factor / f, x / f, y / f, self._downsample(img)
+        )
+
+        if small.dtype.kind == "u":
+            small = convert_image_dtype(small, img.dtype)
+
+        return dpi, scale_factor * f, x * f, y * f, self._upsample(small)
+
+
 class LightSourceBase(ChainableImageEffect):
     def __init__(
         self, fraction=1, vert_exag=1, blend_mode="overlay", azdeg=315, altdeg=45
@@ -192,8 +684,7 @@ class LightSourceBase(ChainableImageEffect):
         self.vert_exag = vert_exag
 
     @abstractmethod
-    def get_elev(self, dpi, scale_factor, x, y, img):
-        ...
+    def get_elev(self, dpi, scale_factor, x, y, img): ...
 
     def process_image(self, dpi, scale_factor, x, y, img):
 
@@ -210,13 +701,14 @@ class LightSourceBase(ChainableImageEffect):
             vert_exag=self.vert_exag,
             blend_mode=self.blend_mode,
         )
-        out = np.concatenate([rgb2, img[:, :, 3:]], -1)
+        out = np.concatenate([rgb2.astype(img.dtype, copy=False), img[:, :, 3:]], -1)
         return dpi, scale_factor, x, y, out
 
 
 class LightSource(LightSourceBase):
     """apply lightsource effect to the image using its alpha channel (gaussian
     smoothed) as elevation"""
+
     def __init__(
         self,
         erosion_size=3,
@@ -239,7 +731,7 @@ class LightSource(LightSourceBase):
         self.gaussian_size = gaussian_size
 
     def get_elev(self, dpi, scale_factor, x, y, img):
-        scale_factor = dpi / 72. * scale_factor
+        scale_factor = dpi / 72.0 * scale_factor
         elev = img[:, :, -1]
 
         size = int(self.erosion_size * scale_factor)
@@ -254,6 +746,7 @@ class LightSource(LightSourceBase):
 class LightSourceSharp(LightSourceBase):
     """apply lightsource effect to the image. The elevation is calculated by
     the distance transform of the alpha channel."""
+
     def __init__(
         self,
         dist_max=None,
@@ -276,7 +769,7 @@ class LightSourceSharp(LightSourceBase):
         self.dist_min = dist_min
 
     def get_elev(self, dpi, scale_factor, x, y, img):
-        scale_factor = dpi / 72. * scale_factor
+        scale_factor = dpi / 72.0 * scale_factor
         elev = img[:, :, -1]
 
         elev = NI.distance_transform_edt(elev)
@@ -287,5 +780,3 @@ class LightSourceSharp(LightSourceBase):
         elev = np.clip(elev, int(self.dist_min * scale_factor), size)
 
         return elev
-
-
@@ -0,0 +1,157 @@
+"""
+Batched processing of ImageEffect on a thread pool.
+
+Normally, each `ImageEffect` renders its artist offscreen, processes the image
+and draws it, one after another in the draw loop of the figure.
+`ImageEffectBatch` is an artist that draws the given artists (in the order of
+their zorder), and the processing of their images (`process_image` of the
+image effects, which mostly runs in numpy and scipy.ndimage without the GIL)
+is submitted to a thread pool ::
+
+    bars = ax.bar(x, y, path_effects=[ImageEffect(shadow), Normal()])
+    for b in bars:
+        b.remove()  # drawn by the batch instead.
+    ax.add_artist(ImageEffectBatch(bars, max_workers=8))
+
+For the lines, patches and collections, the drawing of their other path
+effects is deferred, and all the drawings are done in order when the images
+are processed. Other artists are drawn after the pending ones. Each job
+processes the image with a copy of the image effect.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import matplotlib.patheffects as mpatheffects
+from matplotlib.artist import Artist
+from matplotlib.collections import Collection
+from matplotlib.lines import Line2D
+from matplotlib.patches import Patch
+
+__all__ = ["ImageEffectBatch", "get_current_batch"]
+
+_local = threading.local()
+
+
+def get_current_batch():
+    "Return the ImageEffectBatch being drawn in this thread, or None."
+    return getattr(_local, "batch", None)
+
+
+class _DeferredPathEffect(mpatheffects.AbstractPathEffect):
+    # The path effect whose drawing is deferred until the pending images of
+    # the batch are drawn.
+    def __init__(self, batch, path_effect):
+        super().__init__()
+        self._batch = batch
+        self._path_effect = path_effect
+
+    def draw_path(self, renderer, gc, tpath, affine, rgbFace=None):
+        # The gc is copied as it can be modified before the path is drawn.
+        gc0 = renderer.new_gc()
+        gc0.copy_properties(gc)
+        affine = affine.frozen()
+
+        def draw(_):
+            self._path_effect.draw_path(renderer, gc0, tpath, affine, rgbFace)
+            gc0.restore()
+
+        self._batch.submit(None, draw)
+
+
+class ImageEffectBatch(Artist):
+    def __init__(self, artists, max_workers=None, max_pending=None, **kw):
+        """
+        artists: a list of artists to be drawn by the batch. They should not
+        be drawn otherwise, e.g., remove them from the axes.
+
+        max_workers: number of the threads. Default is that of
+        `concurrent.futures.ThreadPoolExecutor`.
+
+        max_pending: maximum number of the pending images. If exceeded, the
+        pending images are drawn. Default is no limit.
+        """
+        super().__init__(**kw)
+        self._artists = list(artists)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+
+        self._executor = None
+        self._pending = []
+
+        if self._artists:
+            self.set_zorder(max(a.get_zorder() for a in self._artists))
+
+    def set_figure(self, fig):
+        super().set_figure(fig)
+        for a in self._artists:
+            a.set_figure(fig)
+
+    def submit(self, func, callback):
+        """
+        Run *func* (without arguments) on the thread pool. Its result is
+        passed to *callback* in the main thread, in the order of submission.
+        If func is None, None is passed.
+        """
+        future = None if func is None else self._executor.submit(func)
+        self._pending.append((future, callback))
+
+        if self.max_pending is not None and len(self._pending) > self.max_pending:
+            self.flush()
+
+    def flush(self):
+        "Wait for the pending jobs and draw their results in order."
+        pending, self._pending = self._pending, []
+        for future, callback in pending:
+            callback(None if future is None else future.result())
+
+    def _draw_deferred(self, artist, renderer):
+        from .patheffects_image_effect import ImageEffect
+
+        path_effects = artist.get_path_effects()
+        # The agg filter and the rasterization apply to what is drawn within
+        # the draw of the artist.
+        if (
+            not path_effects
+            or artist.get_agg_filter() is not None
+            or artist.get_rasterized()
+        ):
+            self.flush()
+            artist.draw(renderer)
+            return
+
+        # The path effects are swapped directly, not to make the artist
+        # stale.
+        artist._path_effects = [
+            pe if isinstance(pe, ImageEffect) else _DeferredPathEffect(self, pe)
+            for pe in path_effects
+        ]
+        _local.batch = self
+        try:
+            artist.draw(renderer)
+        finally:
+            _local.batch = None
+            artist._path_effects = path_effects
+
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+
+        artists = sorted(self._artists, key=lambda a: a.get_zorder())
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            for a in artists:
+                if isinstance(a, (Line2D, Patch, Collection)):
+                    self._draw_deferred(a, renderer)
+                else:
+                    self.flush()
+                    a.draw(renderer)
+
+            self.flush()
+        finally:
+            self._pending = []
+            self._executor.shutdown()
+            self._executor = None
+
+        self.stale = False
@@ -0,0 +1,199 @@
+"""
+Content-addressed cache for the results of ImageEffect.
+
+The key of the cache is a hash of everything that determines the processed
+image : the path (vertices and codes), the affine, the state of the gc, the
+fill color, the renderer (dpi and canvas size), and the fingerprint of the
+image effect (and the path effect that comes before the ImageEffect). Thus,
+a cached image is only reused when nothing has changed.
+
+The cache is opt-in ::
+
+    cache = ImageEffectCache(max_bytes=64 * 2**20)
+    pe = ImageEffect(Pad(10) | Gaussian(5), cache=cache)
+
+"""
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from matplotlib.artist import Artist
+from matplotlib.path import Path
+from matplotlib.transforms import Affine2DBase, BboxBase, Transform
+
+__all__ = ["ImageEffectCache", "Uncacheable", "get_fingerprint"]
+
+
+class Uncacheable(Exception):
+    """Raised if the fingerprint of an object cannot be determined."""
+
+
+def _hash_array(a):
+    a = np.ascontiguousarray(a)
+    return hashlib.blake2b(a.tobytes(), digest_size=16).hexdigest()
+
+
+def get_fingerprint(o, _depth=0):
+    """
+    Return a canonical (and hashable) representation of the given object,
+    which is the image effect or the path effect. Objects are represented by
+    their class and their attributes. Objects whose state cannot be
+    determined, e.g., artists, non-affine transforms and functions, raise
+    Uncacheable.
+    """
+    if _depth > 32:
+        raise Uncacheable("object is too deeply nested")
+
+    depth = _depth + 1
+
+    if o is None or isinstance(o, (bool, int, float, complex, str, bytes)):
+        return o
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, (tuple, list)):
+        return (type(o).__name__,) + tuple(get_fingerprint(o1, depth) for o1 in o)
+    if isinstance(o, dict):
+        return ("dict",) + tuple(
+            (str(k), get_fingerprint(v, depth))
+            for k, v in sorted(o.items(), key=lambda kv: str(kv[0]))
+        )
+    if isinstance(o, np.ndarray):
+        return ("ndarray", o.dtype.str, o.shape, _hash_array(o))
+    if isinstance(o, slice):
+        return ("slice", o.start, o.stop, o.step)
+    if isinstance(o, np.dtype):
+        return ("dtype", o.str)
+    if isinstance(o, Path):
+        return (
+            "path",
+            get_fingerprint(o.vertices, depth),
+            get_fingerprint(o.codes, depth),
+        )
+    if isinstance(o, Affine2DBase):
+        return ("affine", get_fingerprint(o.get_matrix(), depth))
+    if isinstance(o, BboxBase):
+        return ("bbox", tuple(o.extents))
+    if isinstance(o, (Artist, Transform)) or callable(o):
+        raise Uncacheable(f"cannot fingerprint {type(o).__name__}")
+    if hasattr(o, "__dict__"):
+        return (type(o).__qualname__, get_fingerprint(vars(o), depth))
+
+    raise Uncacheable(f"cannot fingerprint {type(o).__name__}")
+
+
+def get_gc_fingerprint(gc):
+    """Return the fingerprint of the properties of the gc that affect the
+    rendering."""
+    clip_path, clip_affine = gc.get_clip_path()
+    props = (
+        gc.get_linewidth(),
+        gc.get_rgb(),
+        gc.get_alpha(),
+        gc.get_forced_alpha(),
+        gc.get_antialiased(),
+        gc.get_capstyle(),
+        gc.get_joinstyle(),
+        gc.get_dashes(),
+        gc.get_hatch(),
+        gc.get_hatch_color(),
+        getattr(gc, "get_hatch_linewidth", lambda: None)(),
+        gc.get_sketch_params(),
+        gc.get_snap(),
+        gc.get_clip_rectangle(),
+        clip_path,
+        clip_affine,
+    )
+    return get_fingerprint(props)
+
+
+def get_renderer_fingerprint(renderer):
+    """Return the fingerprint of the renderer, i.e., its kind, dpi and the size
+    of the canvas."""
+    props = [
+        type(renderer).__name__,
+        renderer.dpi,
+        getattr(renderer, "_figdpi", None),
+        getattr(renderer, "width", None),
+        getattr(renderer, "height", None),
+    ]
+    if hasattr(renderer, "figure"):  # mixed backend
+        props.append(renderer.figure.get_size_inches())
+
+    return get_fingerprint(props)
+
+
+class ImageEffectCache:
+    def __init__(self, max_bytes=64 * 2**20):
+        """
+        max_bytes: maximum size of the cached images. The least recently used
+        images are discarded when the cap is exceeded.
+        """
+        self.max_bytes = max_bytes
+
+        self._cache = OrderedDict()
+        self._nbytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    def nbytes(self):
+        "total size of the cached images"
+        return self._nbytes
+
+    def get_key(self, *fingerprints):
+        "return a hash key from the given fingerprints"
+        return hashlib.blake2b(repr(fingerprints).encode(), digest_size=16).hexdigest()
+
+    def get(self, key):
+        """
+        Return the cached (dpi, scale_factor, x, y, img), or None if the key is
+        not in the cache.
+        """
+        r = self._cache.get(key)
+        if r is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._cache.move_to_end(key)
+
+        return r
+
+    def put(self, key, dpi, scale_factor, x, y, img):
+        """
+        Store the processed image. Note that the image is not copied and will
+        be shared, thus it should not be modified afterward.
+        """
+        nbytes = img.nbytes
+        if nbytes > self.max_bytes:
+            return
+
+        if key in self._cache:
+            self._nbytes -= self._cache.pop(key)[-1].nbytes
+
+        self._cache[key] = (dpi, scale_factor, x, y, img)
+        self._nbytes += nbytes
+
+        while self._nbytes > self.max_bytes:
+            _, r = self._cache.popitem(last=False)
+            self._nbytes -= r[-1].nbytes
+
+    def clear(self):
+        self._cache.clear()
+        self._nbytes = 0
+
+    def get_stats(self):
+        "return a dictionary of the cache statistics"
+        n = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / n if n else 0.0,
+            size=len(self._cache),
+            nbytes=self._nbytes,
+        )
@@ -0,0 +1,447 @@
+"""
+Compiler for ChainedImageEffect.
+
+The effects in a chain are run one by one, and many of them copy the whole
+image (e.g., `Fill`, `AlphaAxb`), while the others (`ImageConvBase` and
+`ImageColorBase`) modify the image in place. The compiler analyses the chain
+beforehand and replaces it with a list of steps, so that
+
+- consecutive `Offset`s are folded into a single one,
+- consecutive `Pad`s (with same fill values) are merged into a single
+  preallocated output,
+- consecutive `Fill`s and `AlphaAxb`s are fused into a single pass,
+- the image is copied at most once (if the input image is not owned by the
+  chain) and then modified in place,
+- if the chain only modifies the alpha channel and its colors are flat
+  filled by `Fill` (e.g., shadows and outlines), only the alpha plane is
+  carried through the chain, and the rgba image is synthesized at the end.
+
+Use `ChainedImageEffect.compile` ::
+
+    ie = (AlphaAxb((0.5, 0)) | Pad(10) | Fill("k") | Gaussian(3)).compile()
+    print(ie.get_report())
+
+"""
+
+import numpy as np
+import matplotlib.colors as mcolors
+
+from .image_effect import (
+    ChainableImageEffect,
+    ChainedImageEffect,
+    Offset,
+    Fill,
+    AlphaAxb,
+    Pad,
+    ImageConvBase,
+    ImageColorBase,
+    convert_image_dtype,
+    pad_image,
+    _unpremultiply,
+)
+
+__all__ = ["CompiledImageEffect", "compile_image_effect"]
+
+
+class _Step:
+    # True if the step can process the uint8 image.
+    uint8_ok = False
+
+    # alpha representation that the step expects.
+    alpha_mode = "straight"
+
+    # number of images that the original effects allocate.
+    n_alloc_orig = 0
+
+    def get_n_alloc(self, owned):
+        "number of images that the step allocates."
+        return 0
+
+    def process(self, dpi, scale_factor, x, y, img, owned):
+        """
+        Same as process_image, but with an additional flag of whether the
+        image is owned by the chain (and can be modified in place). Returns
+        the flag for the resulting image.
+        """
+        return dpi, scale_factor, x, y, img, owned
+
+
+class _OffsetStep(_Step):
+    uint8_ok = True
+    alpha_mode = "any"
+
+    def __init__(self, offsets):
+        self.ox = sum(o.ox for o in offsets)
+        self.oy = sum(o.oy for o in offsets)
+
+    def process(self, dpi, scale_factor, x, y, img, owned):
+        return (
+            dpi,
+            scale_factor,
+            x + scale_factor * self.ox,
+            y + scale_factor * self.oy,
+            img,
+            owned,
+        )
+
+    def __repr__(self):
+        return f"Offset({self.ox}, {self.oy})"
+
+
+class _PadStep(_Step):
+    uint8_ok = True
+
+    def __init__(self, pads):
+        self.pads = pads
+        self.rgb_fill = pads[0].rgb_fill
+        self.alpha_fill = pads[0].alpha_fill
+        self.n_alloc_orig = len(pads)
+
+    def get_n_alloc(self, owned):
+        return 1
+
+    def process(self, dpi, scale_factor, x, y, img, owned):
+        scale_factor1 = dpi / 72.0 * scale_factor
+
+        # To be consistent with the sequence of Pads, each pad is rounded
+        # separately.
+        pad0, pad1 = 0, 0
+        for p in self.pads:
+            padx_, pady_ = p.get_pad()
+            pad0 += int(padx_ * scale_factor1)
+            pad1 += int(pady_ * scale_factor1)
+
+        pads = pad0, pad1
+        img = pad_image(img, [pads, pads], self.rgb_fill, self.alpha_fill)
+
+        return dpi, scale_factor, x - pads[0], y - pads[1], img, True
+
+    def __repr__(self):
+        return "Pad({})".format(", ".join(str(p.get_pad()) for p in self.pads))
+
+
+class _FillAlphaStep(_Step):
+    def __init__(self, effects):
+        self.rgb = None
+        self.alpha_ab_list = []
+        for ie in effects:
+            # Fill only modifies the rgb channels and AlphaAxb only modifies
+            # the alpha channel. Thus, only the last Fill matters.
+            if isinstance(ie, Fill):
+                self.rgb = np.array(mcolors.to_rgb(ie.c))
+            else:
+                self.alpha_ab_list.append(ie.alpha_ab)
+
+        self.uint8_ok = not self.alpha_ab_list
+        self.n_alloc_orig = len(effects)
+
+    def get_n_alloc(self, owned):
+        return 0 if owned else 1
+
+    def process(self, dpi, scale_factor, x, y, img, owned):
+        if not owned:
+            img = img.copy()
+
+        if self.rgb is not None:
+            img[:, :, :3] = convert_image_dtype(self.rgb, img.dtype)
+
+        alpha = img[:, :, 3]
+        for a, b in self.alpha_ab_list:
+            alpha *= a
+            alpha += b
+            np.clip(alpha, 0, 1, out=alpha)
+
+        return dpi, scale_factor, x, y, img, True
+
+    def __repr__(self):
+        return f"FillAlpha({self.rgb}, {self.alpha_ab_list})"
+
+
+class _AlphaPlaneStep(_Step):
+    """
+    Step that runs the alpha-only effects on the alpha plane (of shape
+    (ny, nx, 1)) and fills the colors at the end.
+    """
+
+    def __init__(self, ie_list, chained):
+        self.ie_list = ie_list
+        self._chained = chained
+        # As in the other steps, every effect but Offset allocates an image.
+        self.n_alloc_orig = sum(1 for ie in ie_list if type(ie) is not Offset)
+
+    # The dtype of the plane is converted by the step itself, as in the
+    # chain.
+    uint8_ok = True
+
+    def get_n_alloc(self, owned):
+        # only the final rgba image, as the alpha plane is a quarter of it.
+        return 1
+
+    def _pad(self, ie, dpi, scale_factor, plane):
+        scale_factor1 = dpi / 72.0 * scale_factor
+        padx_, pady_ = ie.get_pad()
+        pads = int(padx_ * scale_factor1), int(pady_ * scale_factor1)
+        fill = convert_image_dtype(np.array([ie.alpha_fill], dtype=float), plane.dtype)[
+            0
+        ]
+        plane = np.pad(plane, [pads, pads, (0, 0)], constant_values=fill)
+        return pads, plane
+
+    def process(self, dpi, scale_factor, x, y, img, owned):
+        plane = img[..., 3:].copy()
+        rgb = None
+
+        for ie in self.ie_list:
+            # the dtype of the plane (and the color) is converted as in the
+            # chain.
+            plane1 = self._chained._convert_dtype(ie, plane)
+            if plane1.dtype != plane.dtype and rgb is not None:
+                rgb = convert_image_dtype(rgb, plane1.dtype)
+            plane = plane1
+
+            if isinstance(ie, Offset):
+                x += scale_factor * ie.ox
+                y += scale_factor * ie.oy
+            elif isinstance(ie, Pad):
+                pads, plane = self._pad(ie, dpi, scale_factor, plane)
+                x, y = x - pads[0], y - pads[1]
+            elif isinstance(ie, Fill):
+                rgb = convert_image_dtype(np.array(mcolors.to_rgb(ie.c)), plane.dtype)
+            elif isinstance(ie, AlphaAxb):
+                # the plane is owned by the step.
+                a, b = ie.alpha_ab
+                plane *= a
+                plane += b
+                np.clip(plane, 0, 1, out=plane)
+            else:
+                scale_factor1 = dpi / 72.0 * scale_factor
+                size = ie._get_scaled_size(ie.size, scale_factor1)
+                out = ie._process_image(plane, size=size, output=plane)
+                if out is not plane:
+                    plane[...] = out
+
+        out = np.empty(plane.shape[:2] + (4,), dtype=plane.dtype)
+        out[..., :3] = rgb
+        out[..., 3:] = plane
+
+        return dpi, scale_factor, x, y, out, True
+
+    def __repr__(self):
+        return "AlphaPlane({})".format(
+            " | ".join(type(ie).__name__ for ie in self.ie_list)
+        )
+
+
+def _is_alpha_only(ie):
+    if type(ie) in (Offset, Pad, Fill, AlphaAxb):
+        return True
+    return (
+        isinstance(ie, ImageConvBase)
+        and type(ie).process_image is ImageConvBase.process_image
+        and range(4)[ie.channel_slice] == range(3, 4)
+    )
+
+
+def _flatten(ie_list, dtype, premultiplied):
+    flat = []
+    for ie in ie_list:
+        if (
+            isinstance(ie, ChainedImageEffect)
+            and ie.dtype == dtype
+            and ie.premultiplied == premultiplied
+        ):
+            flat.extend(_flatten(ie._ie_list, dtype, premultiplied))
+        else:
+            flat.append(ie)
+    return flat
+
+
+def _get_alpha_plane_effects(chained):
+    """
+    Return the flattened list of the effects if the chain can be run on the
+    alpha plane, i.e., all the effects are alpha-only and the colors are
+    filled by `Fill` (without `Pad` after the last Fill, which pads the
+    colors). Otherwise, return None.
+    """
+    ie_list = _flatten(chained._ie_list, chained.dtype, chained.premultiplied)
+    if not all(_is_alpha_only(ie) for ie in ie_list):
+        return None
+
+    fills = [i for i, ie in enumerate(ie_list) if type(ie) is Fill]
+    if not fills:
+        return None
+    if any(type(ie) is Pad for ie in ie_list[fills[-1] :]):
+        return None
+
+    return ie_list
+
+
+class _EffectStep(_Step):
+    """Step that simply runs the image effect."""
+
+    n_alloc_orig = 1
+
+    def __init__(self, ie):
+        self.ie = ie
+        self.uint8_ok = ie.uint8_ok
+        self.alpha_mode = ie.alpha_mode
+
+        # ImageConvBase and ImageColorBase modify the image in place.
+        self._inplace = isinstance(ie, (ImageConvBase, ImageColorBase))
+
+    def get_n_alloc(self, owned):
+        if self._inplace and not owned:
+            return 2
+        return 1
+
+    def process(self, dpi, scale_factor, x, y, img, owned):
+        if self._inplace and not owned:
+            img = img.copy()
+            owned = True
+
+        img0 = img
+        dpi, scale_factor, x, y, img = self.ie.process_image(
+            dpi, scale_factor, x, y, img
+        )
+        owned = owned or not np.may_share_memory(img, img0)
+
+        return dpi, scale_factor, x, y, img, owned
+
+    def __repr__(self):
+        return f"Effect({type(self.ie).__name__})"
+
+
+def _compile_steps(ie_list, dtype, premultiplied):
+    steps = []
+
+    i, n = 0, len(ie_list)
+    while i < n:
+        ie = ie_list[i]
+        j = i + 1
+        if type(ie) is Offset:
+            while j < n and type(ie_list[j]) is Offset:
+                j += 1
+            steps.append(_OffsetStep(ie_list[i:j]))
+        elif type(ie) is Pad:
+            fill = (ie.rgb_fill, ie.alpha_fill)
+            while (
+                j < n
+                and type(ie_list[j]) is Pad
+                and (ie_list[j].rgb_fill, ie_list[j].alpha_fill) == fill
+            ):
+                j += 1
+            steps.append(_PadStep(ie_list[i:j]))
+        elif type(ie) in (Fill, AlphaAxb):
+            while j < n and type(ie_list[j]) in (Fill, AlphaAxb):
+                j += 1
+            steps.append(_FillAlphaStep(ie_list[i:j]))
+        elif (
+            isinstance(ie, ChainedImageEffect)
+            and ie.dtype == dtype
+            and ie.premultiplied == premultiplied
+        ):
+            # nested chain with the same policies is flattened.
+            steps.extend(_compile_steps(ie._ie_list, dtype, premultiplied))
+        else:
+            steps.append(_EffectStep(ie))
+        i = j
+
+    return steps
+
+
+class CompiledImageEffect(ChainableImageEffect):
+    """
+    Image effect that runs the compiled steps of a ChainedImageEffect. The
+    result is same as the original chain.
+    """
+
+    def __init__(self, chained: ChainedImageEffect, alpha_plane=True):
+        """
+        alpha_plane: if True, the chain that only modifies the alpha channel
+        is run on the alpha plane.
+        """
+        self._chained = chained
+        self.dtype = chained.dtype
+
+        ie_list = _get_alpha_plane_effects(chained) if alpha_plane else None
+        if ie_list is not None:
+            self._steps = [_AlphaPlaneStep(ie_list, chained)]
+        else:
+            self._steps = _compile_steps(
+                chained._ie_list, chained.dtype, chained.premultiplied
+            )
+
+    @property
+    def uint8_ok(self):
+        return all(step.uint8_ok for step in self._steps)
+
+    def get_input_dtype(self):
+        return self._chained.get_input_dtype()
+
+    def get_halo(self, dpi, scale_factor):
+        return self._chained.get_halo(dpi, scale_factor)
+
+    def _convert_dtype(self, step, img):
+        # same as ChainedImageEffect._convert_dtype
+        return self._chained._convert_dtype(step, img)
+
+    def _convert_alpha(self, step, img, premultiplied):
+        # same as ChainedImageEffect._convert_alpha
+        return self._chained._convert_alpha(step, img, premultiplied)
+
+    def get_report(self, owned=False):
+        """
+        Return a dictionary that summarizes the compilation : the number of
+        effects and steps, and the number of images allocated by the original
+        chain and the compiled one (without the dtype conversion).
+
+        owned : whether the input image is owned by the chain.
+        """
+        n_alloc_orig = sum(step.n_alloc_orig for step in self._steps)
+
+        # Except for the offset, the image is owned after each step.
+        n_alloc = 0
+        for step in self._steps:
+            n_alloc += step.get_n_alloc(owned)
+            owned = owned or not isinstance(step, _OffsetStep)
+
+        return dict(
+            n_effects=len(self._chained._ie_list),
+            n_steps=len(self._steps),
+            allocations_before=n_alloc_orig,
+            allocations_after=n_alloc,
+            allocations_saved=n_alloc_orig - n_alloc,
+        )
+
+    def process_image(self, dpi, scale_factor, x, y, img):
+        owned = False
+        premultiplied = False
+        for step in self._steps:
+            img1 = self._convert_dtype(step, img)
+            img1, premultiplied = self._convert_alpha(step, img1, premultiplied)
+            owned = owned or img1 is not img
+            img = img1
+
+            dpi, scale_factor, x, y, img, owned = step.process(
+                dpi, scale_factor, x, y, img, owned
+            )
+
+        if premultiplied:
+            img = _unpremultiply(img)
+
+        return dpi, scale_factor, x, y, img
+
+    def __repr__(self):
+        return "CompiledImageEffect({})".format(
+            " | ".join(repr(step) for step in self._steps)
+        )
+
+
+def compile_image_effect(ie):
+    """
+    Return the compiled version of the image effect if it is a
+    ChainedImageEffect. Otherwise, the effect is returned as is.
+    """
+    if isinstance(ie, ChainedImageEffect):
+        return CompiledImageEffect(ie)
+    return ie
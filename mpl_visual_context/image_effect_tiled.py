@@ -0,0 +1,113 @@
+"""
+Tiled, multi-threaded execution of image effects on large images.
+
+For a large figure (e.g., a poster), the image given to the image effect can
+be very large, and the filters of scipy.ndimage (e.g., gaussian_filter) run on
+a single thread with large temporary arrays. `TiledImageEffect` splits the
+image into tiles, extended by the halo of the effect (the radius of the blur,
+the size of the dilation, etc.), and processes them on a thread pool (the
+filters of scipy.ndimage release the GIL). The processed tiles, with their
+halos removed, are stitched together, and the result is identical to that of
+the untiled execution ::
+
+    ie = TiledImageEffect(Pad(10) | Gaussian(5), tile_size=1024)
+
+The effects need to declare their halo with `get_halo`. If any of the effects
+does not (e.g., it resizes the image like `Pad`, or its result depends on the
+whole image like `LightSource`), the image is processed without tiling. Thus,
+it is better to put effects like `Pad` out of the tiled effect ::
+
+    ie = Pad(10) | TiledImageEffect(Dilation(3) | Gaussian(5))
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .image_effect import ChainableImageEffect
+
+__all__ = ["TiledImageEffect"]
+
+
+def _get_tiles(ny, nx, tile_size):
+    return [
+        (y0, min(y0 + tile_size, ny), x0, min(x0 + tile_size, nx))
+        for y0 in range(0, ny, tile_size)
+        for x0 in range(0, nx, tile_size)
+    ]
+
+
+class TiledImageEffect(ChainableImageEffect):
+    def __init__(self, image_effect, tile_size=1024, max_workers=None):
+        """
+        image_effect: the image effect to be run on each tile.
+
+        tile_size: size of the tiles in pixels (without the halo). The image
+        that fits in a single tile is processed as is.
+
+        max_workers: number of the threads. Default is that of
+        `concurrent.futures.ThreadPoolExecutor`.
+        """
+        if tile_size < 1:
+            raise ValueError("tile_size must be positive")
+
+        self._image_effect = image_effect
+        self.tile_size = tile_size
+        self.max_workers = max_workers
+
+    @property
+    def uint8_ok(self):
+        return self._image_effect.uint8_ok
+
+    @property
+    def alpha_mode(self):
+        return self._image_effect.alpha_mode
+
+    def get_input_dtype(self):
+        return self._image_effect.get_input_dtype()
+
+    def get_halo(self, dpi, scale_factor):
+        return self._image_effect.get_halo(dpi, scale_factor)
+
+    def _process_tile(self, dpi, scale_factor, x, y, img, tile, halo):
+        y0, y1, x0, x1 = tile
+        hy, hx = halo
+        ny, nx = img.shape[:2]
+
+        ya, yb = max(y0 - hy, 0), min(y1 + hy, ny)
+        xa, xb = max(x0 - hx, 0), min(x1 + hx, nx)
+
+        # The tile is copied, as some effects modify the image in place.
+        r = self._image_effect.process_image(
+            dpi, scale_factor, x, y, img[ya:yb, xa:xb].copy()
+        )
+        return r[:4], r[4][y0 - ya : y1 - ya, x0 - xa : x1 - xa]
+
+    def process_image(self, dpi, scale_factor, x, y, img):
+        halo = self._image_effect.get_halo(dpi, scale_factor)
+        ny, nx = img.shape[:2]
+        if halo is None or (ny <= self.tile_size and nx <= self.tile_size):
+            return self._image_effect.process_image(dpi, scale_factor, x, y, img)
+
+        tiles = _get_tiles(ny, nx, self.tile_size)
+
+        # The first tile is processed beforehand to know the dtype and the
+        # number of channels of the result.
+        r0, t = self._process_tile(dpi, scale_factor, x, y, img, tiles[0], halo)
+        out = np.empty((ny, nx) + t.shape[2:], dtype=t.dtype)
+
+        def process(tile):
+            y0, y1, x0, x1 = tile
+            _, out[y0:y1, x0:x1] = self._process_tile(
+                dpi, scale_factor, x, y, img, tile, halo
+            )
+
+        y0, y1, x0, x1 = tiles[0]
+        out[y0:y1, x0:x1] = t
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # list() to propagate the exceptions.
+            list(executor.map(process, tiles[1:]))
+
+        return r0 + (out,)
@@ -0,0 +1,156 @@
+"""
+Grey dilation and erosion with a square or a disk structuring element.
+
+The *method* selects how the disk is applied ("square" always uses
+`scipy.ndimage`).
+
+- "exact" : `scipy.ndimage.grey_dilation` with the disk footprint.
+- "edt" : Euclidean distance transform, with a cost independent of the
+  radius. Exact for binary images, and takes the value of the nearest pixel
+  otherwise.
+- "auto" : "edt" if the radius is larger than the threshold, "exact"
+  otherwise.
+"""
+
+import numpy as np
+import scipy.ndimage as NI
+
+__all__ = ["grey_dilation", "grey_erosion", "get_radius", "MORPHOLOGY_METHODS"]
+
+MORPHOLOGY_METHODS = ["exact", "edt", "auto"]
+MORPHOLOGY_SHAPES = ["square", "disk"]
+
+# radius (in pixels) above which the "auto" method uses the distance
+# transform.
+AUTO_THRESHOLD = 4.0
+
+
+def get_disk_footprint(ry, rx):
+    "boolean footprint of the ellipse with the given radii (in pixels)."
+    ny, nx = int(ry), int(rx)
+    y, x = np.ogrid[-ny : ny + 1, -nx : nx + 1]
+    return (y / max(ry, 1e-6)) ** 2 + (x / max(rx, 1e-6)) ** 2 <= 1
+
+
+def _get_distance(mask, ry, rx):
+    # distance in the unit of the radius, so that the ellipse becomes a unit
+    # circle.
+    sampling = (1 / max(ry, 1e-6), 1 / max(rx, 1e-6))
+    return NI.distance_transform_edt(mask, sampling=sampling, return_indices=True)
+
+
+def _dilation_edt(img, ry, rx):
+    nonzero = img != 0
+    if not nonzero.any():
+        return img.copy()
+    d, indices = _get_distance(~nonzero, ry, rx)
+    return np.where(d <= 1, img[tuple(indices)], 0).astype(img.dtype)
+
+
+def _erosion_edt(img, ry, rx):
+    nonzero = img != 0
+    if nonzero.all():
+        return img.copy()
+    d, _ = _get_distance(nonzero, ry, rx)
+    return np.where(d > 1, img, 0).astype(img.dtype)
+
+
+def _get_method(method, ry, rx, threshold):
+    if method == "auto":
+        threshold = AUTO_THRESHOLD if threshold is None else threshold
+        method = "edt" if max(ry, rx) > threshold else "exact"
+
+    if method not in MORPHOLOGY_METHODS:
+        raise ValueError(f"Unknown method: {method}")
+
+    return method
+
+
+def _morphology(img, size, shape, method, threshold, filter_func, edt_func, output):
+    if shape == "square":
+        # separable filter, which runs line by line, thus the output can be
+        # the input itself.
+        return filter_func(img, size, output=output)
+    elif shape != "disk":
+        raise ValueError(f"Unknown shape: {shape}")
+
+    # size is the diameter
+    ry, rx = size[0] / 2, size[1] / 2
+    method = _get_method(method, ry, rx, threshold)
+
+    if img.ndim == 2:
+        img = img[..., np.newaxis]
+        squeeze = True
+    else:
+        squeeze = False
+
+    if method == "exact":
+        footprint = get_disk_footprint(ry, rx)[..., np.newaxis]
+        out = filter_func(img, footprint=footprint)
+    else:
+        out = np.empty_like(img)
+        for i in range(img.shape[-1]):
+            out[..., i] = edt_func(img[..., i], ry, rx)
+
+    out = out[..., 0] if squeeze else out
+
+    if output is not None:
+        output[...] = out
+        return output
+
+    return out
+
+
+def get_radius(size, shape="square", method="exact", threshold=None, dilation=True):
+    """
+    Return the radius (in pixels) of the structuring element for each axis,
+    i.e., the output pixel only depends on the input pixels within the
+    radius. None is returned for the "edt" dilation, as the pixel value is
+    taken from the nearest pixel, which may depend on the extent of the
+    image if there are more than one.
+    """
+    if shape == "square":
+        return [s // 2 for s in size]
+
+    ry, rx = size[0] / 2, size[1] / 2
+    method = _get_method(method, ry, rx, threshold)
+    if method == "edt" and dilation:
+        return None
+
+    return [int(ry), int(rx)] + [0] * (len(size) - 2)
+
+
+def grey_dilation(
+    img, size, shape="square", method="exact", threshold=None, output=None
+):
+    """
+    Grey dilation of the image (of shape (ny, nx, nchannel) or (ny, nx)).
+    Each channel is processed separately.
+
+    size : size (in pixels) of the structuring element along each axis. For
+    the "disk" shape, the first two are the diameters.
+
+    shape : "square" or "disk".
+
+    method : one of "exact", "edt" and "auto". Only used for the disk.
+
+    threshold : radius (in pixels) above which the "auto" method uses the
+    distance transform. Default is AUTO_THRESHOLD.
+
+    output : the array to which the result is written. It can be the input
+    image itself.
+    """
+    return _morphology(
+        img, size, shape, method, threshold, NI.grey_dilation, _dilation_edt, output
+    )
+
+
+def grey_erosion(
+    img, size, shape="square", method="exact", threshold=None, output=None
+):
+    """
+    Grey erosion of the image. See `grey_dilation` for the parameters.
+    """
+    return _morphology(
+        img, size, shape, method, threshold, NI.grey_erosion, _erosion_edt, output
+    )
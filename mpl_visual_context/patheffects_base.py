@@ -1,6 +1,7 @@
 # from matplotlib.patheffects import AbstractPathEffect
 from abc import abstractmethod
 
+
 class AbstractPathEffect:
     """
     A base class for path effects.
@@ -56,6 +57,16 @@ class AbstractPathEffect:
 
 
 class ChainablePathEffect(AbstractPathEffect):
+    # How `_convert` treats the gc. This lets the chained path effects copy
+    # the gc only once for the consecutive effects that modify it.
+    #
+    # - "copy" : the returned gc may be shared with others (e.g., the given
+    #   gc or the one stored by the effect). This is the default.
+    # - "keep" : the gc is returned as is without being modified.
+    # - "inplace" : the effect implements `_convert_inplace`, which modifies
+    #   the given gc (owned by the caller) in place and returns it.
+    gc_mode = "copy"
+
     def __or__(self, other):
         if isinstance(other, PathEffectTerminated):
             return PathEffectTerminated(self, other)
@@ -68,6 +79,14 @@ class ChainablePathEffect(AbstractPathEffect):
     def _convert(self, renderer, gc, tpath, affine, rgbFace=None):
         return renderer, gc, tpath, affine, rgbFace
 
+    def _convert_collection(self, renderer, gc, coll):
+        """
+        Convert the whole collection at once, where *coll* is
+        `patheffects_collection.CollectionArgs`. Return (renderer, gc,
+        coll), or None if the effect does not support the collection.
+        """
+        return None
+
     def draw_path(self, renderer, gc, tpath, affine, rgbFace):
 
         renderer, gc, tpath, affine, rgbFace = self._convert(
@@ -76,8 +95,10 @@ class ChainablePathEffect(AbstractPathEffect):
         if renderer is not None:
             renderer.draw_path(gc, tpath, affine, rgbFace)
 
+
 from typing import List
 
+
 class ChainedPathEffect(ChainablePathEffect):
     def __init__(self, pe1: ChainablePathEffect, pe2: ChainablePathEffect):
         if isinstance(pe1, ChainedPathEffect):
@@ -100,11 +121,19 @@ class ChainedPathEffect(ChainablePathEffect):
         return self
 
     def _convert(self, renderer, gc, tpath, affine, rgbFace=None):
-        for pe in self._pe_list:
-            renderer, gc, tpath, affine, rgbFace = pe._convert(
-                renderer, gc, tpath, affine, rgbFace
-            )
-        return renderer, gc, tpath, affine, rgbFace
+        return _convert_pe_list(self._pe_list, renderer, gc, tpath, affine, rgbFace)
+
+    def _convert_collection(self, renderer, gc, coll):
+        return _convert_pe_list_collection(self._pe_list, renderer, gc, coll)
+
+    def fuse_colors(self):
+        """
+        Return the chain whose consecutive color effects are fused into a
+        single pass. See `patheffects_color_fusion`.
+        """
+        from .patheffects_color_fusion import fuse_color_effects
+
+        return fuse_color_effects(self)
 
     def __repr__(self):
         s = " | ".join([repr(pe) for pe in self._pe_list])
@@ -132,11 +161,11 @@ class PathEffectTerminated(AbstractPathEffect):
         self._pe_final = pe_final
 
     def _convert(self, renderer, gc, tpath, affine, rgbFace=None):
-        for pe in self._pe_list:
-            renderer, gc, tpath, affine, rgbFace = pe._convert(
-                renderer, gc, tpath, affine, rgbFace
-            )
-        return renderer, gc, tpath, affine, rgbFace
+        return _convert_pe_list(self._pe_list, renderer, gc, tpath, affine, rgbFace)
+
+    def _convert_collection(self, renderer, gc, coll):
+        # Note that the final path effect is not included.
+        return _convert_pe_list_collection(self._pe_list, renderer, gc, coll)
 
     def draw_path(self, renderer, gc, tpath, affine, rgbFace):
 
@@ -145,12 +174,118 @@ class PathEffectTerminated(AbstractPathEffect):
         )
         self._pe_final.draw_path(renderer, gc, tpath, affine, rgbFace)
 
+    def fuse_colors(self):
+        """
+        Return the chain whose consecutive color effects are fused into a
+        single pass. See `patheffects_color_fusion`.
+        """
+        from .patheffects_color_fusion import fuse_color_effects
+
+        return fuse_color_effects(self)
+
     def __repr__(self):
         s = " | ".join([repr(pe) for pe in self._pe_list])
         return "PathEffectTerminated({}, {})".format(s, self._pe_final)
 
 
-class GCModify(ChainablePathEffect):
+class InplaceGCPathEffect(ChainablePathEffect):
+    """
+    A base class for path effects that modify the gc. Subclasses should
+    override `_convert_inplace`, which modifies the given gc in place.
+    """
+
+    gc_mode = "inplace"
+
+    @abstractmethod
+    def _convert_inplace(self, renderer, gc, tpath, affine, rgbFace):
+        return renderer, gc, tpath, affine, rgbFace
+
+    def _convert(self, renderer, gc, tpath, affine, rgbFace):
+        gc0 = renderer.new_gc()  # Don't modify gc, but a copy!
+        gc0.copy_properties(gc)
+
+        return self._convert_inplace(renderer, gc0, tpath, affine, rgbFace)
+
+
+_gc_modes = {}
+
+
+def _get_gc_mode(pe):
+    cls = type(pe)
+    mode = _gc_modes.get(cls)
+    if mode is None:
+        # The gc_mode is only valid if it is declared by the class that
+        # defines `_convert` or by its subclass, i.e., a subclass that
+        # overrides `_convert` falls back to "copy".
+        mro = cls.__mro__
+        i_convert = min(
+            [i for i, c in enumerate(mro) if "_convert" in vars(c)], default=len(mro)
+        )
+        i_mode = min(
+            [i for i, c in enumerate(mro) if "gc_mode" in vars(c)], default=len(mro)
+        )
+        mode = _gc_modes[cls] = (
+            getattr(pe, "gc_mode", "copy") if i_mode <= i_convert else "copy"
+        )
+    return mode
+
+
+def _convert_pe_list(pe_list, renderer, gc, tpath, affine, rgbFace):
+    """
+    Run `_convert` of the path effects in sequence. The gc is copied only
+    when an effect modifies the gc that is not owned by the chain, and the
+    effects that modify the gc (gc_mode of "inplace") modify that copy in
+    place.
+    """
+    owned = False
+    for pe in pe_list:
+        mode = _get_gc_mode(pe)
+        if mode == "inplace":
+            if not owned:
+                gc0 = renderer.new_gc()  # Don't modify gc, but a copy!
+                gc0.copy_properties(gc)
+                gc = gc0
+                owned = True
+            renderer, gc, tpath, affine, rgbFace = pe._convert_inplace(
+                renderer, gc, tpath, affine, rgbFace
+            )
+        else:
+            renderer, gc, tpath, affine, rgbFace = pe._convert(
+                renderer, gc, tpath, affine, rgbFace
+            )
+            if mode != "keep":
+                owned = False
+
+    return renderer, gc, tpath, affine, rgbFace
+
+
+def _convert_pe_list_collection(pe_list, renderer, gc, coll):
+    """
+    Run `_convert_collection` of the path effects in sequence. None if any
+    of them does not support the collection.
+    """
+    for pe in pe_list:
+        r = pe._convert_collection(renderer, gc, coll)
+        if r is None:
+            return None
+        renderer, gc, coll = r
+
+    return renderer, gc, coll
+
+
+class GCModify(InplaceGCPathEffect):
+    # gc properties that are not set for each element of the collection
+    # (see `RendererBase._iter_collection`).
+    _COLLECTION_GC_KEYS = {
+        "joinstyle",
+        "capstyle",
+        "snap",
+        "clip_rectangle",
+        "clip_path",
+        "hatch",
+        "sketch_params",
+    }
+
     def __init__(self, **kwargs):
         """
         The path will be stroked with its gc updated with the given
@@ -160,25 +295,37 @@ class GCModify(ChainablePathEffect):
         super().__init__()
         self._gc = kwargs
 
-    def _convert(self, renderer, gc, tpath, affine, rgbFace):
-        gc0 = renderer.new_gc()  # Don't modify gc, but a copy!
-        gc0.copy_properties(gc)
-        gc0 = self._update_gc(gc0, self._gc)
+    def _convert_inplace(self, renderer, gc, tpath, affine, rgbFace):
+        gc = self._update_gc(gc, self._gc)
 
-        return renderer, gc0, tpath, affine, rgbFace
+        return renderer, gc, tpath, affine, rgbFace
+
+    def _convert_collection(self, renderer, gc, coll):
+        gc_dict = self._gc.copy()
+        if "linewidth" in gc_dict:
+            coll = coll._replace(linewidths=[gc_dict.pop("linewidth")])
+        if not set(gc_dict).issubset(self._COLLECTION_GC_KEYS):
+            return None
+
+        if gc_dict:
+            gc0 = renderer.new_gc()  # Don't modify gc, but a copy!
+            gc0.copy_properties(gc)
+            gc = self._update_gc(gc0, gc_dict)
+
+        return renderer, gc, coll
 
 
 # Clipbaord is experimental.
 
+
 class ClipboardBase:
     ATTR_NAMES = ["renderer", "gc", "tpath", "affine", "rgbFace"]
 
-class Clipboard(ClipboardBase, dict):
 
+class Clipboard(ClipboardBase, dict):
 
     def __init__(self, renderer=False, gc=True, tpath=True, affine=True, rgbFace=True):
-        _ = dict(renderer=renderer, gc=gc, tpath=tpath, affine=affine,
-                 rgbFace=rgbFace)
+        _ = dict(renderer=renderer, gc=gc, tpath=tpath, affine=affine, rgbFace=rgbFace)
         self.attr_to_store = set(k for k in self.ATTR_NAMES if _.get(k, False))
 
     def copy(self):
@@ -205,8 +352,7 @@ class CopyToClipboard(ChainablePathEffect):
         self.clipboard = clipboard
 
     def _convert(self, renderer, gc, tpath, affine, rgbFace=None):
-        _ = dict(renderer=renderer, gc=gc, tpath=tpath, affine=affine,
-                 rgbFace=rgbFace)
+        _ = dict(renderer=renderer, gc=gc, tpath=tpath, affine=affine, rgbFace=rgbFace)
         for k in self.clipboard.attr_to_store:
             if k == "affine":
                 self.clipboard[k] = _[k]
@@ -224,12 +370,12 @@ class PasteFromClipboard(ChainablePathEffect):
         self.clipboard = clipboard
 
     def _convert(self, renderer, gc, tpath, affine, rgbFace=None):
-        _ = dict(renderer=renderer, gc=gc, tpath=tpath, affine=affine,
-                 rgbFace=rgbFace)
+        _ = dict(renderer=renderer, gc=gc, tpath=tpath, affine=affine, rgbFace=rgbFace)
         r = tuple(self.clipboard.get(k, _[k]) for k in self.clipboard.ATTR_NAMES)
         # self.clipboard.clear()
         return r
 
+
 class PasteFrom(ChainablePathEffect, ClipboardBase):
     def __init__(self, clipboard):
         """
@@ -238,8 +384,7 @@ class PasteFrom(ChainablePathEffect, ClipboardBase):
         self.clipboard = clipboard
 
     def _convert(self, renderer, gc, tpath, affine, rgbFace=None):
-        _ = dict(renderer=renderer, gc=gc, tpath=tpath, affine=affine,
-                 rgbFace=rgbFace)
+        _ = dict(renderer=renderer, gc=gc, tpath=tpath, affine=affine, rgbFace=rgbFace)
         r = tuple(self.clipboard.get(k, _[k]) for k in self.ATTR_NAMES)
         # self.clipboard.clear()
         return r
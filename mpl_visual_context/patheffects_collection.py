@@ -0,0 +1,356 @@
+"""
+Batched drawing of collections with path effects.
+
+Matplotlib draws a collection (or markers) with path effects by calling
+`draw_path` of the path effects for each element of the collection, which is
+slow for a large collection (e.g., a scatter plot with many points). For the
+artists set by `set_path_collection_batch`, the path effects that support it
+convert the whole collection at once (the arrays of the face and edge colors,
+the offsets and the transforms), and the converted collection is drawn with a
+single call of `draw_path_collection` of the renderer ::
+
+    sc = ax.scatter(x, y, path_effects=[HLSModify(l="-20%") | Offset(2, -2)])
+    set_path_collection_batch(sc)
+
+A chainable path effect supports it by implementing `_convert_collection`,
+which takes the renderer, the gc and `CollectionArgs` (the arguments of
+`draw_path_collection`) and returns them converted, or None if the
+collection cannot be converted. The path effects that do not support it are
+drawn for each element as before.
+
+Only the given artists are affected. They draw their path effects with
+`CollectionPathEffectRenderer` instead of
+`matplotlib.patheffects.PathEffectRenderer`.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+import matplotlib.colors as mcolors
+import matplotlib.patheffects as mpatheffects
+from matplotlib.collections import Collection
+from matplotlib.lines import Line2D
+from matplotlib.transforms import Affine2D
+
+from .patheffects_base import PathEffectTerminated
+
+__all__ = [
+    "set_path_collection_batch",
+    "draw_path_collection_batch",
+    "CollectionPathEffectRenderer",
+    "CollectionArgs",
+]
+
+CollectionArgs = namedtuple(
+    "CollectionArgs",
+    [
+        "master_transform",
+        "paths",
+        "all_transforms",
+        "offsets",
+        "offset_trans",
+        "facecolors",
+        "edgecolors",
+        "linewidths",
+        "linestyles",
+        "antialiaseds",
+        "urls",
+        "offset_position",
+    ],
+)
+
+
+def _to_rgba_array(colors):
+    if len(colors) == 0:
+        return np.zeros((0, 4))
+    return mcolors.to_rgba_array(colors)
+
+
+def _normalize_collection(gc, coll):
+    """
+    Return the collection whose edge colors and line widths are those of
+    the gc of each element when it is drawn by `RendererBase` one by one. That
+    is, with no edge colors, no stroke is drawn, and a fully transparent edge
+    color sets the line width to 0 (for the rest of elements if the line
+    widths are not given), keeping the previous foreground color. None if
+    nothing is drawn.
+    """
+    facecolors = _to_rgba_array(coll.facecolors)
+    edgecolors = _to_rgba_array(coll.edgecolors)
+
+    if len(coll.paths) == 0 or (len(facecolors) == 0 and len(edgecolors) == 0):
+        return None
+
+    if len(edgecolors) == 0:
+        return coll._replace(
+            facecolors=facecolors, edgecolors=np.array([gc.get_rgb()]), linewidths=[0.0]
+        )
+
+    transparent = edgecolors[:, 3] == 0
+    if not transparent.any():
+        return coll._replace(facecolors=facecolors, edgecolors=edgecolors)
+
+    n = max(len(coll.paths), len(coll.offsets))
+    edgecolors = np.resize(edgecolors, (n, 4))
+    transparent = edgecolors[:, 3] == 0
+
+    # the foreground color is kept from the last opaque edge color.
+    i_last = np.where(transparent, -1, np.arange(n))
+    i_last = np.maximum.accumulate(i_last)
+    edgecolors = np.where(
+        (i_last < 0)[:, np.newaxis],
+        np.array(gc.get_rgb()),
+        edgecolors[np.maximum(i_last, 0)],
+    )
+
+    if len(coll.linewidths):
+        linewidths = np.resize(np.asarray(coll.linewidths, float), n)
+        linewidths[transparent] = 0
+    else:
+        linewidths = np.full(n, gc.get_linewidth())
+        linewidths[np.logical_or.accumulate(transparent)] = 0
+
+    return coll._replace(
+        facecolors=facecolors, edgecolors=edgecolors, linewidths=linewidths
+    )
+
+
+def convert_collection(path_effect, renderer, gc, coll):
+    """
+    Convert the collection with the given path effect. Return (renderer, gc,
+    coll) to be drawn, or None if the path effect does not support the
+    collection.
+    """
+    if isinstance(path_effect, mpatheffects.Normal):
+        return renderer, gc, coll
+
+    if isinstance(path_effect, PathEffectTerminated) and not isinstance(
+        path_effect._pe_final, mpatheffects.Normal
+    ):
+        return None
+
+    convert = getattr(path_effect, "_convert_collection", None)
+    if convert is None:
+        return None
+
+    return convert(renderer, gc, coll)
+
+
+class CollectionPathEffectRenderer(mpatheffects.PathEffectRenderer):
+    """
+    PathEffectRenderer that converts the whole collection (and markers)
+    with the path effects that support `_convert_collection`.
+    """
+
+    # The state of the rasterization (and the agg filter) is that of the
+    # wrapped renderer, as the artists are drawn with this renderer (see
+    # `draw_path_collection_batch`).
+    _forwarded = [
+        "_raster_depth",
+        "_rasterizing",
+        "start_rasterizing",
+        "stop_rasterizing",
+        "start_filter",
+        "stop_filter",
+    ]
+
+    def __getattribute__(self, name):
+        if name in CollectionPathEffectRenderer._forwarded:
+            return getattr(self._renderer, name)
+        return super().__getattribute__(name)
+
+    def __setattr__(self, name, value):
+        if name in CollectionPathEffectRenderer._forwarded:
+            setattr(self._renderer, name, value)
+        else:
+            super().__setattr__(name, value)
+
+    def draw_path_collection(
+        self,
+        gc,
+        master_transform,
+        paths,
+        all_transforms,
+        offsets,
+        offset_trans,
+        facecolors,
+        edgecolors,
+        linewidths,
+        linestyles,
+        antialiaseds,
+        urls,
+        offset_position,
+        **kwargs
+    ):
+        coll0 = CollectionArgs(
+            master_transform,
+            paths,
+            all_transforms,
+            offsets,
+            offset_trans,
+            facecolors,
+            edgecolors,
+            linewidths,
+            linestyles,
+            antialiaseds,
+            urls,
+            offset_position,
+        )
+        coll = None
+
+        for path_effect in self._path_effects:
+            if isinstance(path_effect, mpatheffects.Normal):
+                self._renderer.draw_path_collection(gc, *coll0, **kwargs)
+                continue
+
+            if coll is None:
+                coll = _normalize_collection(gc, coll0)
+                if coll is None:
+                    return
+
+            r = convert_collection(path_effect, self._renderer, gc, coll)
+            if r is None:
+                # draw_path for each element.
+                mpatheffects.PathEffectRenderer.draw_path_collection(
+                    self.copy_with_path_effect([path_effect]), gc, *coll0, **kwargs
+                )
+                continue
+
+            renderer, gc1, coll1 = r
+            if renderer is not None:
+                renderer.draw_path_collection(gc1, *_frozen(coll1), **kwargs)
+
+    def draw_markers(self, gc, marker_path, marker_trans, path, trans, rgbFace=None):
+        coll = None
+        if path.codes is None:
+            coll = CollectionArgs(
+                marker_trans,
+                [marker_path],
+                np.empty((0, 3, 3)),
+                path.vertices,
+                trans,
+                _to_rgba_array([] if rgbFace is None else [rgbFace]),
+                np.array([gc.get_rgb()]),
+                [gc.get_linewidth()],
+                [gc.get_dashes()],
+                [gc.get_antialiased()],
+                [gc.get_url()],
+                "screen",
+            )
+
+        for path_effect in self._path_effects:
+            if isinstance(path_effect, mpatheffects.Normal):
+                self._renderer.draw_markers(
+                    gc, marker_path, marker_trans, path, trans, rgbFace
+                )
+                continue
+
+            r = (
+                None
+                if coll is None
+                else convert_collection(path_effect, self._renderer, gc, coll)
+            )
+            if r is None:
+                # draw_path for each marker.
+                mpatheffects.PathEffectRenderer.draw_markers(
+                    self.copy_with_path_effect([path_effect]),
+                    gc,
+                    marker_path,
+                    marker_trans,
+                    path,
+                    trans,
+                    rgbFace,
+                )
+                continue
+
+            renderer, gc1, coll1 = r
+            if renderer is None:
+                continue
+
+            # Not with draw_markers of the renderer, which snaps the markers
+            # to the pixels unlike draw_path for each marker.
+            renderer.draw_path_collection(gc1, *_frozen(coll1))
+
+
+def _frozen(coll):
+    return coll._replace(
+        master_transform=coll.master_transform.frozen(),
+        offset_trans=coll.offset_trans.frozen(),
+    )
+
+
+def draw_path_collection_batch(artist, renderer):
+    """
+    Draw the artist (a collection, or a line with markers) with its path
+    effects by `CollectionPathEffectRenderer`. Other artists are drawn as
+    usual.
+    """
+    path_effects = artist.get_path_effects()
+    if not path_effects or not isinstance(artist, (Collection, Line2D)):
+        type(artist).draw(artist, renderer)
+        return
+
+    # The artist draws with the given renderer as is if it has no path
+    # effects. They are swapped directly, not to make the artist stale.
+    artist._path_effects = []
+    try:
+        type(artist).draw(artist, CollectionPathEffectRenderer(path_effects, renderer))
+    finally:
+        artist._path_effects = path_effects
+
+
+class _BatchedDraw:
+    # draw method of the artist set by set_path_collection_batch.
+    def __init__(self, artist):
+        self._artist = artist
+
+    def __call__(self, renderer):
+        draw_path_collection_batch(self._artist, renderer)
+
+
+def set_path_collection_batch(artist, batch=True):
+    """
+    Make the artist (a collection, or a line with markers) draw its path
+    effects with `CollectionPathEffectRenderer` (see
+    `draw_path_collection_batch`) if batch is True, or as usual otherwise.
+    Only the given artist is affected.
+    """
+    if batch:
+        artist.draw = _BatchedDraw(artist)
+    else:
+        vars(artist).pop("draw", None)
+    artist.stale = True
+
+
+# helpers for `_convert_collection` of the path effects.
+
+
+def pre_affine_collection(coll, affine):
+    """
+    Return the collection whose paths are transformed by the *affine* before
+    their transforms, i.e., the collection version of `affine + tr`.
+    """
+    m = affine.get_matrix()
+    all_transforms = np.asarray(coll.all_transforms)
+    if len(all_transforms) == 0:
+        all_transforms = m[np.newaxis]
+    else:
+        all_transforms = all_transforms @ m
+    return coll._replace(all_transforms=all_transforms)
+
+
+def post_affine_collection(coll, affine):
+    """
+    Return the collection whose paths (including their offsets) are
+    transformed by the *affine*, i.e., the collection version of
+    `tr + affine`.
+    """
+    m = affine.get_matrix()
+    linear = Affine2D(
+        np.array([[m[0, 0], m[0, 1], 0], [m[1, 0], m[1, 1], 0], [0, 0, 1]])
+    )
+    return coll._replace(
+        master_transform=coll.master_transform + affine,
+        offset_trans=coll.offset_trans + linear,
+    )
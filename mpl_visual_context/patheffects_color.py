@@ -6,36 +6,55 @@ from abc import abstractmethod
 import numpy as np
 import matplotlib.colors as mcolors
 
-from .hls_helper import HLSModify_axb, _convert_scale_or_const
+from .hls_helper import HLSModify_axb, get_hls_ab
+from .color_memo import ColorMemoMixin
 from . import color_matrix as CM
 
-from .patheffects_base import ChainablePathEffect
+from .patheffects_base import ChainablePathEffect, InplaceGCPathEffect
 
 
-class ColorModifyStroke(ChainablePathEffect):
+class ColorModifyStroke(ColorMemoMixin, InplaceGCPathEffect):
     """
     A base class for path effects that modifies color.
 
     Subclasses should override the ``apply_to_color_path`` method that returns a new color.
+    The results can be memoized with ``enable_memo`` (see `color_memo`).
     """
 
     @abstractmethod
     def apply_to_color(self, c):
         pass
 
-    def _convert(self, renderer, gc, tpath, affine, rgbFace):
-        gc0 = renderer.new_gc()
-        gc0.copy_properties(gc)
-
+    def apply_to_colors(self, colors):
+        """
+        Return the new colors of the (N, 4) array of rgba colors. Subclasses
+        may override this with a vectorized version.
+        """
+        colors = np.asarray(colors, dtype=float)
+        if len(colors) == 0:
+            return colors
+        # The collections mostly have a few distinct colors.
+        uniq, inverse = np.unique(colors, axis=0, return_inverse=True)
+        new = np.array([mcolors.to_rgba(self.apply_to_color(c)) for c in uniq])
+        return new[inverse.ravel()]
+
+    def _convert_inplace(self, renderer, gc, tpath, affine, rgbFace):
         # change the stroke color
-        rgb = self.apply_to_color(gc0.get_rgb())
-        gc0.set_foreground(rgb)
+        rgb = self.apply_to_color(gc.get_rgb())
+        gc.set_foreground(rgb)
 
         # chage the fill color
         if rgbFace is not None:
             rgbFace = self.apply_to_color(rgbFace)
 
-        return renderer, gc0, tpath, affine, rgbFace
+        return renderer, gc, tpath, affine, rgbFace
+
+    def _convert_collection(self, renderer, gc, coll):
+        coll = coll._replace(
+            edgecolors=self.apply_to_colors(coll.edgecolors),
+            facecolors=self.apply_to_colors(coll.facecolors),
+        )
+        return renderer, gc, coll
 
 
 class HLSaxb(ColorModifyStroke):
@@ -44,6 +63,7 @@ class HLSaxb(ColorModifyStroke):
     a tuple of (a, b), the new color is defiend as h' = a * h + b, and so on.
     Both stroke and fill color are changed.
     """
+
     def __init__(
         self, h_ab=(1, 0), l_ab=(1, 0), s_ab=(1, 0), alpha_ab=(1, 0), clip_mode="clip"
     ):
@@ -53,6 +73,9 @@ class HLSaxb(ColorModifyStroke):
     def apply_to_color(self, c):
         return self._modifier.apply_to_color(c)
 
+    def apply_to_colors(self, colors):
+        return self._modifier.apply_to_colors(colors)
+
     def __repr__(self):
         return repr(self._modifier)
 
@@ -75,10 +98,7 @@ class HLSModify(HLSaxb):
         dalpha=0,
         clip_mode="clip",
     ):
-        hls_ab = [_convert_scale_or_const(v) for v in [h, l, s, alpha]]
-        h, l, s, alpha = [
-            (a, b + dd) for (a, b), dd in zip(hls_ab, [dh, dl, ds, dalpha])
-        ]
+        h, l, s, alpha = get_hls_ab(h, l, s, alpha, dh, dl, ds, dalpha)
 
         super().__init__(h_ab=h, l_ab=l, s_ab=s, alpha_ab=alpha, clip_mode=clip_mode)
 
@@ -90,6 +110,7 @@ class ColorMatrix(ColorModifyStroke):
     'warm' and 'cool.
     Both stroke and fill color are changed.
     """
+
     color_matrix = CM._get_matrix()
 
     def __init__(self, kind):
@@ -106,12 +127,20 @@ class ColorMatrix(ColorModifyStroke):
 
         return np.append(c_rgb_new, alpha)
 
+    def apply_to_colors(self, colors):
+        colors = np.array(colors, dtype=float).reshape(-1, 4)
+        colors[:, :3] = np.clip(colors[:, :3] @ self._m.T, 0, 1)
+        return colors
+
     def __repr__(self):
         return f"ColorMatrix({self._kind})"
 
 
 class FillColor(ChainablePathEffect):
     """PathEffect to set the fill color"""
+
+    gc_mode = "keep"
+
     def __init__(self, fillcolor):
         self._fillcolor = None if fillcolor is None else mcolors.to_rgba(fillcolor)
 
@@ -119,37 +148,46 @@ class FillColor(ChainablePathEffect):
 
         return renderer, gc, tpath, affine, self._fillcolor
 
+    def _convert_collection(self, renderer, gc, coll):
+        fc = [] if self._fillcolor is None else [self._fillcolor]
+        return renderer, gc, coll._replace(facecolors=np.array(fc).reshape(-1, 4))
 
-class StrokeColor(ChainablePathEffect):
+
+class StrokeColor(InplaceGCPathEffect):
     """PathEffect to set the stoke color"""
+
     def __init__(self, c):
         super().__init__()
         self._stroke_color = c
 
-    def _convert(self, renderer, gc, tpath, affine, rgbFace):
-        gc0 = renderer.new_gc()
-        gc0.copy_properties(gc)
+    def _convert_inplace(self, renderer, gc, tpath, affine, rgbFace):
         fg = mcolors.to_rgba(self._stroke_color)
-        gc0.set_foreground(fg)
+        gc.set_foreground(fg)
 
-        return renderer, gc0, tpath, affine, rgbFace
+        return renderer, gc, tpath, affine, rgbFace
+
+    def _convert_collection(self, renderer, gc, coll):
+        fg = mcolors.to_rgba(self._stroke_color)
+        return renderer, gc, coll._replace(edgecolors=np.array([fg]))
 
 
-class StrokeColorFromFillColor(ChainablePathEffect):
+class StrokeColorFromFillColor(InplaceGCPathEffect):
     """PathEffect to set the stoke color by the fill color"""
+
     def __init__(self):
         super().__init__()
 
-    def _convert(self, renderer, gc, tpath, affine, rgbFace):
-        gc0 = renderer.new_gc()
-        gc0.copy_properties(gc)
-        gc0.set_foreground(rgbFace)
+    def _convert_inplace(self, renderer, gc, tpath, affine, rgbFace):
+        gc.set_foreground(rgbFace)
 
-        return renderer, gc0, tpath, affine, rgbFace
+        return renderer, gc, tpath, affine, rgbFace
 
 
 class FillColorFromStrokeColor(ChainablePathEffect):
     """PathEffect to set the fill color by the stroke color"""
+
+    gc_mode = "keep"
+
     def __init__(self):
         super().__init__()
 
@@ -161,51 +199,47 @@ class FillColorFromStrokeColor(ChainablePathEffect):
         return renderer, gc, tpath, affine, rgbFace_new
 
 
-class BlendAlpha(ChainablePathEffect):
+class BlendAlpha(InplaceGCPathEffect):
     """Remove the alpha channel by blending the original color (w/ alpha) with
     the given backgrond color.
     """
+
     def __init__(self, bg_color):
         self._bg_color = bg_color
 
-    def _convert(self, renderer, gc, tpath, affine, rgbFace=None):
-        gc1 = renderer.new_gc()
-        gc1.copy_properties(gc)
-
+    def _convert_inplace(self, renderer, gc, tpath, affine, rgbFace=None):
         bg_rgb = np.array(mcolors.to_rgb(self._bg_color))
 
         rgba_new = gc.get_rgb()
         rgb_new = np.array(rgba_new[:3])
         alpha = rgba_new[3]
         # gc.get_alpha()
-        gc1.set_foreground(rgb_new*alpha + bg_rgb*(1-alpha))
-        gc1.set_alpha(1)
+        gc.set_foreground(rgb_new * alpha + bg_rgb * (1 - alpha))
+        gc.set_alpha(1)
 
         if rgbFace is not None:
             alpha = rgbFace[-1]
             rgbFace = np.asarray(rgbFace)
             rgbFace2 = np.ones_like(rgbFace)
-            rgbFace2[:3] = rgbFace[:3]*alpha + bg_rgb[:3]*(1-alpha)
+            rgbFace2[:3] = rgbFace[:3] * alpha + bg_rgb[:3] * (1 - alpha)
         else:
             rgbFace2 = rgbFace
 
-        return renderer, gc1, tpath, affine, rgbFace2
+        return renderer, gc, tpath, affine, rgbFace2
 
 
-class ColorFromFunc(ChainablePathEffect):
+class ColorFromFunc(InplaceGCPathEffect):
     """PathEffect to set the stoke color from a function. The function should
     take stroke-color and fill color and return new stroke-color and
     fill-color."""
+
     def __init__(self, func):
         super().__init__()
         self._func = func
 
-    def _convert(self, renderer, gc, tpath, affine, rgbFace):
-        gc0 = renderer.new_gc()
-        gc0.copy_properties(gc)
-
+    def _convert_inplace(self, renderer, gc, tpath, affine, rgbFace):
         # change the stroke color
-        stroke_color, fill_color = self._func(gc0.get_rgb()[:3], rgbFace)
-        gc0.set_foreground(stroke_color)
+        stroke_color, fill_color = self._func(gc.get_rgb()[:3], rgbFace)
+        gc.set_foreground(stroke_color)
 
-        return renderer, gc0, tpath, affine, fill_color
+        return renderer, gc, tpath, affine, fill_color
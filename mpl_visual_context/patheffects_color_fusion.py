@@ -0,0 +1,395 @@
+"""
+Fusion of the consecutive color effects in a chain of path effects.
+
+In a chain like ::
+
+    HLSModify(l="-10%") | ColorMatrix("grayscale") | BlendAlpha("w") | StrokeColorFromFillColor()
+
+each effect parses the stroke and fill colors, and sets the foreground of the
+gc for each path. `fuse_color_effects` replaces the consecutive color effects
+in the chain with a single `FusedColorModify`, which stacks the stroke and
+fill colors into an array and runs the effects on it in a single pass, setting
+the gc only once.
+
+- The affine color transforms (`ColorMatrix` and `HLSModify` that only
+  modifies the alpha) are represented as 4x5 matrices of rgba. Consecutive
+  matrices are multiplied into a single one when the clipping (to [0, 1])
+  between them is a no-op for any input color, so that the result is not
+  changed.
+- The other `ColorModifyStroke` effects (e.g., `HLSModify` of the hue,
+  lightness and saturation) are run with their vectorized `apply_to_colors`.
+- `BlendAlpha`, `StrokeColor` and `StrokeColorFromFillColor` are applied to
+  the stacked colors directly.
+
+Use `ChainedPathEffect.fuse_colors` ::
+
+    pe = (HLSModify(l="-10%") | ColorMatrix("grayscale") | FillOnly()).fuse_colors()
+    print(pe)
+
+The effects whose methods are overridden by subclasses are only fused through
+their `apply_to_colors` (or not fused at all), as the fusion relies on the
+behavior of the original classes.
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+import matplotlib.colors as mcolors
+
+from .patheffects_base import (
+    ChainedPathEffect,
+    PathEffectTerminated,
+    InplaceGCPathEffect,
+    _get_gc_mode,
+)
+from .patheffects_color import (
+    ColorModifyStroke,
+    HLSaxb,
+    ColorMatrix,
+    BlendAlpha,
+    StrokeColor,
+    StrokeColorFromFillColor,
+)
+
+__all__ = ["FusedColorModify", "fuse_color_effects"]
+
+
+class _Op(ABC):
+    # True if the op modifies the stroke and fill colors in the same way,
+    # i.e., it can be applied to the colors of collections.
+    uniform = True
+
+    # True if the output colors of the uniform op are within [0, 1].
+    unit_range = True
+
+    needs_fill = False
+
+    # True if the op sets the stroke color from elsewhere.
+    sets_stroke = False
+
+    @abstractmethod
+    def apply(self, colors, has_fill):
+        """
+        Modify *colors* (the stroke color followed by the fill color if
+        has_fill) in place.
+        """
+
+
+class _AffineOp(_Op):
+    def __init__(self, m, unit_input):
+        # 4x5 matrix, which is applied to the rgba and then clipped.
+        self.m = m
+        # True if the input of the op is known to be within [0, 1].
+        self.unit_input = unit_input
+
+    def _get_range(self):
+        # range of the output before clipped, for the input within [0, 1].
+        lo = self.m[:, 4] + np.minimum(self.m[:, :4], 0).sum(axis=1)
+        hi = self.m[:, 4] + np.maximum(self.m[:, :4], 0).sum(axis=1)
+        return lo, hi
+
+    def fuse(self, other):
+        """
+        Return the op of self followed by other, or None if the clipping of
+        self cannot be dropped.
+        """
+        # The clipping of a channel can be dropped if the channel is within
+        # [0, 1], if other does not use it, or if other only passes it
+        # through (then it is clipped by other).
+        m4 = other.m[:, :4]
+        identity = m4 == np.eye(4)
+        unused = (m4 == 0).all(axis=0)
+        passed = identity.all(axis=0) & identity.all(axis=1) & (other.m[:, 4] == 0)
+
+        if self.unit_input:
+            lo, hi = self._get_range()
+            within = (lo >= 0) & (hi <= 1)
+        else:
+            within = np.zeros(4, dtype=bool)
+
+        if not np.all(within | unused | passed):
+            return None
+
+        m = m4 @ self.m
+        m[:, 4] += other.m[:, 4]
+        return _AffineOp(m, self.unit_input)
+
+    def apply(self, colors, has_fill):
+        colors[:] = np.clip(colors @ self.m[:, :4].T + self.m[:, 4], 0, 1)
+
+
+class _FuncOp(_Op):
+    def __init__(self, pe, unit_range):
+        self.pe = pe
+        self.unit_range = unit_range
+
+    def apply(self, colors, has_fill):
+        colors[:] = self.pe.apply_to_colors(colors)
+
+
+class _BlendAlphaOp(_Op):
+    uniform = False
+
+    def __init__(self, pe):
+        self.pe = pe
+
+    def apply(self, colors, has_fill):
+        bg_rgb = np.array(mcolors.to_rgb(self.pe._bg_color))
+        alpha = colors[:, 3:]
+        colors[:, :3] = colors[:, :3] * alpha + bg_rgb * (1 - alpha)
+        colors[:, 3] = 1
+
+
+class _StrokeColorOp(_Op):
+    uniform = False
+    sets_stroke = True
+
+    def __init__(self, pe):
+        self.pe = pe
+
+    def apply(self, colors, has_fill):
+        colors[0] = mcolors.to_rgba(self.pe._stroke_color)
+
+
+class _StrokeFromFillOp(_Op):
+    uniform = False
+    needs_fill = True
+    sets_stroke = True
+
+    def apply(self, colors, has_fill):
+        colors[0] = colors[1]
+
+
+def _affine_matrix(m_rgb=None, alpha_ab=(1, 0)):
+    m = np.zeros((4, 5))
+    m[:3, :3] = np.eye(3) if m_rgb is None else m_rgb
+    m[3, 3], m[3, 4] = alpha_ab
+    return m
+
+
+def _is_original(pe, cls, *names):
+    "True if the given methods of pe are those of cls."
+    return all(getattr(type(pe), n) is getattr(cls, n) for n in names)
+
+
+def _get_op(pe, unit_input):
+    """
+    Return the op for the path effect, or None if it cannot be fused.
+    """
+    if _get_gc_mode(pe) != "inplace":
+        return None
+
+    if isinstance(pe, ColorModifyStroke):
+        if not _is_original(pe, ColorModifyStroke, "_convert_inplace"):
+            return None
+
+        if isinstance(pe, ColorMatrix) and _is_original(
+            pe, ColorMatrix, "apply_to_color", "apply_to_colors"
+        ):
+            return _AffineOp(_affine_matrix(m_rgb=pe._m), unit_input)
+
+        if isinstance(pe, HLSaxb) and _is_original(
+            pe, HLSaxb, "apply_to_color", "apply_to_colors"
+        ):
+            modifier = pe._modifier
+            if (
+                modifier.clip_mode == "clip"
+                and np.all(modifier.hls_a == 1)
+                and np.all(modifier.hls_b == 0)
+            ):
+                alpha_ab = (modifier.alpha_a, modifier.alpha_b)
+                return _AffineOp(_affine_matrix(alpha_ab=alpha_ab), unit_input)
+            return _FuncOp(pe, modifier.clip_mode == "clip")
+
+        # `ColorModifyStroke.apply_to_colors` validates the colors with
+        # to_rgba.
+        unit_range = _is_original(pe, ColorModifyStroke, "apply_to_colors")
+        return _FuncOp(pe, unit_range)
+
+    if isinstance(pe, BlendAlpha) and _is_original(pe, BlendAlpha, "_convert_inplace"):
+        return _BlendAlphaOp(pe)
+
+    if isinstance(pe, StrokeColor) and _is_original(
+        pe, StrokeColor, "_convert_inplace"
+    ):
+        return _StrokeColorOp(pe)
+
+    if isinstance(pe, StrokeColorFromFillColor) and _is_original(
+        pe, StrokeColorFromFillColor, "_convert_inplace"
+    ):
+        return _StrokeFromFillOp()
+
+    return None
+
+
+def _get_ops(pe_list):
+    """
+    Return the list of ops for the path effects, with the consecutive affine
+    ops fused, or None if any of them cannot be fused.
+    """
+    ops = []
+    unit_input = True
+    for pe in pe_list:
+        op = _get_op(pe, unit_input)
+        if op is None:
+            return None
+
+        fused = None
+        if isinstance(op, _AffineOp) and ops and isinstance(ops[-1], _AffineOp):
+            fused = ops[-1].fuse(op)
+
+        if fused is None:
+            ops.append(op)
+        else:
+            ops[-1] = fused
+
+        # The ops that are not uniform (e.g., BlendAlpha, which is a convex
+        # combination of the input and the background) keep the range.
+        if isinstance(op, _AffineOp):
+            unit_input = True  # clipped
+        elif op.uniform:
+            unit_input = op.unit_range
+
+    return ops
+
+
+class FusedColorModify(InplaceGCPathEffect):
+    """
+    PathEffect that runs the consecutive color effects in a single pass. See
+    `fuse_color_effects`.
+    """
+
+    def __init__(self, pe_list):
+        ops = _get_ops(pe_list)
+        if ops is None:
+            raise ValueError("The path effects cannot be fused.")
+
+        super().__init__()
+        self._pe_list = list(pe_list)
+        self._ops = ops
+        self._uniform = all(op.uniform for op in ops)
+        self._needs_fill = any(op.needs_fill for op in ops)
+        self._forces_alpha = any(isinstance(op, _BlendAlphaOp) for op in ops)
+
+    def get_matrices(self):
+        "Return the list of the (fused) 4x5 matrices of the affine ops."
+        return [op.m for op in self._ops if isinstance(op, _AffineOp)]
+
+    def _convert_sequential(self, renderer, gc, tpath, affine, rgbFace):
+        for pe in self._pe_list:
+            renderer, gc, tpath, affine, rgbFace = pe._convert_inplace(
+                renderer, gc, tpath, affine, rgbFace
+            )
+        return renderer, gc, tpath, affine, rgbFace
+
+    def _convert_inplace(self, renderer, gc, tpath, affine, rgbFace):
+        has_fill = rgbFace is not None
+        if self._needs_fill and not has_fill:
+            return self._convert_sequential(renderer, gc, tpath, affine, rgbFace)
+
+        if has_fill:
+            colors = np.array([gc.get_rgb(), mcolors.to_rgba(rgbFace)])
+        else:
+            colors = np.array([gc.get_rgb()])
+
+        # The forced alpha of the gc replaces the alpha of the stroke color
+        # whenever it is set.
+        forced_alpha = gc.get_alpha() if gc.get_forced_alpha() else None
+        for op in self._ops:
+            op.apply(colors, has_fill)
+            if isinstance(op, _BlendAlphaOp):
+                forced_alpha = 1
+            if forced_alpha is not None:
+                colors[0, 3] = forced_alpha
+
+        if self._forces_alpha:
+            gc.set_alpha(1)
+        gc.set_foreground(tuple(colors[0].tolist()), isRGBA=True)
+
+        if has_fill:
+            rgbFace = colors[1]
+
+        return renderer, gc, tpath, affine, rgbFace
+
+    def _apply_to_colors(self, colors):
+        colors = np.array(colors, dtype=float).reshape(-1, 4)
+        for op in self._ops:
+            op.apply(colors, True)
+        return colors
+
+    def apply_to_colors(self, colors):
+        """
+        Return the new colors of the (N, 4) array of rgba colors, which are
+        modified as the fill color. ValueError is raised if the effects set
+        the stroke color (which has no counterpart in an array of colors).
+        """
+        if any(op.sets_stroke for op in self._ops):
+            raise ValueError(
+                "The effects that set the stroke color cannot "
+                "be applied to an array of colors."
+            )
+        return self._apply_to_colors(colors)
+
+    def _convert_collection(self, renderer, gc, coll):
+        if not self._uniform:
+            return None
+
+        coll = coll._replace(
+            edgecolors=self._apply_to_colors(coll.edgecolors),
+            facecolors=self._apply_to_colors(coll.facecolors),
+        )
+        return renderer, gc, coll
+
+    def __repr__(self):
+        s = " | ".join([repr(pe) for pe in self._pe_list])
+        return f"FusedColorModify({s})"
+
+
+def _fuse_pe_list(pe_list):
+    new_pe_list = []
+    run = []
+
+    def flush():
+        if len(run) > 1:
+            new_pe_list.append(FusedColorModify(run))
+        else:
+            new_pe_list.extend(run)
+        run.clear()
+
+    for pe in pe_list:
+        if _get_ops(run + [pe]) is None:
+            flush()
+            if _get_ops([pe]) is not None:
+                run.append(pe)
+            else:
+                new_pe_list.append(pe)
+        else:
+            run.append(pe)
+    flush()
+
+    return new_pe_list
+
+
+def fuse_color_effects(pe):
+    """
+    Return the path effect whose consecutive color effects are replaced by
+    `FusedColorModify`. *pe* can be a `ChainedPathEffect`, a
+    `PathEffectTerminated` or a list of path effects (e.g., path_effects of
+    an artist). Other path effects are returned as is.
+    """
+    if isinstance(pe, list):
+        return [fuse_color_effects(pe1) for pe1 in pe]
+
+    if isinstance(pe, ChainedPathEffect):
+        pe_list = _fuse_pe_list(pe._pe_list)
+        if len(pe_list) == 1:
+            return pe_list[0]
+        return ChainedPathEffect.from_pe_list(pe_list)
+
+    if isinstance(pe, PathEffectTerminated):
+        new_pe = PathEffectTerminated.__new__(PathEffectTerminated)
+        new_pe._pe_list = _fuse_pe_list(pe._pe_list)
+        new_pe._pe_final = pe._pe_final
+        return new_pe
+
+    return pe
@@ -1,23 +1,59 @@
+import copy
+
 import numpy as np
 import scipy.ndimage as NI
 
 from matplotlib.patheffects import AbstractPathEffect, Normal
 from matplotlib import cbook
 from matplotlib.transforms import Affine2D, TransformedBbox, Bbox, TransformedPath
-from matplotlib.backends.backend_agg import RendererAgg
 from matplotlib.artist import Artist
 
 from matplotlib.transforms import Affine2D
 
-from mpl_visual_context.patheffects_base import AbstractPathEffect
+from mpl_visual_context.patheffects_base import (
+    AbstractPathEffect,
+    ChainablePathEffect,
+)
 from mpl_visual_context.patheffects_transform import PostAffine
+from mpl_visual_context.image_effect import convert_image_dtype
+from mpl_visual_context.agg_renderer_pool import renderer_pool as _renderer_pool
+from mpl_visual_context.image_effect_batch import get_current_batch
+from mpl_visual_context.image_effect_cache import (
+    Uncacheable,
+    _hash_array,
+    get_fingerprint,
+    get_gc_fingerprint,
+    get_renderer_fingerprint,
+)
+
+
+def _get_input_dtype(image_effect):
+    if image_effect is None or not hasattr(image_effect, "get_input_dtype"):
+        return np.dtype("float64")
+    return image_effect.get_input_dtype()
+
 
+def _crop_image(orig_img, slice_y, slice_x, dtype):
+    """
+    Return the (vertically flipped) cropped image of the agg buffer in the
+    given dtype. The returned image never shares the memory with the buffer.
+    """
+    cropped_img = orig_img[slice_y, slice_x][::-1]
+    if cropped_img.dtype == dtype:
+        return cropped_img.copy()
+    return convert_image_dtype(cropped_img, dtype)
 
-class ImageEffectBase():
-    def __init__(self):
+
+class ImageEffectBase:
+    def __init__(self, renderer_pool=None):
+        """
+        renderer_pool: RendererAggPool from which the agg renderers are
+        borrowed. Default is the shared pool in agg_renderer_pool module.
+        """
 
         self.agg_renderer = None
         self.renderer_prop = {}
+        self.renderer_pool = _renderer_pool if renderer_pool is None else renderer_pool
 
         # dealing with dpi change in the mixed backend is VERY tricky and often
         # have no easy straightforward solution. It is possible that some
@@ -30,10 +66,45 @@ class ImageEffectBase():
         # self.is_post_affine_setup = False
 
     def clear(self):
+        # return the renderer to the pool so that its buffer can be reused.
+        if self.agg_renderer is not None:
+            self.renderer_pool.release(self.agg_renderer, dirty=self.get_dirty_slices())
         self.agg_renderer = None
         self.renderer_prop = {}
 
-    def init_renderer(self, renderer):
+    def get_dirty_slices(self):
+        """
+        Return the (slice_y, slice_x) of the agg buffer that may have been
+        drawn, or None if unknown (i.e., the whole buffer).
+        """
+        return None
+
+    def get_nonzero_slices(self, alpha):
+        """
+        Return the (slice_y, slice_x) of the nonzero region of the alpha
+        channel of the agg buffer.
+        """
+        dirty = self.get_dirty_slices()
+        if dirty is None:
+            return cbook._get_nonzero_slices(alpha)
+
+        slice_y, slice_x = cbook._get_nonzero_slices(alpha[dirty])
+        if slice_y.stop == 0:
+            return slice_y, slice_x
+
+        y0, x0 = dirty[0].start, dirty[1].start
+        return (
+            slice(y0 + slice_y.start, y0 + slice_y.stop),
+            slice(x0 + slice_x.start, x0 + slice_x.stop),
+        )
+
+    def init_renderer(self, renderer, bbox=None):
+        """
+        Create the agg renderer to draw on. By default, the agg buffer covers
+        the whole canvas. If *bbox* (in the device coordinate of the
+        *renderer*) is given, the buffer only covers the region of the bbox
+        (clipped by the canvas), and the drawing is translated accordingly.
+        """
         if self.agg_renderer is not None:
             if self.renderer_prop["orig_renderer"] is not renderer:
                 raise RuntimeError("inconsistent renderer")
@@ -49,7 +120,7 @@ class ImageEffectBase():
         # the user not the intrinsic 72.
 
         is_mixed_backend = hasattr(renderer, "figure")  # mixed backend. only
-                                                        # tested for pdf.
+        # tested for pdf.
 
         if is_mixed_backend:
             ss = renderer.figure.get_size_inches()
@@ -59,16 +130,65 @@ class ImageEffectBase():
             scale_factor = agg_dpi / renderer._figdpi
         else:
             scale_factor = 1
-            width = renderer.width #* scale_factor
-            height = renderer.height #* scale_factor
+            width = renderer.width  # * scale_factor
+            height = renderer.height  # * scale_factor
+
+        x0, y0 = 0, 0
+        if bbox is not None:
+            # The bbox is a null bbox (with infinite extents) if the path is
+            # empty or fully clipped. It is not intersected with the canvas,
+            # which would give the whole canvas, but gives an empty buffer.
+            if (
+                not np.all(np.isfinite(bbox.extents))
+                or bbox.width <= 0
+                or bbox.height <= 0
+            ):
+                bbox = None
+            else:
+                bbox = Bbox(bbox.get_points() * scale_factor)
+                bbox = Bbox.intersection(bbox, Bbox.from_bounds(0, 0, width, height))
+            if bbox is None:
+                width, height = 0, 0
+            else:
+                x0, y0 = int(np.floor(bbox.x0)), int(np.floor(bbox.y0))
+                width = int(np.ceil(bbox.x1)) - x0
+                height = int(np.ceil(bbox.y1)) - y0
 
-        self.agg_renderer = RendererAgg(int(width), int(height), agg_dpi)
+        self.agg_renderer = self.renderer_pool.acquire(
+            max(int(width), 1), max(int(height), 1), agg_dpi
+        )
         self.renderer_prop.update(
             orig_renderer=renderer,
             is_mixed_backend=is_mixed_backend,
             scale_factor=scale_factor,
             agg_dpi=agg_dpi,
-            height=height)
+            height=height,
+            offset=(x0, y0),
+        )
+
+    def _offset_gc_n_affine(self, gc0, new_affine):
+        """
+        Translate the affine (and the clip rectangle and the clip path of the
+        gc) so that the origin of the agg buffer is at its offset.
+        """
+        ox, oy = self.renderer_prop["offset"]
+        if ox == 0 and oy == 0:
+            return gc0, new_affine
+
+        tr = Affine2D().translate(-ox, -oy)
+
+        gc1 = self.agg_renderer.new_gc()  # Don't modify gc, but a copy!
+        gc1.copy_properties(gc0)
+
+        cliprect = gc0.get_clip_rectangle()
+        if cliprect is not None:
+            gc1.set_clip_rectangle(TransformedBbox(cliprect, tr))
+
+        _tpath, _affine = gc0.get_clip_path()
+        if _tpath is not None:
+            gc1.set_clip_path(TransformedPath(_tpath, _affine + tr))
+
+        return gc1, new_affine + tr
 
     def update_gc_n_affine(self, gc, affine, use_dpi_scale=False):
         self.dpi_scale.affine.clear()
@@ -111,7 +231,7 @@ class ImageEffectBase():
             new_affine = affine
             gc0 = gc
 
-        return gc0, new_affine
+        return self._offset_gc_n_affine(gc0, new_affine)
 
     def draw_with_path_effect(self, path_effect, gc0, tpath, new_affine, rgbFace):
 
@@ -120,26 +240,34 @@ class ImageEffectBase():
         else:
             self.agg_renderer.draw_path(gc0, tpath, new_affine, rgbFace)
 
-    def get_rendered_image(self):
+    def get_rendered_image(self, dtype="float64"):
         orig_img = np.asarray(self.agg_renderer.buffer_rgba())
 
-        slice_y, slice_x = cbook._get_nonzero_slices(orig_img[..., 3])
-        cropped_img = orig_img[slice_y, slice_x] / 255.0
+        slice_y, slice_x = self.get_nonzero_slices(orig_img[..., 3])
+        cropped_img = _crop_image(orig_img, slice_y, slice_x, dtype)
 
         # The cropped_img is in agg_dpi. The x & y need to be scaled with
         # inverse of the scale_factor for translation.
+        ox, oy = self.renderer_prop["offset"]
         return (
             self.renderer_prop["agg_dpi"],
             self.renderer_prop["scale_factor"],
-            slice_x.start,
-            (self.renderer_prop["height"] - slice_y.stop),
-            cropped_img[::-1],
+            ox + slice_x.start,
+            oy + (self.renderer_prop["height"] - slice_y.stop),
+            cropped_img,
         )
 
 
 class ImageEffect(AbstractPathEffect, ImageEffectBase):
-    def __init__(self, image_effect, clip_path_getter=None,
-                 invisible_if_nill_clip_path=True):
+    def __init__(
+        self,
+        image_effect,
+        clip_path_getter=None,
+        invisible_if_nill_clip_path=True,
+        buffer="canvas",
+        buffer_pad=0,
+        cache=None,
+    ):
         """
 
         clip_path_getter: set the clip_path of the resulting image. Need to be a callable
@@ -147,33 +275,129 @@ class ImageEffect(AbstractPathEffect, ImageEffectBase):
 
         invisible_if_nill_clip_path: if clip_path_getter is used and if it retune a
         nil path of length 0, do not draw the image. Default is True.
+
+        buffer: "canvas" or "extent". With "canvas" (default), the artist is
+        rendered on an agg buffer of the size of the whole canvas. With
+        "extent", the buffer only covers the extent of the path (padded by
+        its linewidth), so that the memory and the cost scale with the size
+        of the artist. Note that the padding of the image (e.g., `Pad`) is
+        applied after the rendering and need not be reserved in the buffer.
+
+        buffer_pad: additional padding of the buffer in points, when the
+        buffer is "extent". This is needed if the path effects that come
+        before the ImageEffect in the pipeline move or widen the path (e.g.,
+        `Offset` or `Glow`).
+
+        cache: an ImageEffectCache instance. If given, the processed image is
+        stored in the cache and is reused as long as the path, the gc, the
+        renderer and the effects are unchanged.
         """
-        if clip_path_getter is None or hasattr(clip_path_getter, "get_clip_path") or callable(clip_path_getter):
+        if buffer not in ["canvas", "extent"]:
+            raise ValueError("buffer need to be one of 'canvas' or 'extent'.")
+
+        if (
+            clip_path_getter is None
+            or hasattr(clip_path_getter, "get_clip_path")
+            or callable(clip_path_getter)
+        ):
             self._clip_path_getter = clip_path_getter
         else:
-            raise ValueError("clip_path_getter need to be a callable or an object with get_clip_path method.")
+            raise ValueError(
+                "clip_path_getter need to be a callable or an object with get_clip_path method."
+            )
 
         super().__init__()
 
         self._image_effect = image_effect
         self._path_effect = None
         self._invisible_if_nill_clip_path = invisible_if_nill_clip_path
+        self._buffer = buffer
+        self._buffer_pad = buffer_pad
+        self._cache = cache
 
     def __ror__(self, other: AbstractPathEffect):
-        e = ImageEffect(self._image_effect)
+        e = ImageEffect(
+            self._image_effect,
+            buffer=self._buffer,
+            buffer_pad=self._buffer_pad,
+            cache=self._cache,
+        )
         e._path_effect = other
         return e
 
+    def get_buffer_bbox(self, renderer, gc, tpath, affine):
+        """
+        Return the bbox (in the device coordinate of the renderer) that the
+        agg buffer need to cover.
+        """
+        if self._buffer == "canvas":
+            return None
+
+        bbox = tpath.get_extents(affine)
+
+        # The stroke can extend beyond the path by the miter joins. We
+        # generously pad it with the linewidth and a few pixels for the
+        # antialiasing.
+        pad = renderer.points_to_pixels(gc.get_linewidth() + self._buffer_pad) + 2
+        bbox = bbox.padded(pad)
+
+        cliprect = gc.get_clip_rectangle()
+        if cliprect is not None:
+            bbox = Bbox.intersection(bbox, cliprect) or Bbox.null()
+
+        return bbox
+
     def get_image(self, renderer, gc, tpath, affine, rgbFace):
-        self.init_renderer(renderer)
+        bbox = self.get_buffer_bbox(renderer, gc, tpath, affine)
+        self.init_renderer(renderer, bbox=bbox)
 
         gc0, new_affine = self.update_gc_n_affine(gc, affine)
 
         self.draw_with_path_effect(self._path_effect, gc0, tpath, new_affine, rgbFace)
 
-        return self.get_rendered_image()
+        return self.get_rendered_image(dtype=_get_input_dtype(self._image_effect))
 
-    def draw_path(self, renderer, gc, tpath, affine, rgbFace):
+    def get_cache_key(self, renderer, gc, tpath, affine, rgbFace):
+        """
+        Return the key of the processed image in the cache, or None if the
+        cache is not used or the key cannot be determined.
+        """
+        if self._cache is None:
+            return None
+
+        try:
+            return self._cache.get_key(
+                get_renderer_fingerprint(renderer),
+                get_gc_fingerprint(gc),
+                get_fingerprint(tpath),
+                get_fingerprint(affine),
+                get_fingerprint(rgbFace),
+                get_fingerprint((self._buffer, self._buffer_pad)),
+                get_fingerprint(self._path_effect),
+                get_fingerprint(self._image_effect),
+            )
+        except Uncacheable:
+            return None
+
+    def put_cache(self, key, dpi, scale_factor, x, y, img):
+        """
+        Store the processed image in the cache if the key is not None, and
+        return it (which is converted to uint8 if cached).
+        """
+        if key is not None:
+            # we cache the image in uint8 to save the memory.
+            if img.dtype.kind == 'f':
+                img = np.asarray(img * 255.0, np.uint8)
+            self._cache.put(key, dpi, scale_factor, x, y, img)
+
+        return dpi, scale_factor, x, y, img
+
+    def get_processed_image(self, renderer, gc, tpath, affine, rgbFace):
+        key = self.get_cache_key(renderer, gc, tpath, affine, rgbFace)
+        if key is not None:
+            r = self._cache.get(key)
+            if r is not None:
+                return r
 
         dpi, scale_factor, x, y, img = self.get_image(
             renderer, gc, tpath, affine, rgbFace
@@ -183,40 +407,184 @@ class ImageEffect(AbstractPathEffect, ImageEffectBase):
             dpi, scale_factor, x, y, img
         )
 
-        if self._clip_path_getter is not None:
-            gc0 = gc
-            gc = renderer.new_gc()  # Don't modify gc, but a copy!
-            gc.copy_properties(gc0)
+        return self.put_cache(key, dpi, scale_factor, x, y, img)
 
-            if hasattr(self._clip_path_getter, "get_clip_path"):
-                clip_path, affine = self._clip_path_getter.get_clip_path()
-            elif callable(self._clip_path_getter):
-                clip_path, affine = self._clip_path_getter()
-            else:
-                raise ValueError("clip_path_getter need to be a callable or an object with get_clip_path method.")
+    def get_clipped_gc(self, renderer, gc):
+        """
+        Return the gc with the clip path from the clip_path_getter, or None
+        if the image should not be drawn.
+        """
+        if self._clip_path_getter is None:
+            return gc
 
-            if self._invisible_if_nill_clip_path and len(clip_path) == 0:
-                self.clear()
-                return
+        gc0 = gc
+        gc = renderer.new_gc()  # Don't modify gc, but a copy!
+        gc.copy_properties(gc0)
 
-            pp = TransformedPath(clip_path, affine)
+        if hasattr(self._clip_path_getter, "get_clip_path"):
+            clip_path, affine = self._clip_path_getter.get_clip_path()
+        elif callable(self._clip_path_getter):
+            clip_path, affine = self._clip_path_getter()
+        else:
+            raise ValueError(
+                "clip_path_getter need to be a callable or an object with get_clip_path method."
+            )
 
-            gc.set_clip_path(pp)
+        if self._invisible_if_nill_clip_path and len(clip_path) == 0:
+            return None
 
+        pp = TransformedPath(clip_path, affine)
 
+        gc.set_clip_path(pp)
+
+        return gc
+
+    def _draw_image(self, renderer, gc, dpi, scale_factor, x, y, img):
         if img.size:
             if img.dtype.kind == 'f':
                 img = np.asarray(img * 255.0, np.uint8)
             renderer.draw_image(gc, x / scale_factor, y / scale_factor, img)
 
+    def _submit(self, batch, renderer, gc, tpath, affine, rgbFace):
+        # The image is rendered now, and processed on the thread pool. The
+        # gc is copied as it can be modified before the image is drawn.
+        key = self.get_cache_key(renderer, gc, tpath, affine, rgbFace)
+        cached = self._cache.get(key) if key is not None else None
+        if cached is None:
+            rendered = self.get_image(renderer, gc, tpath, affine, rgbFace)
+            self.clear()
+
+        gc0 = self.get_clipped_gc(renderer, gc)
+        if gc0 is None:
+            return
+        elif gc0 is gc:
+            gc0 = renderer.new_gc()
+            gc0.copy_properties(gc)
+
+        # The image effect is copied as it is not thread-safe in general.
+        image_effect = copy.deepcopy(self._image_effect)
+
+        def process():
+            if cached is not None:
+                return cached
+            return image_effect.process_image(*rendered)
+
+        def draw(processed):
+            # the cache is only accessed in the main thread.
+            if cached is None:
+                processed = self.put_cache(key, *processed)
+            self._draw_image(renderer, gc0, *processed)
+            gc0.restore()
+
+        batch.submit(process, draw)
+
+    def draw_path(self, renderer, gc, tpath, affine, rgbFace):
+
+        batch = get_current_batch()
+        if batch is not None:
+            self._submit(batch, renderer, gc, tpath, affine, rgbFace)
+            return
+
+        dpi, scale_factor, x, y, img = self.get_processed_image(
+            renderer, gc, tpath, affine, rgbFace
+        )
+
+        gc = self.get_clipped_gc(renderer, gc)
+        if gc is None:
+            self.clear()
+            return
+
+        self._draw_image(renderer, gc, dpi, scale_factor, x, y, img)
+
         self.clear()
 
 
 class ImageClipboard(ImageEffectBase):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, renderer_pool=None):
+        super().__init__(renderer_pool=renderer_pool)
+
+        # The region of the agg buffer (in its device coordinate) that has
+        # been drawn. The pastes only look for the image within this region,
+        # and only this region is cleared when the buffer is reused.
+        self._dirty_bbox = None
+
+    def clear(self):
+        super().clear()
+        self._dirty_bbox = None
+
+    def add_dirty_region(self, bbox=None):
+        """
+        Add the bbox (in the device coordinate of the agg buffer) to the dirty
+        region. If None, the whole buffer becomes dirty.
+        """
+        r = self.agg_renderer
+        buffer_bbox = Bbox.from_bounds(0, 0, r.width, r.height)
+        if bbox is None:
+            bbox = buffer_bbox
+        else:
+            bbox = Bbox.intersection(bbox, buffer_bbox)
+            if bbox is None:
+                return
+
+        if self._dirty_bbox is not None:
+            bbox = Bbox.union([self._dirty_bbox, bbox])
+
+        self._dirty_bbox = bbox
+
+    def get_dirty_slices(self):
+        bbox = self._dirty_bbox
+        if self.agg_renderer is None or bbox is None:
+            return slice(0, 0), slice(0, 0)
+
+        h = self.agg_renderer.height
+        x0, y0 = int(np.floor(bbox.x0)), int(np.floor(bbox.y0))
+        x1, y1 = int(np.ceil(bbox.x1)), int(np.ceil(bbox.y1))
+        return slice(h - y1, h - y0), slice(x0, x1)
+
+    def _get_path_bbox(self, gc, tpath, affine):
+        # The extent of the stroke. The miter joins can extend beyond the
+        # path by up to twice the linewidth (the miter limit of agg is 4).
+        if gc.get_sketch_params() is not None:
+            return None
+
+        bbox = tpath.get_extents(affine)
+        pad = 2 * self.agg_renderer.points_to_pixels(gc.get_linewidth()) + 2
+        bbox = bbox.padded(pad)
 
-    def copy(self, use_dpi_scale=False ):
+        cliprect = gc.get_clip_rectangle()
+        if cliprect is not None:
+            bbox = Bbox.intersection(bbox, cliprect) or Bbox.null()
+
+        return bbox
+
+    def draw_with_path_effect(self, path_effect, gc0, tpath, new_affine, rgbFace):
+        # The dirty region is tracked only if the path effect simply converts
+        # the path (chainable path effects). Otherwise, the whole buffer
+        # becomes dirty.
+        if (
+            path_effect is not None
+            and type(path_effect).draw_path is not ChainablePathEffect.draw_path
+        ):
+            self.add_dirty_region(None)
+            super().draw_with_path_effect(path_effect, gc0, tpath, new_affine, rgbFace)
+            return
+
+        renderer = self.agg_renderer
+        if path_effect is not None:
+            renderer, gc0, tpath, new_affine, rgbFace = path_effect._convert(
+                renderer, gc0, tpath, new_affine, rgbFace
+            )
+            if renderer is None:
+                return
+
+        if renderer is self.agg_renderer:
+            self.add_dirty_region(self._get_path_bbox(gc0, tpath, new_affine))
+        else:
+            self.add_dirty_region(None)
+
+        renderer.draw_path(gc0, tpath, new_affine, rgbFace)
+
+    def copy(self, use_dpi_scale=False):
         return CopyToClipboard(self, use_dpi_scale=use_dpi_scale)
 
     def paste(self, image_effect, clear=True):
@@ -224,8 +592,9 @@ class ImageClipboard(ImageEffectBase):
 
 
 class CopyToClipboard(AbstractPathEffect):
-    def __init__(self, clipboard, path_effect=None, stop_drawing=True,
-                 use_dpi_scale=None):
+    def __init__(
+        self, clipboard, path_effect=None, stop_drawing=True, use_dpi_scale=None
+    ):
         """
         clipboard : Clipboard
         """
@@ -249,14 +618,18 @@ class CopyToClipboard(AbstractPathEffect):
         clipboard.init_renderer(renderer)
 
         if self._path_effect is None:
-            gc0, new_affine = clipboard.update_gc_n_affine(gc, affine,
-                                                           use_dpi_scale=self._use_dpi_scale)
+            gc0, new_affine = clipboard.update_gc_n_affine(
+                gc, affine, use_dpi_scale=self._use_dpi_scale
+            )
         else:
-            gc0, new_affine = clipboard.update_gc_n_affine(gc, affine,
-                                                           use_dpi_scale=self._use_dpi_scale)
+            gc0, new_affine = clipboard.update_gc_n_affine(
+                gc, affine, use_dpi_scale=self._use_dpi_scale
+            )
             # gc0, new_affine = gc, affine
 
-        clipboard.draw_with_path_effect(self._path_effect, gc0, tpath, new_affine, rgbFace)
+        clipboard.draw_with_path_effect(
+            self._path_effect, gc0, tpath, new_affine, rgbFace
+        )
 
         if not self.stop_drawing:
             renderer.draw_path(gc, tpath, affine, rgbFace)
@@ -275,7 +648,9 @@ class PasteFromClipboard(AbstractPathEffect):
 
     def draw_path(self, renderer, gc, tpath, affine, rgbFace):
 
-        dpi, scale_factor, x, y, img = self.clipboard.get_rendered_image()
+        dpi, scale_factor, x, y, img = self.clipboard.get_rendered_image(
+            dtype=_get_input_dtype(self._image_effect)
+        )
 
         if self._image_effect is not None:
             dpi, scale_factor, x, y, img = self._image_effect.process_image(
@@ -293,9 +668,7 @@ class PasteFromClipboard(AbstractPathEffect):
 
 
 class ClipboardPasteArtist(Artist):
-    def __init__(self, clipboard, image_effect=None,
-                 clear=True,
-                 **kw):
+    def __init__(self, clipboard, image_effect=None, clear=True, **kw):
         super().__init__(**kw)
         self._clipboard = clipboard
         self._image_effect = image_effect
@@ -310,17 +683,20 @@ class ClipboardPasteArtist(Artist):
 
         orig_img = self.adjust_image(renderer, orig_img)
 
-        slice_y, slice_x = cbook._get_nonzero_slices(orig_img[..., 3])
-        cropped_img = orig_img[slice_y, slice_x] / 255.0
+        slice_y, slice_x = clipboard.get_nonzero_slices(orig_img[..., 3])
+        cropped_img = _crop_image(
+            orig_img, slice_y, slice_x, _get_input_dtype(self._image_effect)
+        )
 
         # The cropped_img is in agg_dpi. The x & y need to be scaled with
         # inverse of the scale_factor for translation.
+        ox, oy = clipboard.renderer_prop["offset"]
         return (
             clipboard.renderer_prop["agg_dpi"],
             clipboard.renderer_prop["scale_factor"],
-            slice_x.start,
-            (clipboard.renderer_prop["height"] - slice_y.stop),
-            cropped_img[::-1],
+            ox + slice_x.start,
+            oy + (clipboard.renderer_prop["height"] - slice_y.stop),
+            cropped_img,
         )
 
     def draw(self, renderer):
@@ -355,13 +731,17 @@ class ReflectionArtist(ClipboardPasteArtist):
     - We use gaussian funtion of this distance and use it as the alpha channel, so that
     the reflected image gradually become transparent away from the original object.
     """
-    def __init__(self, clipboard,
-                 clipboard_alpha,
-                 clear_alpha=False,
-                 alpha_dist_sigma=40,
-                 alpha_default=0.3,
-                 image_effect=None,
-                 **kw):
+
+    def __init__(
+        self,
+        clipboard,
+        clipboard_alpha,
+        clear_alpha=False,
+        alpha_dist_sigma=40,
+        alpha_default=0.3,
+        image_effect=None,
+        **kw
+    ):
         super().__init__(clipboard, image_effect, **kw)
 
         self._clipboard_alpha = clipboard_alpha
@@ -369,26 +749,69 @@ class ReflectionArtist(ClipboardPasteArtist):
         self._alpha_dist_sigma = alpha_dist_sigma
         self._alpha_default = alpha_default
 
+        # (key, falloff) of the last draw.
+        self._falloff_cache = None
+
+    def _get_falloff(self, alpha, slices, sigma):
+        """
+        Return exp(-(dist/sigma)**2) for the region of the slices, where dist
+        is the distance to the nearest nonzero pixel of the alpha, and 0
+        beyond the cutoff (where the alpha is 0 in uint8 anyway).
+        """
+        if self._alpha_default * 255 <= 1:
+            cutoff = 0
+        else:
+            cutoff = sigma * np.sqrt(np.log(self._alpha_default * 255))
+
+        ny, nx = alpha.shape
+        pad = int(np.ceil(cutoff))
+        slice_y, slice_x = slices
+        y0, y1 = max(slice_y.start - pad, 0), min(slice_y.stop + pad, ny)
+        x0, x1 = max(slice_x.start - pad, 0), min(slice_x.stop + pad, nx)
+        alpha_padded = alpha[y0:y1, x0:x1]
+
+        key = (slices, sigma, cutoff, _hash_array(alpha_padded))
+        if self._falloff_cache is not None and self._falloff_cache[0] == key:
+            return self._falloff_cache[1]
+
+        region = (
+            slice(slice_y.start - y0, slice_y.stop - y0),
+            slice(slice_x.start - x0, slice_x.stop - x0),
+        )
+        if alpha_padded.any():
+            dist = NI.distance_transform_edt(alpha_padded == 0)[region]
+            falloff = np.where(dist <= cutoff, np.exp(-((dist / sigma) ** 2)), 0)
+        else:
+            falloff = np.zeros(alpha_padded[region].shape)
+
+        self._falloff_cache = key, falloff
+        return falloff
+
     def adjust_image(self, renderer, orig_img):
+        slice_y, slice_x = self._clipboard.get_nonzero_slices(orig_img[..., 3])
+        if slice_y.stop == 0:
+            return orig_img
+
+        scale = self._clipboard.renderer_prop["scale_factor"]
+        sigma = renderer.points_to_pixels(self._alpha_dist_sigma) * scale
+
         if self._clipboard_alpha is not None:
             alpha_img = np.asarray(self._clipboard_alpha.agg_renderer.buffer_rgba())
-            alpha = alpha_img[..., -1]/255.
-            dist = NI.distance_transform_edt(alpha==0)
-            scale = self._clipboard.renderer_prop["scale_factor"]
-
-            sigma = renderer.points_to_pixels(self._alpha_dist_sigma) * scale
-            ee = np.exp(-(dist/sigma)**2)*orig_img[..., 3]/255.*self._alpha_default
-            orig_img[..., 3] = (255*ee).astype("uint8")
+            falloff = self._get_falloff(alpha_img[..., -1], (slice_y, slice_x), sigma)
+            subim = orig_img[slice_y, slice_x, 3] / 255.0
+            ee = falloff * subim * self._alpha_default
         else:
-            slice_y, slice_x = cbook._get_nonzero_slices(orig_img[..., 3])
             subim = orig_img[slice_y, slice_x, 3] / 255
-            scale = self._clipboard.renderer_prop["scale_factor"]
 
             ny = subim.shape[0]
             dist = np.arange(ny)
-            sigma = renderer.points_to_pixels(self._alpha_dist_sigma) * scale
-            ee = np.exp(-(dist[:, np.newaxis]/sigma)**2)*subim*self._alpha_default
-            orig_img[..., 3][slice_y, slice_x] = (255*ee).astype("uint8")
+            ee = (
+                np.exp(-((dist[:, np.newaxis] / sigma) ** 2))
+                * subim
+                * self._alpha_default
+            )
+
+        orig_img[..., 3][slice_y, slice_x] = (255 * ee).astype("uint8")
 
         return orig_img
 
@@ -398,4 +821,3 @@ class ReflectionArtist(ClipboardPasteArtist):
 
         if self._clipboard_alpha is not None and self._clear_alpha:
             self._clipboard_alpha.clear()
-
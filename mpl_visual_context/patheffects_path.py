@@ -1,13 +1,18 @@
 """
 Defines classes for path effects that modifies the path and/or fill behavior.
 """
+
 import numpy as np
 from matplotlib.path import Path
 import matplotlib.transforms as mtransforms
 from matplotlib.transforms import Bbox
 from matplotlib.transforms import Affine2D, IdentityTransform
 import matplotlib.colors as mcolors
-from .patheffects_base import ChainablePathEffect, AbstractPathEffect
+from .patheffects_base import (
+    ChainablePathEffect,
+    AbstractPathEffect,
+    InplaceGCPathEffect,
+)
 from .image_box import TR
 from .bezier_helper import get_inverted_path
 
@@ -17,21 +22,29 @@ class StrokeOnly(ChainablePathEffect):
     PathEffect with only stroke. This is done by setting the fill color
     to None.
     """
+
+    gc_mode = "keep"
+
     def _convert(self, renderer, gc, tpath, affine, rgbFace=None):
 
         return renderer, gc, tpath, affine, None
 
+    def _convert_collection(self, renderer, gc, coll):
+        return renderer, gc, coll._replace(facecolors=np.zeros((0, 4)))
 
-class FillOnly(ChainablePathEffect):
+
+class FillOnly(InplaceGCPathEffect):
     """
     PathEffect with only fill. This is done by setting the linewidth to 0.
     """
-    def _convert(self, renderer, gc, tpath, affine, rgbFace=None):
-        gc0 = renderer.new_gc()
-        gc0.copy_properties(gc)
-        gc0.set_linewidth(0)
 
-        return renderer, gc0, tpath, affine, rgbFace
+    def _convert_inplace(self, renderer, gc, tpath, affine, rgbFace=None):
+        gc.set_linewidth(0)
+
+        return renderer, gc, tpath, affine, rgbFace
+
+    def _convert_collection(self, renderer, gc, coll):
+        return renderer, gc, coll._replace(linewidths=[0.0])
 
 
 class Partial(ChainablePathEffect):
@@ -39,10 +52,13 @@ class Partial(ChainablePathEffect):
     PathEffect with that preserve only a part of the path. It only support
     lines (no bezier splines).
     """
+
+    gc_mode = "keep"
+
     def __init__(self, start, stop):
         """
         start, stop : index (if int) or fraction (if float)
-       """
+        """
         super().__init__()
         self._start = start
         self._stop = stop
@@ -70,6 +86,8 @@ class Open(ChainablePathEffect):
     code to STOP.
     """
 
+    gc_mode = "keep"
+
     def _convert(self, renderer, gc, tpath, affine, rgbFace=None):
         codes, vertices = tpath.codes, tpath.vertices
 
@@ -83,6 +101,7 @@ class Open(ChainablePathEffect):
 # original code from
 # https://www.particleincell.com/wp-content/uploads/2012/06/bezier-spline.js
 
+
 def _computeControlPoints(K):
     nn = len(K)
     n = nn - 1
@@ -98,35 +117,35 @@ def _computeControlPoints(K):
     a[0] = 0
     b[0] = 2
     c[0] = 1
-    r[0] = K[0] + 2*K[1]
+    r[0] = K[0] + 2 * K[1]
 
-    for i in range(1, n-1):
-        a[i]=1
-        b[i]=4
-        c[i]=1
-        r[i] = 4 * K[i] + 2 * K[i+1]
+    for i in range(1, n - 1):
+        a[i] = 1
+        b[i] = 4
+        c[i] = 1
+        r[i] = 4 * K[i] + 2 * K[i + 1]
 
-    a[n-1] = 2
-    b[n-1] = 7
-    c[n-1] = 0
-    r[n-1] = 8*K[n-1] + K[n]
+    a[n - 1] = 2
+    b[n - 1] = 7
+    c[n - 1] = 0
+    r[n - 1] = 8 * K[n - 1] + K[n]
 
     # /*solves Ax=b with the Thomas algorithm (from Wikipedia)*/
     for i in range(1, n):
-        m = a[i] / b[i-1]
-        b[i] = b[i] - m * c[i-1]
-        r[i] = r[i] - m * r[i-1]
+        m = a[i] / b[i - 1]
+        b[i] = b[i] - m * c[i - 1]
+        r[i] = r[i] - m * r[i - 1]
 
-    p1[n-1] = r[n-1]/b[n-1]
+    p1[n - 1] = r[n - 1] / b[n - 1]
 
-    for i in range(n-2, -1, -1):
-        p1[i] = (r[i] - c[i] * p1[i+1]) / b[i]
+    for i in range(n - 2, -1, -1):
+        p1[i] = (r[i] - c[i] * p1[i + 1]) / b[i]
 
     # /*we have p1, now compute p2*/
-    for i in range(0, n-1):
-        p2[i] = 2*K[i+1] - p1[i+1]
+    for i in range(0, n - 1):
+        p2[i] = 2 * K[i + 1] - p1[i + 1]
 
-    p2[n-1] = 0.5*(K[n] + p1[n-1])
+    p2[n - 1] = 0.5 * (K[n] + p1[n - 1])
 
     return p1, p2
 
@@ -136,6 +155,9 @@ class Smooth(ChainablePathEffect):
     PathEffect that transform the given lines to smooth bezier path.
     If the path is not line (not closed), the path is not changed.
     """
+
+    gc_mode = "keep"
+
     def __init__(self, skip_incompatible=False):
         """
         skip_incompatible : do not draw the path if incompatible. Default if False (the path is drawn as is)
@@ -152,7 +174,7 @@ class Smooth(ChainablePathEffect):
         xp1, xp2 = _computeControlPoints(x)
         yp1, yp2 = _computeControlPoints(y)
 
-        xy = np.empty(shape=(n*3-2, 2), dtype=float)
+        xy = np.empty(shape=(n * 3 - 2, 2), dtype=float)
 
         xy[::3] = vertices
 
@@ -171,8 +193,9 @@ class Smooth(ChainablePathEffect):
     def _convert(self, renderer, gc, tpath, affine, rgbFace=None):
         codes, vertices = tpath.codes, tpath.vertices
 
-        if codes is not None and (codes[0] != Path.MOVETO or
-                                  np.any(codes[1:] != Path.LINETO)):
+        if codes is not None and (
+            codes[0] != Path.MOVETO or np.any(codes[1:] != Path.LINETO)
+        ):
             if self._skip_incompatible:
                 renderer = None
 
@@ -191,6 +214,9 @@ class SmoothFillBetween(Smooth):
     (one for upper/left boundary another for lower/right boundary), which
     are smoothed separately then combined.
     """
+
+    gc_mode = "keep"
+
     def __init__(self, skip_incompatible=False, skip_first_n=0):
         """
         skip_incompatible : do not draw the path if incompatible. Default if False (the path is drawn as is)
@@ -205,9 +231,11 @@ class SmoothFillBetween(Smooth):
     def _convert(self, renderer, gc, tpath, affine, rgbFace=None):
         codes, vertices = tpath.codes, tpath.vertices
 
-        if codes is not None and (codes[0] != Path.MOVETO or
-                                  np.any(codes[1:-1] != Path.LINETO) or
-                                  codes[-1] != Path.CLOSEPOLY):
+        if codes is not None and (
+            codes[0] != Path.MOVETO
+            or np.any(codes[1:-1] != Path.LINETO)
+            or codes[-1] != Path.CLOSEPOLY
+        ):
             if self._skip_incompatible:
                 renderer = None
 
@@ -216,10 +244,8 @@ class SmoothFillBetween(Smooth):
         n = len(vertices) // 2
         u = self._skip_first_n
 
-        v1, c1 = self._make_smooth_path(vertices[u:n],
-                                        start_code=Path.MOVETO)
-        v2, c2 = self._make_smooth_path(vertices[n+u:2*n],
-                                        start_code=Path.LINETO)
+        v1, c1 = self._make_smooth_path(vertices[u:n], start_code=Path.MOVETO)
+        v2, c2 = self._make_smooth_path(vertices[n + u : 2 * n], start_code=Path.LINETO)
 
         vv = np.vstack([v1, v2, v1[:1]])
         cc = np.hstack([c1, c2, [Path.CLOSEPOLY]])
@@ -241,16 +267,16 @@ def _get_rounded(v0, v1, v2, dl):
     l10 = np.hypot(dx10, dy10)
     l12 = np.hypot(dx12, dy12)
 
-    if l10 == 0 or l12 == 0: # some paths have repeating points. We just skip those.
+    if l10 == 0 or l12 == 0:  # some paths have repeating points. We just skip those.
         return None
 
-    if l10 < 2*dl:
-        dl10 = l10*0.5
+    if l10 < 2 * dl:
+        dl10 = l10 * 0.5
     else:
         dl10 = dl
 
-    if l12 < 2*dl:
-        dl12 = l12*0.5
+    if l12 < 2 * dl:
+        dl12 = l12 * 0.5
     else:
         dl12 = dl
 
@@ -264,6 +290,8 @@ def _get_rounded(v0, v1, v2, dl):
 
 
 class RoundCorner(ChainablePathEffect):
+    gc_mode = "keep"
+
     def __init__(self, round_size=20, i_selector=None):
         super().__init__()
         self.round_size = round_size
@@ -276,7 +304,7 @@ class RoundCorner(ChainablePathEffect):
         tp = affine.transform_path(tpath)
         codes, vertices = tp.codes, tp.vertices
         if codes is None:
-            codes = [Path.MOVETO] + [Path.LINETO] * (len(vertices)-1)
+            codes = [Path.MOVETO] + [Path.LINETO] * (len(vertices) - 1)
 
         select_i = self.i_selector
 
@@ -286,18 +314,20 @@ class RoundCorner(ChainablePathEffect):
         # at the end). We should refactor the code so that the path is split,
         # rounded, and merged.
         c0, v0 = codes[0], vertices[0]
-        v_start = [v0[0], v0[1]] # we may replace its values later
+        v_start = [v0[0], v0[1]]  # we may replace its values later
         cc, vv = [c0], [v_start]
-        for i in range(1, len(codes)-1):
-            c0, c1, c2 = codes[i-1:i+2]
-            v0, v1, v2 = vertices[i-1:i+2]
-            if not (c0 in [Path.MOVETO, Path.LINETO] and
-                    c1 == Path.LINETO and
-                    c2 in [Path.LINETO, Path.CLOSEPOLY, Path.STOP]):
+        for i in range(1, len(codes) - 1):
+            c0, c1, c2 = codes[i - 1 : i + 2]
+            v0, v1, v2 = vertices[i - 1 : i + 2]
+            if not (
+                c0 in [Path.MOVETO, Path.LINETO]
+                and c1 == Path.LINETO
+                and c2 in [Path.LINETO, Path.CLOSEPOLY, Path.STOP]
+            ):
                 cc.append(c1)
                 vv.append(v1)
 
-                if c1 == Path.MOVETO: # to support broken path
+                if c1 == Path.MOVETO:  # to support broken path
                     v_start = [v1[0], v1[1]]
                 continue
 
@@ -313,7 +343,7 @@ class RoundCorner(ChainablePathEffect):
         n = len(codes)
         c0, c1 = codes[-2:]
         v0, v1 = vertices[-2:]
-        if (c1 == Path.CLOSEPOLY and select_i(n-11)):
+        if c1 == Path.CLOSEPOLY and select_i(n - 11):
             ww = _get_rounded(v0, v1, vertices[1], dl)
             vv.extend(ww)
             cc.extend([Path.LINETO, Path.CURVE3, Path.CURVE3])
@@ -326,53 +356,62 @@ class RoundCorner(ChainablePathEffect):
         return renderer, gc, new_tpath, affine, rgbFace
 
 
-class ClipPathFromPatch(ChainablePathEffect):
+class ClipPathFromPatch(InplaceGCPathEffect):
     """
     PathEffect that clips the path using a provided patch.
     """
+
+    # declared again, as `_convert` is overridden.
+    gc_mode = "inplace"
+
     def __init__(self, patch):
         super().__init__()
         self.patch = patch
 
     def _convert(self, renderer, gc, tpath, affine, rgbFace):
+        if self.patch is None:
+            return renderer, gc, tpath, affine, rgbFace
+
+        return super()._convert(renderer, gc, tpath, affine, rgbFace)
+
+    def _convert_inplace(self, renderer, gc, tpath, affine, rgbFace):
         if self.patch is not None:
-            gc0 = renderer.new_gc()  # Don't modify gc, but a copy!
-            gc0.copy_properties(gc)
             pp = mtransforms.TransformedPath(
                 self.patch.get_path(), self.patch.get_transform()
             )
-            gc0.set_clip_path(pp)
-        else:
-            gc0 = gc
+            gc.set_clip_path(pp)
 
-        return renderer, gc0, tpath, affine, rgbFace
+        return renderer, gc, tpath, affine, rgbFace
+
+    def _convert_collection(self, renderer, gc, coll):
+        renderer, gc, _, _, _ = self._convert(renderer, gc, None, None, None)
+        return renderer, gc, coll
 
 
-class ClipPathSelf(ChainablePathEffect):
+class ClipPathSelf(InplaceGCPathEffect):
     """
     PathEffect that sets the clip_path to the path itself. This is useful when
     the path is modified down in the pipeline.
     """
+
     def __init__(self):
         super().__init__()
 
-    def _convert(self, renderer, gc, tpath, affine, rgbFace):
-        gc0 = renderer.new_gc()  # Don't modify gc, but a copy!
-        gc0.copy_properties(gc)
+    def _convert_inplace(self, renderer, gc, tpath, affine, rgbFace):
         pp = mtransforms.TransformedPath(tpath, affine)
-        gc0.set_clip_path(pp)
+        gc.set_clip_path(pp)
 
-        return renderer, gc0, tpath, affine, rgbFace
+        return renderer, gc, tpath, affine, rgbFace
 
 
-class ClipRect(ChainablePathEffect):
+class ClipRect(InplaceGCPathEffect):
     """
     PathEffect that modifies the clip_rect using the given coordinate
     (and transform). In most case, the default clip_rect is the bbox of
     the axes.
     """
-    def __init__(self, ax, left=None, bottom=None, right=None, top=None,
-                 coords="data"):
+
+    def __init__(self, ax, left=None, bottom=None, right=None, top=None, coords="data"):
         """
         ax : axes instance that will be used to get the data coordinate and etc.
         left, bottom, right, top: values in the given coordinate. Not changed if None.
@@ -380,18 +419,15 @@ class ClipRect(ChainablePathEffect):
         """
         super().__init__()
         self.ax = ax
-        self.left= left
+        self.left = left
         self.bottom = bottom
         self.right = right
         self.top = top
 
         self.coords = coords
 
-    def _convert(self, renderer, gc, tpath, affine, rgbFace):
-        gc0 = renderer.new_gc()  # Don't modify gc, but a copy!
-        gc0.copy_properties(gc)
-
-        cliprect = gc0.get_clip_rectangle()
+    def _convert_inplace(self, renderer, gc, tpath, affine, rgbFace):
+        cliprect = gc.get_clip_rectangle()
 
         left, bottom, right, top = cliprect.extents
 
@@ -400,21 +436,27 @@ class ClipRect(ChainablePathEffect):
         left = left if self.left is None else tr.transform_point([self.left, 0])[0]
         right = right if self.right is None else tr.transform_point([self.right, 0])[0]
 
-        bottom = bottom if self.bottom is None else tr.transform_point([0, self.bottom])[1]
+        bottom = (
+            bottom if self.bottom is None else tr.transform_point([0, self.bottom])[1]
+        )
         top = top if self.top is None else tr.transform_point([0, self.top])[1]
 
         cliprect0 = Bbox.from_extents(left, bottom, right, top)
-        gc0.set_clip_rectangle(cliprect0)
+        gc.set_clip_rectangle(cliprect0)
 
-        return renderer, gc0, tpath, affine, rgbFace
+        return renderer, gc, tpath, affine, rgbFace
+
+    def _convert_collection(self, renderer, gc, coll):
+        renderer, gc, _, _, _ = self._convert(renderer, gc, None, None, None)
+        return renderer, gc, coll
 
 
 class TextAlongArc(ChainablePathEffect):
-    def __init__(
-            self, R, smooth_line=False, n_split=2
-    ):
+    gc_mode = "keep"
+
+    def __init__(self, R, smooth_line=False, n_split=2):
         """
-        smooth_line : try to 
+        smooth_line : try to
         """
         self._smooth_line = smooth_line
         self.R = R
@@ -424,8 +466,8 @@ class TextAlongArc(ChainablePathEffect):
     def _transform_vertices(v, R, affine):
         xmin, ymin = np.min(v, axis=0)
         xmax, ymax = np.max(v, axis=0)
-        xc = 0.5*(xmin + xmax)
-        yc = 0.5*(ymin + ymax)
+        xc = 0.5 * (xmin + xmax)
+        yc = 0.5 * (ymin + ymax)
         w, h = xmax - xmin, ymax - ymin
 
         v1 = v - [xc, yc]
@@ -434,9 +476,9 @@ class TextAlongArc(ChainablePathEffect):
         # Since the path will be modified before affine, we scale the R with
         # the length of h in the transformed space.
         xc0, yc0 = affine.transform_point([xc, yc])
-        xc1, yc1 = affine.transform_point([xc+w, yc])
-        xc2, yc2 = affine.transform_point([xc, yc+h])
-        w_, h_ = np.hypot([xc1-xc0, xc2-xc0], [yc1-yc0, yc2-yc0])
+        xc1, yc1 = affine.transform_point([xc + w, yc])
+        xc2, yc2 = affine.transform_point([xc, yc + h])
+        w_, h_ = np.hypot([xc1 - xc0, xc2 - xc0], [yc1 - yc0, yc2 - yc0])
 
         if R is None:
             # We assume that the tpath + affine is modified such that R is a
@@ -451,8 +493,8 @@ class TextAlongArc(ChainablePathEffect):
             R = R / h_ * h
 
         theta = dx / R
-        xn = xc + (R+dy)*np.sin(theta)
-        yn = yc + (R+dy)*np.cos(theta) - R
+        xn = xc + (R + dy) * np.sin(theta)
+        yn = yc + (R + dy) * np.cos(theta) - R
 
         v = np.array([xn, yn]).T
 
@@ -463,23 +505,23 @@ class TextAlongArc(ChainablePathEffect):
         # We will split a single staraigh line in to multiple line segments.
         # Later, we will convert this to a smoothe line.
         ns = n_split * 3  # Since a line segment will be converted to a
-                               # cubic bezier, we make enough room for it.
+        # cubic bezier, we make enough room for it.
         if smooth_line:
             indices_to_smooth = []  # list of indices where a line is converted
-                                    # to curve.
+            # to curve.
             last_node = None
             v, c = [], []
             for v1, c1 in tpath.iter_segments(simplify=False):
                 if c1 == Path.LINETO:
-                    vx = np.linspace(last_node[0], v1[0], ns+1)[1:]
-                    vy = np.linspace(last_node[1], v1[1], ns+1)[1:]
+                    vx = np.linspace(last_node[0], v1[0], ns + 1)[1:]
+                    vy = np.linspace(last_node[1], v1[1], ns + 1)[1:]
                     v_ = np.array([vx, vy]).T
                     v.append(v_)
                     indices_to_smooth.append(len(c))
                     # Note that the codes is populated assuming that the
                     # straight line will be converted to smooth cubic bezier
                     # curve.
-                    c.extend([Path.CURVE4]*ns)
+                    c.extend([Path.CURVE4] * ns)
                 else:
                     v_ = v1.reshape((-1, 2))
                     v.append(v_)
@@ -493,9 +535,9 @@ class TextAlongArc(ChainablePathEffect):
             v = cls._transform_vertices(v, R, affine)
 
             for i in indices_to_smooth:
-                v1 = v[i-1:i+ns:3]
+                v1 = v[i - 1 : i + ns : 3]
                 v2, _ = Smooth._make_smooth_path(v1)
-                v[i-1:i+ns] = v2
+                v[i - 1 : i + ns] = v2
 
             path = Path(v, codes=codes)
 
@@ -508,23 +550,30 @@ class TextAlongArc(ChainablePathEffect):
     def _convert(self, renderer, gc, tpath, affine, rgbFace=None):
 
         if self.R is None or (self.R and np.isfinite(self.R)):
-            tpath = self.make_curved(tpath, self.R, affine,
-                                     smooth_line=self._smooth_line,
-                                     n_split=self.n_split)
+            tpath = self.make_curved(
+                tpath,
+                self.R,
+                affine,
+                smooth_line=self._smooth_line,
+                n_split=self.n_split,
+            )
 
         return renderer, gc, tpath, affine, rgbFace
 
 
 class ClosedPathSelector(ChainablePathEffect):
+    gc_mode = "keep"
+
     def __init__(self, selector):
         self._selector = selector
 
     def _convert(self, renderer, gc, tpath, affine, rgbFace=None):
         idx = np.where(tpath.codes == Path.CLOSEPOLY)
-        code_splits = np.split(tpath.codes, idx[0]+1)
-        vert_splits = np.split(tpath.vertices, idx[0]+1)
+        code_splits = np.split(tpath.codes, idx[0] + 1)
+        vert_splits = np.split(tpath.vertices, idx[0] + 1)
 
-        tp = Path(vertices=vert_splits[self._selector],
-                  codes=code_splits[self._selector])
+        tp = Path(
+            vertices=vert_splits[self._selector], codes=code_splits[self._selector]
+        )
 
         return renderer, gc, tp, affine, rgbFace
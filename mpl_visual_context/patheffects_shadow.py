@@ -8,24 +8,22 @@ from matplotlib.patches import PathPatch
 from .bezier_helper import bezier, mpl2bezier, bezier2mpl
 from .patheffects_base import ChainablePathEffect
 
+
 # see https://pomax.github.io/bezierinfo/#extremities
-class BezierExtreme():
+class BezierExtreme:
 
     # for quadratic
-    ab_coeff = np.array([[2, -4, 2],
-                          [2, -2, 0]], dtype=float)
+    ab_coeff = np.array([[2, -4, 2], [2, -2, 0]], dtype=float)
 
     # for cubic bezier
-    abc_coeff = np.array([[-3, 9, -9, 3],
-                          [6, -12, 6, 0],
-                          [-3, 3, 0, 0]], dtype=float)
+    abc_coeff = np.array([[-3, 9, -9, 3], [6, -12, 6, 0], [-3, 3, 0, 0]], dtype=float)
 
     @staticmethod
     def _get_extreme_points2(a, b):
         if a == 0:
             candidates = []
         else:
-            candidates = [b/a]
+            candidates = [b / a]
 
         return [p for p in candidates if 0 < p < 1]
 
@@ -36,11 +34,11 @@ class BezierExtreme():
 
     @staticmethod
     def _get_extreme_points_cubic(a, b, c):
-        b2_4ac = b*b - 4*a*c
-        if b2_4ac == 0.:
+        b2_4ac = b * b - 4 * a * c
+        if b2_4ac == 0.0:
             candidates = [-0.5 * b / a]
         elif b2_4ac > 0:
-            candidates = [-0.5 * (b - b2_4ac**.5) / a,  -0.5 * (b + b2_4ac**.5) / a]
+            candidates = [-0.5 * (b - b2_4ac**0.5) / a, -0.5 * (b + b2_4ac**0.5) / a]
         else:
             return []
 
@@ -60,14 +58,17 @@ class BezierExtreme():
         else:
             raise ValueError()
 
+
 bezier_extreme = BezierExtreme()
 
 if False:
 
-    nodes = np.asfortranarray([
-        [0.0, -1.0, 1.0, -0.75 ],
-        [2.0,  0.0, 1.0,  1.625],
-    ])
+    nodes = np.asfortranarray(
+        [
+            [0.0, -1.0, 1.0, -0.75],
+            [2.0, 0.0, 1.0, 1.625],
+        ]
+    )
     curve = bezier.Curve(nodes, degree=3)
 
     px = bezier_extreme.get_extreme_points(curve.nodes[0])
@@ -84,10 +85,12 @@ if False:
 
 if False:
 
-    nodes = np.asfortranarray([
-        [0.0, -1.0, 1.0],
-        [2.0,  0.0, 1.0],
-    ])
+    nodes = np.asfortranarray(
+        [
+            [0.0, -1.0, 1.0],
+            [2.0, 0.0, 1.0],
+        ]
+    )
     curve = bezier.Curve(nodes, degree=2)
 
     px = bezier_extreme.get_extreme_points(nodes[0])
@@ -103,7 +106,7 @@ if False:
 
 
 def convert_piecewise_monotonic(bp):
-    """ given a list of bezier paths, returns a list of list of paths, each
+    """given a list of bezier paths, returns a list of list of paths, each
     item is monotonically increase/decrease in y-direction"""
     bpp = []
     for b in bp:
@@ -114,15 +117,19 @@ def convert_piecewise_monotonic(bp):
             extremes = bezier_extreme.get_extreme_points(by)
             # print(by, extremes)
             if extremes:
-                bpp.extend([b.specialize(e1, e2) for (e1, e2)
-                            in zip([0] + extremes, extremes + [1])])
+                bpp.extend(
+                    [
+                        b.specialize(e1, e2)
+                        for (e1, e2) in zip([0] + extremes, extremes + [1])
+                    ]
+                )
             else:
                 bpp.append(b)
 
     yy = np.array([bpp[0].nodes[1][0]] + [b.nodes[1][-1] for b in bpp])
     ss = np.sign(yy[1:] - yy[:-1])
     ds = ss[1:] - ss[:-1]
-    splits = np.split(bpp, np.nonzero(ds)[0]+1)
+    splits = np.split(bpp, np.nonzero(ds)[0] + 1)
 
     return splits
 
@@ -138,33 +145,31 @@ def create_shadow_bezier_lists(splits, ox, oy):
         # we make all the shadows are drawn in the same direction, so that they
         # can be unioned without holes.
         if s[0].nodes[1, 0] < s[-1].nodes[1, -1]:
-            s_offset = [bezier.Curve.from_nodes(si.nodes[:, ::-1] + oxy)
-                          for si in s[::-1]]
+            s_offset = [
+                bezier.Curve.from_nodes(si.nodes[:, ::-1] + oxy) for si in s[::-1]
+            ]
         else:
-            s_offset = [bezier.Curve.from_nodes(si.nodes + oxy)
-                          for si in s]
-            s = [bezier.Curve.from_nodes(si.nodes[:, ::-1])
-                 for si in s[::-1]]
-
-        conn1 = from_nodes(np.hstack((s[-1].nodes[:, -1:],
-                                      s_offset[0].nodes[:, :1])))
-        conn2 = from_nodes(np.hstack((s_offset[-1].nodes[:, -1:],
-                                      s[0].nodes[:, :1])))
+            s_offset = [bezier.Curve.from_nodes(si.nodes + oxy) for si in s]
+            s = [bezier.Curve.from_nodes(si.nodes[:, ::-1]) for si in s[::-1]]
+
+        conn1 = from_nodes(np.hstack((s[-1].nodes[:, -1:], s_offset[0].nodes[:, :1])))
+        conn2 = from_nodes(np.hstack((s_offset[-1].nodes[:, -1:], s[0].nodes[:, :1])))
         combined = list(s) + [conn1] + s_offset + [conn2]
 
         shadows.append(combined)
 
     return shadows
 
+
 # bezier_list = shadows[2]
 
+
 def beziers2mpl(bezier_list):
     """convert a list of bezier curves (supposed to be connected and closed)
     to MPL path.
     """
     vertices, codes = [], []
-    for p, no_start_node in zip(bezier_list,
-                                chain([False], cycle([True]))):
+    for p, no_start_node in zip(bezier_list, chain([False], cycle([True]))):
         _v, _c = bezier2mpl(p, no_start_node=no_start_node)
         vertices.append(_v)
         codes.append(_c)
@@ -176,13 +181,14 @@ def beziers2mpl(bezier_list):
 
 
 class ShadowPath(ChainablePathEffect):
-    def __init__(self, angle, distance,
-                 post_affine=True):
+    gc_mode = "keep"
+
+    def __init__(self, angle, distance, post_affine=True):
         """
         angle : clockwise from the right in degree.
         post_affine : If True, thr shadow path is obtained after affine is applied. The distance is in dpi
         """
-        self.angle =angle
+        self.angle = angle
         self.distance = distance
         self.post_affine = post_affine
 
@@ -202,7 +208,7 @@ class ShadowPath(ChainablePathEffect):
         tp = tr.transform_path(tp0)
         bp_list = mpl2bezier(tp)
 
-        ox, oy = self.distance*dpi_cor, 0
+        ox, oy = self.distance * dpi_cor, 0
 
         mps = []
         for bp, closed in bp_list:
@@ -260,4 +266,3 @@ if False:
         ax.add_patch(PathPatch(tp0, fc="w", linewidth=0))
         ax.set_xlim(-2, 160)
         ax.set_ylim(-10, 80)
-
@@ -1,6 +1,7 @@
 import matplotlib.transforms as mtransforms
 
 from .patheffects_base import ChainablePathEffect
+from .patheffects_collection import pre_affine_collection, post_affine_collection
 from .transform_helper import TR
 
 
@@ -8,18 +9,29 @@ class Offset(ChainablePathEffect):
     """
     PathEffect that offsets the path.
     """
+
+    gc_mode = "keep"
+
     def __init__(self, ox, oy):
         super().__init__()
         self._ox = ox
         self._oy = oy
 
-    def _convert(self, renderer, gc, tpath, affine, rgbFace):
-        offset = mtransforms.Affine2D().translate(
+    def _get_offset(self, renderer):
+        return mtransforms.Affine2D().translate(
             *map(renderer.points_to_pixels, [self._ox, self._oy])
         )
 
+    def _convert(self, renderer, gc, tpath, affine, rgbFace):
+        offset = self._get_offset(renderer)
+
         return renderer, gc, tpath, affine + offset, rgbFace
 
+    def _convert_collection(self, renderer, gc, coll):
+        offset = self._get_offset(renderer)
+
+        return renderer, gc, post_affine_collection(coll, offset)
+
 
 class Affine(ChainablePathEffect):
     """PathEffect to apply affine trasnform the path. Note that this is applied
@@ -27,6 +39,9 @@ class Affine(ChainablePathEffect):
     path)
 
     """
+
+    gc_mode = "keep"
+
     def __init__(self, affine=None):
         super().__init__()
         if affine is None:
@@ -55,14 +70,18 @@ class Affine(ChainablePathEffect):
 
         return renderer, gc, tpath, self.affine + affine, rgbFace
 
+    def _convert_collection(self, renderer, gc, coll):
+        return renderer, gc, pre_affine_collection(coll, self.affine)
+
 
 def Skew(xShear, yShear):
     return Affine().skew_deg(xShear, yShear)
 
 
 class PostAffine(Affine):
-    """Similar to Affine, but it will be applied after the path's affine.
-    """
+    """Similar to Affine, but it will be applied after the path's affine."""
+
+    gc_mode = "keep"
 
     def _convert(self, renderer, gc, tpath, affine, rgbFace):
         # This is meant to skew the text path, and the skew transform must be
@@ -70,13 +89,18 @@ class PostAffine(Affine):
 
         return renderer, gc, tpath, affine + self.affine, rgbFace
 
+    def _convert_collection(self, renderer, gc, coll):
+        return renderer, gc, post_affine_collection(coll, self.affine)
+
 
 class Recenter(ChainablePathEffect):
     """
     PathEffect that apply offsets so that the given points to be zero.
     """
-    def __init__(self, axes, ox, oy, coords="data",
-                 sign=1):
+
+    gc_mode = "keep"
+
+    def __init__(self, axes, ox, oy, coords="data", sign=1):
         super().__init__()
         self._axes = axes
         self._ox = ox
@@ -85,13 +109,14 @@ class Recenter(ChainablePathEffect):
         self._sign = sign
 
     def restore(self):
-        return type(self)(self._axes, self._ox, self._oy,
-                          coords=self._coords, sign=-self._sign)
+        return type(self)(
+            self._axes, self._ox, self._oy, coords=self._coords, sign=-self._sign
+        )
 
     def _convert(self, renderer, gc, tpath, affine, rgbFace):
 
         is_mixed_backend = hasattr(renderer, "figure")  # mixed backend. only
-                                                        # tested for pdf.
+        # tested for pdf.
 
         # This is to better support ImageEffect/Clipboard in pdf backend.
         if not is_mixed_backend and (self._axes.figure.dpi != renderer.dpi):
@@ -101,15 +126,16 @@ class Recenter(ChainablePathEffect):
             tr = TR.get_xy_transform(renderer, self._coords, axes=self._axes)
             ox, oy = tr.transform_point([self._ox, self._oy])
 
-            affine = affine + mtransforms.Affine2D().translate(-self._sign*ox,
-                                                               -self._sign*oy)
+            affine = affine + mtransforms.Affine2D().translate(
+                -self._sign * ox, -self._sign * oy
+            )
             self._axes.figure.dpi = orig_dpi
         else:
             tr = TR.get_xy_transform(renderer, self._coords, axes=self._axes)
             ox, oy = tr.transform_point([self._ox, self._oy])
 
-            affine = affine + mtransforms.Affine2D().translate(-self._sign*ox,
-                                                               -self._sign*oy)
-
+            affine = affine + mtransforms.Affine2D().translate(
+                -self._sign * ox, -self._sign * oy
+            )
 
         return renderer, gc, tpath, affine, rgbFace
@@ -0,0 +1,481 @@
+"""
+Per-stage profiling of the path-effect and image-effect pipelines.
+
+While the profiler is active, every `_convert` (and `_convert_inplace` and
+`_convert_collection`) and `draw_path` of the path effects, every
+`process_image` of the image effects, and `new_gc` of the renderers are
+wrapped, and their wall time, the number of calls, the number of `new_gc`
+calls, the size of the images and (optionally) the allocated memory are
+recorded for each stage (class and method) and for each artist ::
+
+    with PipelineProfiler(trace_memory=True) as prof:
+        fig.savefig("figure.png")
+
+    print(prof.table())
+    print(prof.table(by_artist=True))
+    prof.to_speedscope("figure.speedscope.json")
+
+The json can be opened with https://www.speedscope.app as a flamegraph.
+
+The wrappers are installed on the classes when the context is entered, and
+are removed when it exits (even with an exception). Thus the classes need to
+be defined (imported) before the context is entered. The `draw` methods of
+the artists are also wrapped to attribute the stages to the artist being
+drawn. The memory is traced with `tracemalloc`, and the allocated memory
+of a stage is the peak of the traced memory during the stage relative to that
+at its start (on Python < 3.9, where the peak cannot be reset, the traced
+memory at the start and the end of the stages is used instead). It is not
+meaningful when the images are processed in threads (e.g., within
+`ImageEffectBatch`).
+"""
+
+import functools
+import json
+import math
+import threading
+import time
+import tracemalloc
+import types
+
+import matplotlib.patheffects as mpatheffects
+from matplotlib.artist import Artist
+from matplotlib.backend_bases import RendererBase
+
+from . import patheffects_base
+from . import patheffects  # noqa: F401 ; to define the path effects.
+from . import image_effect
+from . import image_effect_compiler  # noqa: F401
+from . import image_effect_tiled  # noqa: F401
+
+__all__ = ["PipelineProfiler", "get_current_profiler"]
+
+_current_profiler = None
+
+_STAGE_METHODS = [
+    (mpatheffects.AbstractPathEffect, ["_convert", "draw_path"]),
+    (
+        patheffects_base.AbstractPathEffect,
+        ["_convert", "_convert_inplace", "_convert_collection", "draw_path"],
+    ),
+    (image_effect.ImageEffectBase, ["process_image"]),
+]
+
+
+_SORT_KEYS = [
+    "stage",
+    "ncalls",
+    "total_time",
+    "self_time",
+    "n_new_gc",
+    "image_bytes",
+    "alloc_peak",
+]
+
+
+def get_current_profiler():
+    "Return the active PipelineProfiler, or None."
+    return _current_profiler
+
+
+def _iter_subclasses(cls):
+    yield cls
+    for c in cls.__subclasses__():
+        yield from _iter_subclasses(c)
+
+
+def _get_artist_name(artist):
+    return None if artist is None else "{}@{:x}".format(artist, id(artist))
+
+
+def _get_image(args, kwargs):
+    # The image of process_image(dpi, scale_factor, x, y, img)
+    if "img" in kwargs:
+        return kwargs["img"]
+    return args[4] if len(args) > 4 else None
+
+
+class _StageStat:
+    def __init__(self):
+        self.ncalls = 0
+        self.total_time = 0.0
+        self.self_time = 0.0
+        self.n_new_gc = 0
+        self.image_bytes = 0
+        self.max_image_shape = None
+        self.alloc_peak = 0
+
+    def add_image(self, img):
+        if img is None or not hasattr(img, "nbytes"):
+            return
+        self.image_bytes += img.nbytes
+        if self.max_image_shape is None or img.size > math.prod(self.max_image_shape):
+            self.max_image_shape = img.shape
+
+
+def _get_traced_memory():
+    """
+    Return the current and the peak traced memory, and reset the peak.
+    `tracemalloc.reset_peak` is only available on Python 3.9+. Otherwise, the
+    peak since the last call is unknown and the current memory is returned
+    as the peak, i.e., only the memory still allocated at the boundaries of
+    the stages is accounted.
+    """
+    current, peak = tracemalloc.get_traced_memory()
+    if not hasattr(tracemalloc, "reset_peak"):
+        return current, current
+    tracemalloc.reset_peak()
+    return current, peak
+
+
+class _Frame:
+    # An entry of the call stack of the stages.
+    def __init__(self, artist_name, stat, artist_stat, start, mem_start):
+        self.artist_name = artist_name
+        self.stat = stat
+        self.artist_stat = artist_stat
+        self.start = start
+        self.child_time = 0.0
+        self.mem_start = mem_start
+        self.mem_peak = mem_start
+
+
+class PipelineProfiler:
+    def __init__(self, trace_memory=False, record_events=True):
+        """
+        trace_memory: if True, trace the allocated memory of each stage with
+        tracemalloc. This slows down the drawing.
+
+        record_events: if True, record the start and the end of each stage,
+        which is needed for `to_speedscope`.
+        """
+        self.trace_memory = trace_memory
+        self.record_events = record_events
+
+        self._orig_methods = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+        self.reset()
+
+    def reset(self):
+        "Clear the recorded statistics and events."
+        self.stats = {}  # stage -> _StageStat
+        self.artist_stats = {}  # (artist, stage) -> _StageStat
+        self._frame_names = {}  # name -> index
+        self._events = {}  # thread name -> list of (type, frame, time)
+        self._t0 = time.perf_counter()
+
+    def __enter__(self):
+        global _current_profiler
+        if _current_profiler is not None:
+            raise ValueError("Another profiler is already active")
+
+        try:
+            self._install()
+        except BaseException:
+            self._uninstall()
+            raise
+
+        _current_profiler = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _current_profiler
+        try:
+            self._uninstall()
+        finally:
+            _current_profiler = None
+
+    def _install(self):
+        for root, names in _STAGE_METHODS:
+            for cls in set(_iter_subclasses(root)):
+                for name in names:
+                    self._wrap(cls, name, self._make_stage_wrapper)
+
+        for cls in set(_iter_subclasses(RendererBase)):
+            self._wrap(cls, "new_gc", self._make_new_gc_wrapper)
+
+        for cls in set(_iter_subclasses(Artist)):
+            self._wrap(cls, "draw", self._make_draw_wrapper)
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def _uninstall(self):
+        for cls, name, orig in reversed(self._orig_methods):
+            setattr(cls, name, orig)
+        self._orig_methods = []
+
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _wrap(self, cls, name, make_wrapper):
+        orig = vars(cls).get(name)
+        if not isinstance(orig, types.FunctionType):
+            return
+        self._orig_methods.append((cls, name, orig))
+        setattr(cls, name, make_wrapper(orig))
+
+    def _get_artists(self):
+        # The artists being drawn, innermost last.
+        artists = getattr(self._local, "artists", None)
+        if artists is None:
+            artists = self._local.artists = []
+        return artists
+
+    def _get_stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add_event(self, kind, name, t):
+        if not self.record_events:
+            return
+        thread_name = threading.current_thread().name
+        with self._lock:
+            frame = self._frame_names.setdefault(name, len(self._frame_names))
+            self._events.setdefault(thread_name, []).append((kind, frame, t))
+
+    def _get_stats(self, name, artist_name):
+        with self._lock:
+            stat = self.stats.setdefault(name, _StageStat())
+            if artist_name is None:
+                return stat, None
+            return stat, self.artist_stats.setdefault((artist_name, name), _StageStat())
+
+    def _enter(self, name):
+        stack = self._get_stack()
+        if stack:
+            artist_name = stack[-1].artist_name
+        else:
+            artists = self._get_artists()
+            artist_name = _get_artist_name(artists[-1] if artists else None)
+
+        mem = 0
+        if self.trace_memory:
+            mem, peak = _get_traced_memory()
+            if stack:
+                stack[-1].mem_peak = max(stack[-1].mem_peak, peak)
+
+        stat, artist_stat = self._get_stats(name, artist_name)
+        frame = _Frame(artist_name, stat, artist_stat, time.perf_counter(), mem)
+
+        # The top-level stages are grouped by the artist.
+        if not stack and artist_name is not None:
+            self._add_event("O", artist_name, frame.start)
+        self._add_event("O", name, frame.start)
+
+        stack.append(frame)
+        return frame
+
+    def _exit(self, name, frame, img_in=None, img_out=None):
+        t = time.perf_counter()
+        stack = self._get_stack()
+        stack.pop()
+
+        if self.trace_memory:
+            _, peak = _get_traced_memory()
+            frame.mem_peak = max(frame.mem_peak, peak)
+            if stack:
+                stack[-1].mem_peak = max(stack[-1].mem_peak, frame.mem_peak)
+
+        elapsed = t - frame.start
+        if stack:
+            stack[-1].child_time += elapsed
+
+        with self._lock:
+            for stat in [frame.stat, frame.artist_stat]:
+                if stat is None:
+                    continue
+                stat.ncalls += 1
+                stat.total_time += elapsed
+                stat.self_time += elapsed - frame.child_time
+                stat.alloc_peak = max(stat.alloc_peak, frame.mem_peak - frame.mem_start)
+                stat.add_image(img_in)
+                stat.add_image(img_out)
+
+        self._add_event("C", name, t)
+        if not stack and frame.artist_name is not None:
+            self._add_event("C", frame.artist_name, t)
+
+    def _make_stage_wrapper(self, orig):
+        profiler = self
+        method_name = orig.__name__
+
+        def wrapper(self, *args, **kwargs):
+            name = "{}.{}".format(type(self).__name__, method_name)
+            frame = profiler._enter(name)
+            img_in = img_out = None
+            try:
+                r = orig(self, *args, **kwargs)
+                if method_name == "process_image":
+                    img_in = _get_image(args, kwargs)
+                    img_out = r[4] if r is not None else None
+                return r
+            finally:
+                profiler._exit(name, frame, img_in, img_out)
+
+        wrapper.__wrapped__ = orig
+        wrapper.__name__ = orig.__name__
+        wrapper.__doc__ = orig.__doc__
+        return wrapper
+
+    def _make_draw_wrapper(self, orig):
+        profiler = self
+
+        @functools.wraps(orig)
+        def wrapper(self, *args, **kwargs):
+            artists = profiler._get_artists()
+            artists.append(self)
+            try:
+                return orig(self, *args, **kwargs)
+            finally:
+                artists.pop()
+
+        return wrapper
+
+    def _make_new_gc_wrapper(self, orig):
+        profiler = self
+
+        def wrapper(self, *args, **kwargs):
+            stack = profiler._get_stack()
+            if stack:
+                frame = stack[-1]
+                with profiler._lock:
+                    frame.stat.n_new_gc += 1
+                    if frame.artist_stat is not None:
+                        frame.artist_stat.n_new_gc += 1
+            return orig(self, *args, **kwargs)
+
+        wrapper.__wrapped__ = orig
+        wrapper.__name__ = orig.__name__
+        wrapper.__doc__ = orig.__doc__
+        return wrapper
+
+    def get_rows(self, by_artist=False, sort="total_time"):
+        """
+        Return the statistics as a list of dicts, sorted by the given key
+        in descending order.
+        """
+        if by_artist:
+            items = [
+                ((artist, stage), stat)
+                for (artist, stage), stat in self.artist_stats.items()
+            ]
+        else:
+            items = [((None, stage), stat) for stage, stat in self.stats.items()]
+
+        rows = []
+        for (artist, stage), stat in items:
+            row = dict(
+                stage=stage,
+                ncalls=stat.ncalls,
+                total_time=stat.total_time,
+                self_time=stat.self_time,
+                n_new_gc=stat.n_new_gc,
+                image_bytes=stat.image_bytes,
+                max_image_shape=stat.max_image_shape,
+                alloc_peak=stat.alloc_peak,
+            )
+            if by_artist:
+                row = dict(artist=artist, **row)
+            rows.append(row)
+
+        if sort not in _SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+
+        return sorted(rows, key=lambda row: row[sort], reverse=True)
+
+    def table(self, by_artist=False, sort="total_time"):
+        """
+        Return the statistics as a text table. The times are in
+        milliseconds. The image bytes are the sum of the sizes of the input
+        and the output images of process_image.
+        """
+        columns = [
+            "stage",
+            "ncalls",
+            "total [ms]",
+            "self [ms]",
+            "new_gc",
+            "image bytes",
+            "max image",
+            "alloc peak",
+        ]
+        if by_artist:
+            columns = ["artist"] + columns
+
+        lines = []
+        for row in self.get_rows(by_artist=by_artist, sort=sort):
+            shape = row["max_image_shape"]
+            line = [
+                row["stage"],
+                str(row["ncalls"]),
+                "{:.3f}".format(row["total_time"] * 1e3),
+                "{:.3f}".format(row["self_time"] * 1e3),
+                str(row["n_new_gc"]),
+                str(row["image_bytes"]),
+                "" if shape is None else "x".join(map(str, shape)),
+                str(row["alloc_peak"]) if self.trace_memory else "",
+            ]
+            if by_artist:
+                line = [row["artist"]] + line
+            lines.append(line)
+
+        widths = [
+            max([len(c)] + [len(line[i]) for line in lines])
+            for i, c in enumerate(columns)
+        ]
+
+        def format_line(line):
+            # left-align the names and right-align the numbers.
+            n = 2 if by_artist else 1
+            return "  ".join(
+                [s.ljust(w) for s, w in zip(line[:n], widths)]
+                + [s.rjust(w) for s, w in zip(line[n:], widths[n:])]
+            )
+
+        header = format_line(columns)
+        return "\n".join(
+            [header, "-" * len(header)] + [format_line(line) for line in lines]
+        )
+
+    def get_speedscope(self):
+        """
+        Return the recorded events as a dict in the speedscope file format
+        (one evented profile per thread, the time in milliseconds).
+        """
+        frames = sorted(self._frame_names, key=self._frame_names.get)
+        profiles = []
+        for thread_name, events in self._events.items():
+            if not events:
+                continue
+            profiles.append(
+                {
+                    "type": "evented",
+                    "name": thread_name,
+                    "unit": "milliseconds",
+                    "startValue": (events[0][2] - self._t0) * 1e3,
+                    "endValue": (events[-1][2] - self._t0) * 1e3,
+                    "events": [
+                        {"type": kind, "frame": frame, "at": (t - self._t0) * 1e3}
+                        for kind, frame, t in events
+                    ],
+                }
+            )
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": name} for name in frames]},
+            "profiles": profiles,
+            "name": "mpl_visual_context pipeline",
+            "exporter": "mpl_visual_context.pipeline_profiler",
+        }
+
+    def to_speedscope(self, fname):
+        "Write the recorded events to *fname* in the speedscope json format."
+        with open(fname, "w") as f:
+            json.dump(self.get_speedscope(), f)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from mpl_visual_context.image_effect import Gaussian, Pad
+
+
+def _make_image():
+    # An opaque red square on the transparent green.
+    img = np.zeros((40, 40, 4))
+    img[..., 1] = 1.0
+    img[15:25, 15:25] = (1.0, 0.0, 0.0, 1.0)
+    return img
+
+
+@pytest.mark.parametrize("premultiplied, green", [(False, 0.99), (True, 0.0)])
+def test_premultiplied_fringe(premultiplied, green):
+    ie = (Pad(2) | Gaussian(3, channel_slice=slice(None))).set_premultiplied(
+        premultiplied
+    )
+    img = _make_image()
+    img_orig = img.copy()
+
+    _, _, _, _, out = ie.process_image(72, 1, 0, 0, img)
+
+    np.testing.assert_array_equal(img, img_orig)  # input not mutated.
+
+    # the faint fringe outside the square, where the straight alpha is
+    # dominated by the transparent green.
+    fringe = out[2 + 20, 2 + 31]
+    assert 0 < fringe[3] < 1
+    assert fringe[1] == pytest.approx(green, abs=0.01)
+    if premultiplied:
+        assert fringe[0] == pytest.approx(1.0)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import matplotlib
+
+matplotlib.use("agg")
+import matplotlib.pyplot as plt
+from matplotlib.patheffects import Normal
+
+from mpl_visual_context.image_effect import (
+    AlphaAxb,
+    Dilation,
+    Fill,
+    Gaussian,
+    HLSModify,
+    Offset,
+    Pad,
+)
+from mpl_visual_context.image_effect_batch import ImageEffectBatch
+from mpl_visual_context.patheffects_image_effect import ImageEffect
+
+
+def _make_artists(ax):
+    shadow = ImageEffect(
+        AlphaAxb((0.5, 0))
+        | Pad(10)
+        | Fill("k")
+        | Dilation(2)
+        | Gaussian(3)
+        | Offset(3, -3)
+    )
+    bars = ax.bar(np.arange(5), [3, 5, 2, 4, 1], color="C1", ec="w", lw=2)
+    for b in bars:
+        b.set_path_effects([shadow, Normal()])
+
+    (line,) = ax.plot([0, 4], [1, 4], lw=4, zorder=0.5)
+    line.set_path_effects([ImageEffect(Pad(5) | Gaussian(2)), Normal()])
+
+    text = ax.text(2, 2, "text", size=20, zorder=3)
+
+    sc = ax.scatter([0.5, 1.5, 3], [4, 3, 2], s=300, zorder=2)
+    sc.set_path_effects([ImageEffect(HLSModify(l="-30%"))])
+
+    return list(bars) + [line, text, sc]
+
+
+def _draw(batch, **kw):
+    fig, ax = plt.subplots(figsize=(3, 3), dpi=72)
+    artists = _make_artists(ax)
+    if batch:
+        for a in artists:
+            a.remove()
+        ax.add_artist(ImageEffectBatch(artists, **kw))
+    ax.set(xlim=(-1, 5), ylim=(0, 6))
+    ax.set_axis_off()
+    fig.canvas.draw()
+    img = np.asarray(fig.canvas.buffer_rgba()).copy()
+    plt.close(fig)
+    return img
+
+
+@pytest.mark.parametrize("kw", [{}, dict(max_workers=1), dict(max_pending=2)])
+def test_batched_same_as_sequential(kw):
+    img0 = _draw(batch=False)
+    img1 = _draw(batch=True, **kw)
+    np.testing.assert_array_equal(img0, img1)
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+import matplotlib
+
+matplotlib.use("agg")
+import matplotlib.pyplot as plt
+from matplotlib.patches import Rectangle
+
+from mpl_visual_context.image_effect import Gaussian, Pad
+from mpl_visual_context.image_effect_cache import (
+    ImageEffectCache,
+    Uncacheable,
+    get_fingerprint,
+)
+from mpl_visual_context.patheffects_image_effect import ImageEffect
+
+
+@pytest.fixture
+def fig_with_cache():
+    cache = ImageEffectCache()
+    gaussian = Gaussian(3)
+    ie = Pad(10) | gaussian
+
+    fig, ax = plt.subplots(figsize=(3, 3), dpi=72)
+    p = Rectangle((0.2, 0.2), 0.5, 0.4, fc="C0", ec="k")
+    p.set_path_effects([ImageEffect(ie, cache=cache)])
+    ax.add_patch(p)
+
+    fig.canvas.draw()
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    yield fig, ax, p, ie, gaussian, cache
+    plt.close(fig)
+
+
+def _draw_n_get_counts(fig, cache):
+    fig.canvas.draw()
+    return cache.hits, cache.misses
+
+
+def test_redraw_hits(fig_with_cache):
+    fig, ax, p, ie, gaussian, cache = fig_with_cache
+    img0 = np.asarray(fig.canvas.buffer_rgba()).copy()
+
+    assert _draw_n_get_counts(fig, cache) == (1, 1)
+    np.testing.assert_array_equal(img0, np.asarray(fig.canvas.buffer_rgba()))
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda ax, p, ie, gaussian: p.set_linewidth(3),  # gc
+        lambda ax, p, ie, gaussian: p.set_edgecolor("r"),  # gc
+        lambda ax, p, ie, gaussian: p.set_facecolor("y"),  # fill color
+        lambda ax, p, ie, gaussian: ax.set_xlim(0, 2),  # transform
+        lambda ax, p, ie, gaussian: p.set_xy((0.1, 0.1)),  # path
+        lambda ax, p, ie, gaussian: ie.set_dtype("float32"),  # dtype policy
+        lambda ax, p, ie, gaussian: setattr(gaussian, "size", 5),  # parameter
+        lambda ax, p, ie, gaussian: ax.figure.set_dpi(100),  # renderer
+    ],
+)
+def test_change_misses(fig_with_cache, change):
+    fig, ax, p, ie, gaussian, cache = fig_with_cache
+
+    change(ax, p, ie, gaussian)
+    assert _draw_n_get_counts(fig, cache) == (0, 2)
+
+    # the new image is cached.
+    assert _draw_n_get_counts(fig, cache) == (1, 2)
+
+
+def test_fingerprint():
+    assert get_fingerprint(Gaussian(3)) == get_fingerprint(Gaussian(3))
+    assert get_fingerprint(Gaussian(3)) != get_fingerprint(Gaussian(4))
+
+    ie = Pad(3) | Gaussian(3)
+    fp = get_fingerprint(ie)
+    assert get_fingerprint(ie.set_dtype("float32")) != fp
+    assert get_fingerprint(ie.set_dtype("float32")) != get_fingerprint(
+        ie.set_dtype("uint8")
+    )
+
+    with pytest.raises(Uncacheable):
+        get_fingerprint(lambda x: x)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from mpl_visual_context.image_effect import (
+    AlphaAxb,
+    Dilation,
+    Erosion,
+    Fill,
+    Gaussian,
+    HLSModify,
+    Offset,
+    Pad,
+    convert_image_dtype,
+)
+
+
+def _make_image(dtype):
+    rng = np.random.default_rng(0)
+    img = np.zeros((40, 50, 4))
+    img[10:30, 12:40, :3] = rng.random((20, 28, 3))
+    img[10:30, 12:40, 3] = 1.0
+    img[20:25, 5:45, 3] = 0.5
+    return convert_image_dtype(img, dtype)
+
+
+CHAINS = [
+    lambda: AlphaAxb((0.5, 0)) | Pad(10) | Fill("k") | Gaussian(3) | Offset(3, -2),
+    lambda: Pad(3) | Pad(4) | Offset(1, 2) | Offset(-3, 1) | Dilation(3),
+    lambda: Fill("r") | AlphaAxb((0.8, 0.1)) | Fill("b") | AlphaAxb((2, -0.3)),
+    lambda: Pad(5) | Erosion(2) | Gaussian(2, channel_slice=slice(None)),
+    lambda: HLSModify(l="-20%") | Pad(4) | Fill("g") | Gaussian(2),
+]
+
+
+@pytest.mark.parametrize("alpha_plane", [True, False])
+@pytest.mark.parametrize("dtype", [None, "float32", "uint8"])
+@pytest.mark.parametrize("make_chain", CHAINS)
+def test_compiled_same_as_chain(make_chain, dtype, alpha_plane):
+    chain = make_chain().set_dtype(dtype)
+    compiled = chain.compile(alpha_plane=alpha_plane)
+
+    img = _make_image(chain.get_input_dtype())
+    img_orig = img.copy()
+
+    r1 = chain.process_image(72, 1, 10, 20, img.copy())
+    r2 = compiled.process_image(72, 1, 10, 20, img)
+
+    np.testing.assert_array_equal(img, img_orig)  # input not mutated.
+    assert r1[:4] == r2[:4]
+    assert r1[4].dtype == r2[4].dtype
+    np.testing.assert_allclose(r1[4].astype(float), r2[4].astype(float), atol=1e-6)
+
+
+@pytest.mark.parametrize("make_chain", CHAINS)
+def test_report_allocations_before(make_chain):
+    chain = make_chain()
+    r1 = chain.compile(alpha_plane=True).get_report()
+    r2 = chain.compile(alpha_plane=False).get_report()
+    assert r1["allocations_before"] == r2["allocations_before"]
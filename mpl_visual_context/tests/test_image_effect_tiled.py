@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from mpl_visual_context.image_effect import (
+    AlphaAxb,
+    Dilation,
+    Erosion,
+    Fill,
+    Gaussian,
+    Offset,
+    Pad,
+)
+from mpl_visual_context.image_effect_tiled import TiledImageEffect
+
+
+def _make_image():
+    rng = np.random.default_rng(0)
+    img = np.zeros((150, 170, 4))
+    img[..., :3] = rng.random((150, 170, 3))
+    img[20:130, 30:140, 3] = 1.0
+    img[60:90, 5:165, 3] = 0.5
+    img[rng.random((150, 170)) > 0.97, 3] = 1.0
+    return img
+
+
+CHAINS = [
+    lambda: Gaussian(3),
+    lambda: Gaussian(2, channel_slice=slice(None)),
+    lambda: Dilation(3) | Gaussian(2),
+    lambda: Erosion(2) | Dilation(2, shape="disk"),
+    lambda: Fill("r") | AlphaAxb((0.5, 0.1)) | Gaussian(4) | Offset(2, 3),
+]
+
+
+@pytest.mark.parametrize("dpi", [72, 144])
+@pytest.mark.parametrize("make_chain", CHAINS)
+def test_tiled_same_as_untiled(make_chain, dpi):
+    ie = make_chain()
+    tiled = TiledImageEffect(make_chain(), tile_size=32, max_workers=4)
+    assert tiled.get_halo(dpi, 1) is not None
+
+    img = _make_image()
+    r1 = ie.process_image(dpi, 1, 10, 20, img.copy())
+    r2 = tiled.process_image(dpi, 1, 10, 20, img.copy())
+
+    assert r1[:4] == r2[:4]
+    np.testing.assert_allclose(r1[4], r2[4], rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize(
+    "make_chain",
+    [lambda: Pad(5) | Gaussian(3), lambda: Gaussian(3, method="box3")],
+)
+def test_no_halo_falls_back_to_untiled(make_chain):
+    tiled = TiledImageEffect(make_chain(), tile_size=32)
+    assert tiled.get_halo(72, 1) is None
+
+    img = _make_image()
+    r1 = make_chain().process_image(72, 1, 10, 20, img.copy())
+    r2 = tiled.process_image(72, 1, 10, 20, img.copy())
+
+    assert r1[:4] == r2[:4]
+    np.testing.assert_array_equal(r1[4], r2[4])
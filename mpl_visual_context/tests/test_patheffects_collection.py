@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+import matplotlib
+
+matplotlib.use("agg")
+import matplotlib.pyplot as plt
+
+from mpl_visual_context.patheffects import HLSModify, Offset, StrokeColor
+from mpl_visual_context.patheffects_collection import set_path_collection_batch
+
+PATH_EFFECTS = [
+    lambda: [HLSModify(l="-20%") | Offset(2, -2)],
+    lambda: [StrokeColor("r") | Offset(-1, 3), HLSModify(s="50%")],
+]
+
+
+def _draw(make_artist, batch):
+    fig, ax = plt.subplots(figsize=(3, 3), dpi=72)
+    artist = make_artist(ax)
+    if batch:
+        set_path_collection_batch(artist)
+    fig.canvas.draw()
+    img = np.asarray(fig.canvas.buffer_rgba()).copy()
+    plt.close(fig)
+    return img
+
+
+def _scatter(make_pe):
+    def make_artist(ax):
+        rng = np.random.default_rng(0)
+        x, y = rng.random((2, 50))
+        return ax.scatter(
+            x, y, c=x, s=rng.random(50) * 100, ec="k", path_effects=make_pe()
+        )
+
+    return make_artist
+
+
+def _markers(make_pe):
+    def make_artist(ax):
+        (line,) = ax.plot(
+            np.arange(10),
+            np.arange(10) ** 0.5,
+            "o-",
+            mfc="y",
+            mec="b",
+            path_effects=make_pe(),
+        )
+        return line
+
+    return make_artist
+
+
+@pytest.mark.parametrize("make_pe", PATH_EFFECTS)
+@pytest.mark.parametrize("make_artist", [_scatter, _markers])
+def test_batched_same_as_unbatched(make_artist, make_pe):
+    img0 = _draw(make_artist(make_pe), batch=False)
+    img1 = _draw(make_artist(make_pe), batch=True)
+    np.testing.assert_array_equal(img0, img1)
+
+
+def test_batch_is_per_artist():
+    fig, ax = plt.subplots()
+    sc1 = ax.scatter([0, 1], [0, 1], path_effects=[Offset(1, 1)])
+    sc2 = ax.scatter([0, 1], [1, 0], path_effects=[Offset(1, 1)])
+    set_path_collection_batch(sc1)
+    assert "draw" in vars(sc1) and "draw" not in vars(sc2)
+
+    set_path_collection_batch(sc1, False)
+    assert "draw" not in vars(sc1)
+    plt.close(fig)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+import matplotlib
+
+matplotlib.use("agg")
+import matplotlib.pyplot as plt
+
+from mpl_visual_context.patheffects import (
+    ColorMatrix,
+    FillOnly,
+    HLSModify,
+    Offset,
+    StrokeColor,
+    StrokeColorFromFillColor,
+)
+from mpl_visual_context.patheffects_base import ChainedPathEffect
+from mpl_visual_context.patheffects_color import BlendAlpha
+from mpl_visual_context.patheffects_color_fusion import FusedColorModify
+
+CHAINS = [
+    lambda: HLSModify(l="-10%") | ColorMatrix("grayscale"),
+    lambda: ColorMatrix("sepia") | HLSModify(alpha="50%") | ColorMatrix("sepia"),
+    lambda: HLSModify(s="50%") | BlendAlpha("w") | StrokeColorFromFillColor(),
+    lambda: StrokeColor("r") | HLSModify(h="30%") | Offset(2, -2),
+    lambda: ColorMatrix("grayscale") | HLSModify(l="20%") | FillOnly(),
+    lambda: BlendAlpha("y") | ColorMatrix("sepia") | StrokeColor("b"),
+    # the non-affine HLSModify between the affine ones.
+    lambda: ColorMatrix("sepia")
+    | HLSModify(l="-30%", s="80%")
+    | ColorMatrix("grayscale"),
+]
+
+
+def _get_pe_list(pe):
+    return pe._pe_list if isinstance(pe, ChainedPathEffect) else [pe]
+
+
+def _draw(pe):
+    fig, ax = plt.subplots(figsize=(3, 3), dpi=72)
+    ax.bar([0, 1, 2], [3, 2, 1], color=["C0", "C1", "C2"], ec="C3", lw=3, alpha=0.7)
+    ax.pie([1, 2, 3], radius=0.5, center=(1.5, 2.5), frame=True)
+    ax.set_axis_off()
+    # the patches, as StrokeColorFromFillColor needs the fill.
+    for a in ax.patches:
+        a.set_path_effects([pe])
+    fig.canvas.draw()
+    img = np.asarray(fig.canvas.buffer_rgba()).copy()
+    plt.close(fig)
+    return img
+
+
+@pytest.mark.parametrize("make_chain", CHAINS)
+def test_fused_same_as_unfused(make_chain):
+    pe = make_chain()
+    fused = make_chain().fuse_colors()
+
+    assert any(isinstance(pe1, FusedColorModify) for pe1 in _get_pe_list(fused))
+
+    np.testing.assert_array_equal(_draw(pe), _draw(fused))
+
+
+def test_no_matrix_fusion_across_non_affine():
+    pe = (
+        ColorMatrix("sepia") | HLSModify(l="-30%") | ColorMatrix("grayscale")
+    ).fuse_colors()
+    fused = [pe1 for pe1 in _get_pe_list(pe) if isinstance(pe1, FusedColorModify)]
+    assert len(fused) == 1
+    assert len(fused[0].get_matrices()) == 2